@@ -0,0 +1,111 @@
+"""
+Compare resume-time loading of a book from the legacy indented JSON file
+and from the SQLite content store.
+
+A synthetic omnibus-sized book is written both ways. Each load is run in a
+fresh subprocess and reports wall time and peak Python heap (tracemalloc)
+for reading the title/author and chapter list, and for reading the text of
+the chapters that survive trimming.
+
+    python benchmarks/bench_content_store.py --chapters 400 --chapter-kb 80
+"""
+import argparse
+import json
+import random
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+BENCHMARKS_DIR = Path(__file__).resolve().parent
+REPO_DIR = BENCHMARKS_DIR.parent
+sys.path.insert(0, str(REPO_DIR))
+
+WORDS = ('the of and to in a is that for it as was with be by on not he this are or his from at which but '
+         'have an they you were her all she there would their we him been has when who will more no if out').split()
+
+LOAD_JSON = '''
+import json, sys, time, tracemalloc
+tracemalloc.start()
+start = time.perf_counter()
+with open(sys.argv[1], 'r', encoding='utf-8') as f:
+    book = json.load(f)
+titles = [chapter['title'] for chapter in book['chapters']]
+metadata_seconds = time.perf_counter() - start
+kept = [chapter['content'] for chapter in book['chapters'][1:-1]]
+print(json.dumps({'metadata_seconds': metadata_seconds, 'total_seconds': time.perf_counter() - start,
+                  'peak_bytes': tracemalloc.get_traced_memory()[1]}))
+'''
+
+LOAD_STORE = '''
+import json, sys, time, tracemalloc
+from speedread.content_store import ContentStore
+tracemalloc.start()
+start = time.perf_counter()
+store = ContentStore(sys.argv[1])
+chapters = store.chapters()
+metadata_seconds = time.perf_counter() - start
+kept = [store.read_chapter(chapter['id'])['content'] for chapter in chapters[1:-1]]
+print(json.dumps({'metadata_seconds': metadata_seconds, 'total_seconds': time.perf_counter() - start,
+                  'peak_bytes': tracemalloc.get_traced_memory()[1]}))
+'''
+
+
+def make_book(chapters, chapter_kb, seed):
+    rng = random.Random(seed)
+    book = {'title': 'Omnibus', 'author': 'Benchmark', 'chapters': []}
+    for i in range(chapters):
+        words = []
+        size = 0
+        while size < chapter_kb * 1024:
+            word = rng.choice(WORDS)
+            words.append(word)
+            size += len(word) + 1
+        book['chapters'].append({'id': f"{i}:OEBPS/ch{i:04d}.xhtml", 'title': f"Chapter {i + 1}",
+                                 'content': ' '.join(words)})
+    return book
+
+
+def run(script, path):
+    result = subprocess.run([sys.executable, '-c', script, str(path)], capture_output=True, text=True, check=True,
+                            env={'PYTHONPATH': str(REPO_DIR)})
+    return json.loads(result.stdout)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark book content loading: JSON vs content store.')
+    parser.add_argument('--chapters', type=int, default=400, help='Number of chapters')
+    parser.add_argument('--chapter-kb', type=int, default=80, help='Text per chapter in KB')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('-o', '--output', help='Write results as JSON')
+    args = parser.parse_args()
+
+    from speedread.content_store import ContentStore
+
+    book = make_book(args.chapters, args.chapter_kb, args.seed)
+    with tempfile.TemporaryDirectory() as work_dir:
+        json_file = Path(work_dir) / 'book_content.json'
+        store_file = Path(work_dir) / 'book_content.sqlite'
+        with open(json_file, 'w', encoding='utf-8') as f:
+            json.dump(book, f, ensure_ascii=False, indent=2)
+        ContentStore.write(store_file, book)
+        del book
+
+        results = {
+            'json': {'file_bytes': json_file.stat().st_size, **run(LOAD_JSON, json_file)},
+            'store': {'file_bytes': store_file.stat().st_size, **run(LOAD_STORE, store_file)},
+        }
+
+    for name, result in results.items():
+        print(f"{name:6} file {result['file_bytes'] / 2**20:7.1f} MB  "
+              f"metadata {result['metadata_seconds'] * 1000:8.1f} ms  "
+              f"with chapters {result['total_seconds'] * 1000:8.1f} ms  "
+              f"peak heap {result['peak_bytes'] / 2**20:7.1f} MB")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,142 @@
+"""
+Compare EPUB ingestion through the shared in-memory EpubArchive against the
+previous double-extractall path.
+
+Each variant runs in a fresh interpreter so peak RSS is not shared between
+them. Trimming is skipped, since it is an API call and not part of ingestion.
+
+    python benchmarks/bench_ingest.py book.epub [--repeat 3]
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import zipfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+
+def dir_size(path):
+    total = 0
+    for root, _, files in os.walk(path):
+        for file in files:
+            total += os.path.getsize(os.path.join(root, file))
+    return total
+
+
+def ingest_legacy(epub_path):
+    """The pre-EpubArchive path: two full extractions and a full-archive TOC scan."""
+    from bs4 import BeautifulSoup
+
+    peak_disk = 0
+    with tempfile.TemporaryDirectory() as temp_dir:
+        with zipfile.ZipFile(epub_path, 'r') as zip_ref:
+            zip_ref.extractall(temp_dir)
+        peak_disk += dir_size(temp_dir)
+
+        with tempfile.TemporaryDirectory() as meta_dir:
+            with zipfile.ZipFile(epub_path, 'r') as zip_ref:
+                zip_ref.extractall(meta_dir)
+            peak_disk += dir_size(meta_dir)
+            nav_file = None
+            for root, _, files in os.walk(meta_dir):
+                for file in files:
+                    if 'toc' in file.lower() and file.endswith('.ncx'):
+                        nav_file = os.path.join(root, file)
+            with open(nav_file, 'r', encoding='utf-8') as f:
+                nav_soup = BeautifulSoup(f, 'xml')
+            sources = []
+            for navPoint in nav_soup.find_all('navPoint'):
+                content = navPoint.find('content')
+                if content:
+                    src = content.get('src', '').split('#')[0]
+                    if src not in sources:
+                        sources.append(src)
+
+        toc_path = None
+        for root, _, files in os.walk(temp_dir):
+            for file in files:
+                file_path = os.path.join(root, file)
+                with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
+                    if 'navPoint' in f.read():
+                        toc_path = file_path
+                        break
+            if toc_path:
+                break
+
+        chapters = []
+        for src in sources:
+            chapter_path = os.path.join(os.path.dirname(toc_path), src)
+            with open(chapter_path, 'r', encoding='utf-8', errors='ignore') as f:
+                chapters.append(BeautifulSoup(f, 'html.parser').get_text())
+    return len(chapters), peak_disk
+
+
+def ingest_archive(epub_path):
+    from speedread.epub_archive import EpubArchive
+    from speedread.epub_metadata import extract_toc_from_epub
+    from speedread.epub2json import extract_chapter_content
+
+    with EpubArchive(epub_path) as archive:
+        metadata = extract_toc_from_epub(archive)
+        # bs4 matches the legacy parser, so only the archive handling differs
+        chapters = [extract_chapter_content(archive, chapter['src'], 'bs4') for chapter in metadata['chapters']]
+    return len(chapters), 0
+
+
+VARIANTS = {
+    'legacy': ingest_legacy,
+    'archive': ingest_archive,
+}
+
+
+def run_variant(variant, epub_path):
+    start = time.perf_counter()
+    chapter_count, peak_disk = VARIANTS[variant](epub_path)
+    wall_time = time.perf_counter() - start
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform != 'darwin':
+        max_rss *= 1024
+    return {
+        'variant': variant,
+        'chapters': chapter_count,
+        'wall_time': wall_time,
+        'peak_rss_bytes': max_rss,
+        'peak_disk_bytes': peak_disk,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark EPUB ingestion paths.')
+    parser.add_argument('epub_file', help='Path to the EPUB file')
+    parser.add_argument('--repeat', type=int, default=3, help='Runs per variant')
+    parser.add_argument('--variant', choices=VARIANTS, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.variant:
+        print(json.dumps(run_variant(args.variant, args.epub_file)))
+        return
+
+    results = []
+    for variant in VARIANTS:
+        for _ in range(args.repeat):
+            cmd = [sys.executable, __file__, args.epub_file, '--variant', variant]
+            output = subprocess.run(cmd, capture_output=True, text=True, check=True).stdout
+            results.append(json.loads(output.strip().splitlines()[-1]))
+
+    for variant in VARIANTS:
+        runs = [r for r in results if r['variant'] == variant]
+        best = min(runs, key=lambda r: r['wall_time'])
+        print(f"{variant:8s} chapters={best['chapters']:4d} "
+              f"wall={best['wall_time']:.3f}s "
+              f"rss={best['peak_rss_bytes'] / 2**20:.1f}MiB "
+              f"disk={best['peak_disk_bytes'] / 2**20:.1f}MiB")
+
+
+if __name__ == '__main__':
+    main()
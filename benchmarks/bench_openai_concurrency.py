@@ -0,0 +1,148 @@
+"""
+Measure summarization throughput, peak thread count and peak RSS at several
+concurrency levels against the local mock OpenAI server.
+
+Compares the shared AsyncOpenAI client path with the previous synchronous
+client wrapped in asyncio.to_thread. Each run uses a fresh interpreter.
+Thread and RSS sampling reads /proc, so this is Linux-only.
+
+    python benchmarks/bench_openai_concurrency.py --requests 256 --latency 0.2
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+CONCURRENCY_LEVELS = [8, 32, 128]
+
+
+def proc_status():
+    status = {}
+    with open('/proc/self/status') as f:
+        for line in f:
+            key, _, value = line.partition(':')
+            status[key] = value.strip()
+    return int(status['Threads']), int(status['VmRSS'].split()[0]) * 1024
+
+
+async def sample_peaks(peaks, stop):
+    while not stop.is_set():
+        threads, rss = proc_status()
+        peaks['threads'] = max(peaks['threads'], threads)
+        peaks['rss'] = max(peaks['rss'], rss)
+        await asyncio.sleep(0.01)
+
+
+async def run_async(chapters, concurrency):
+    from speedread.openai_client import close_client, get_client
+    from speedread.speedread_cli import summarize_chapters
+
+    client = get_client(concurrency)
+    try:
+        await summarize_chapters(client, chapters, concurrency)
+    finally:
+        await close_client()
+
+
+async def run_threads(chapters, concurrency):
+    from openai import OpenAI
+    from speedread.summarize_book import MODEL
+
+    client = OpenAI()
+    semaphore = asyncio.Semaphore(concurrency)
+
+    def summarize(chapter):
+        return client.chat.completions.create(
+            model=MODEL,
+            messages=[{"role": "user", "content": chapter['content']}],
+            max_tokens=1000,
+        )
+
+    async def bounded(chapter):
+        async with semaphore:
+            return await asyncio.to_thread(summarize, chapter)
+
+    await asyncio.gather(*(bounded(chapter) for chapter in chapters))
+
+
+MODES = {
+    'async': run_async,
+    'threads': run_threads,
+}
+
+
+async def run_mode(mode, requests, concurrency):
+    chapters = [{'title': f'Chapter {i}', 'content': 'lorem ipsum ' * 500} for i in range(requests)]
+    peaks = {'threads': 0, 'rss': 0}
+    stop = asyncio.Event()
+    sampler = asyncio.create_task(sample_peaks(peaks, stop))
+    start = time.perf_counter()
+    await MODES[mode](chapters, concurrency)
+    wall_time = time.perf_counter() - start
+    stop.set()
+    await sampler
+    return {
+        'mode': mode,
+        'concurrency': concurrency,
+        'requests': requests,
+        'wall_time': wall_time,
+        'requests_per_second': requests / wall_time,
+        'peak_threads': peaks['threads'],
+        'peak_rss_bytes': peaks['rss'],
+    }
+
+
+def start_mock_server(latency):
+    from tests.mock_openai import make_server
+    server = make_server(latency=latency)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark OpenAI client concurrency.')
+    parser.add_argument('--requests', type=int, default=256, help='Requests per run')
+    parser.add_argument('--latency', type=float, default=0.2, help='Mock server latency in seconds')
+    parser.add_argument('-o', '--output', help='Path to save the results as JSON', default=None)
+    parser.add_argument('--mode', choices=MODES, help=argparse.SUPPRESS)
+    parser.add_argument('--concurrency', type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.mode:
+        result = asyncio.run(run_mode(args.mode, args.requests, args.concurrency))
+        print(json.dumps(result))
+        return
+
+    # The server runs in this parent process so it never counts against the client
+    server = start_mock_server(args.latency)
+    env = dict(os.environ,
+               OPENAI_BASE_URL=f'http://127.0.0.1:{server.server_port}/v1',
+               OPENAI_API_KEY='mock')
+
+    results = []
+    for concurrency in CONCURRENCY_LEVELS:
+        for mode in MODES:
+            cmd = [sys.executable, __file__, '--mode', mode, '--concurrency', str(concurrency),
+                   '--requests', str(args.requests)]
+            output = subprocess.run(cmd, capture_output=True, text=True, check=True, env=env).stdout
+            result = json.loads(output.strip().splitlines()[-1])
+            results.append(result)
+            print(f"{mode:8s} c={concurrency:4d} "
+                  f"{result['requests_per_second']:8.1f} req/s "
+                  f"threads={result['peak_threads']:4d} "
+                  f"rss={result['peak_rss_bytes'] / 2**20:.1f}MiB")
+    server.shutdown()
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
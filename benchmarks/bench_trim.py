@@ -0,0 +1,116 @@
+"""
+Measure the rule-based chapter trimmer against a labeled corpus of TOCs.
+
+Reports how many books the rules resolve without an API call, their
+accuracy, and the latency saved. With --llm, the books the rules are not
+confident about are also sent to the model (set OPENAI_API_KEY, or
+OPENAI_BASE_URL to the mock server) to measure the fallback's accuracy
+and real latency.
+
+    python benchmarks/bench_trim.py
+    python benchmarks/bench_trim.py --llm -o trim_results.json
+"""
+import argparse
+import asyncio
+import json
+import sys
+import time
+from pathlib import Path
+
+BENCHMARKS_DIR = Path(__file__).resolve().parent
+REPO_DIR = BENCHMARKS_DIR.parent
+sys.path.insert(0, str(REPO_DIR))
+
+from speedread.trim_chapters import ask_for_bounds, classify_chapters  # noqa: E402
+
+
+async def run_llm(books):
+    from speedread.openai_client import close_client, get_client
+    client = get_client()
+    results = []
+    try:
+        for book in books:
+            metadata = {'title': book['book'], 'author': '', 'chapters': book['chapters']}
+            start = time.perf_counter()
+            bounds = await ask_for_bounds(metadata, client)
+            results.append((bounds, time.perf_counter() - start))
+    finally:
+        await close_client()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark rule-based chapter trimming.')
+    parser.add_argument('--corpus', default=str(BENCHMARKS_DIR / 'trim_corpus.json'), help='Labeled TOC corpus')
+    parser.add_argument('--llm', action='store_true', help='Also run the LLM fallback on the uncertain books')
+    parser.add_argument('--llm-latency', type=float, default=3.0,
+                        help='Assumed seconds per LLM trim call when --llm is not given')
+    parser.add_argument('-o', '--output', help='Write per-book results as JSON')
+    args = parser.parse_args()
+
+    with open(args.corpus, 'r', encoding='utf-8') as f:
+        books = json.load(f)['books']
+
+    rows = []
+    for book in books:
+        start = time.perf_counter()
+        first, last, confident = classify_chapters(book['chapters'])
+        elapsed = time.perf_counter() - start
+        rows.append({
+            'book': book['book'],
+            'expected': [book['first'], book['last']],
+            'rules': [first, last],
+            'confident': confident,
+            'rules_correct': (first, last) == (book['first'], book['last']),
+            'rules_ms': round(elapsed * 1000, 3),
+        })
+
+    uncertain = [book for book, row in zip(books, rows) if not row['confident']]
+    llm_seconds = []
+    if args.llm and uncertain:
+        uncertain_rows = [row for row in rows if not row['confident']]
+        for row, (bounds, elapsed) in zip(uncertain_rows, asyncio.run(run_llm(uncertain))):
+            row['llm'] = list(bounds) if bounds else None
+            row['llm_correct'] = bounds == tuple(row['expected'])
+            row['llm_seconds'] = round(elapsed, 3)
+            llm_seconds.append(elapsed)
+
+    confident_rows = [row for row in rows if row['confident']]
+    for row in rows:
+        final = row['rules'] if row['confident'] else (row.get('llm') or row['rules'])
+        row['final_correct'] = final == row['expected']
+        mark = 'ok ' if row['final_correct'] else 'BAD'
+        source = 'rules' if row['confident'] else ('llm' if 'llm' in row else 'rules?')
+        print(f"{mark} {source:6} {row['book']}: expected {row['expected']}, rules {row['rules']}"
+              + (f", llm {row['llm']}" if 'llm' in row else ''))
+
+    llm_latency = sum(llm_seconds) / len(llm_seconds) if llm_seconds else args.llm_latency
+    summary = {
+        'books': len(rows),
+        'resolved_by_rules': len(confident_rows),
+        'rules_accuracy_when_confident': (sum(row['rules_correct'] for row in confident_rows) / len(confident_rows)
+                                          if confident_rows else None),
+        'rules_accuracy_overall': sum(row['rules_correct'] for row in rows) / len(rows),
+        'rules_ms_total': round(sum(row['rules_ms'] for row in rows), 3),
+        'llm_latency_seconds': round(llm_latency, 3),
+        'llm_latency_measured': bool(llm_seconds),
+        'latency_saved_seconds': round(len(confident_rows) * llm_latency, 1),
+    }
+    if args.llm:
+        summary['final_accuracy'] = sum(row['final_correct'] for row in rows) / len(rows)
+
+    print(f"\nResolved by rules: {summary['resolved_by_rules']}/{summary['books']}, "
+          f"accuracy when confident {summary['rules_accuracy_when_confident']:.0%}, "
+          f"{summary['rules_ms_total']:.1f} ms in total")
+    print(f"Latency saved: ~{summary['latency_saved_seconds']}s "
+          f"({'measured' if llm_seconds else 'assumed'} {llm_latency:.2f}s per LLM call)")
+    if args.llm:
+        print(f"Final accuracy with LLM fallback: {summary['final_accuracy']:.0%}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({'summary': summary, 'books': rows}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+"""
+Kill speedread at random points and check that it resumes from its manifest.
+
+The book is first processed once without interruption to get reference
+output. It is then processed again in a fresh directory: each attempt is
+SIGKILLed after a random delay, until a run finishes on its own. The
+resumed output must match the reference, every journaled audio file must
+be intact, and the API request count shows how much work was repeated.
+
+    python benchmarks/fault_injection.py book.epub --kills 10 --seed 1
+"""
+import argparse
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+REPO_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_DIR))
+
+from tests.crash_resume import (audio_durations, book_outputs, check_manifest, mock_api_env,  # noqa: E402
+                                run_to_completion, run_with_kills)
+from tests.mock_openai import make_server  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Crash-and-resume test for the speedread pipeline.')
+    parser.add_argument('epub_file', help='Path to the EPUB file')
+    parser.add_argument('--kills', type=int, default=10, help='Number of times to kill the process')
+    parser.add_argument('--max-delay', type=float, default=3.0, help='Longest run before a kill, in seconds')
+    parser.add_argument('--latency', type=float, default=0.2, help='Mock server latency in seconds')
+    parser.add_argument('--seed', type=int, default=None, help='Random seed for kill timing')
+    parser.add_argument('--pipeline', action='store_true', help='Run speedread with --pipeline')
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    extra_args = ['--pipeline'] if args.pipeline else []
+    server = make_server(latency=args.latency)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    env = mock_api_env(server)
+
+    with tempfile.TemporaryDirectory() as reference_dir, tempfile.TemporaryDirectory() as crash_dir:
+        print("Reference run...")
+        reference_epub = Path(reference_dir) / Path(args.epub_file).name
+        shutil.copy(args.epub_file, reference_epub)
+        run_to_completion(reference_epub, env, extra_args)
+        reference_requests = sum(server.request_counts.values())
+        reference_output_dir, reference_summaries, reference_audio = book_outputs(reference_dir)
+        reference_durations = audio_durations(reference_output_dir)
+
+        print(f"Crash run with up to {args.kills} kills...")
+        server.request_counts.clear()
+        crash_epub = Path(crash_dir) / Path(args.epub_file).name
+        shutil.copy(args.epub_file, crash_epub)
+        start = time.perf_counter()
+        killed = run_with_kills(crash_epub, env, extra_args, args.kills, args.max_delay, rng)
+        elapsed = time.perf_counter() - start
+        crash_requests = sum(server.request_counts.values())
+        output_dir, summaries, audio = book_outputs(crash_dir)
+
+        problems = check_manifest(output_dir)
+        if summaries != reference_summaries:
+            problems.append("summaries differ from the reference run")
+        if audio != reference_audio:
+            problems.append("audio files differ from the reference run")
+        for name, duration in audio_durations(output_dir).items():
+            if duration != reference_durations.get(name):
+                problems.append(f"{name}: {duration:.3f}s, {reference_durations.get(name)}s in the reference run")
+
+    server.shutdown()
+    print(f"Killed {killed} times, finished in {elapsed:.1f}s")
+    print(f"API requests: {crash_requests} with crashes vs {reference_requests} without")
+    if problems:
+        for problem in problems:
+            print(f"FAIL: {problem}")
+        sys.exit(1)
+    print("OK: resumed output matches the reference run")
+
+
+if __name__ == '__main__':
+    main()
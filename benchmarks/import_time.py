@@ -0,0 +1,74 @@
+"""
+Check the startup cost of the speedread entry points against a budget.
+
+Each module is imported in a fresh interpreter with `-X importtime`. The
+check fails when the import takes longer than --budget-ms (median over
+--repeat runs) or when it loads one of the heavy dependencies that must
+only be imported on first use (openai, httpx, bs4, lxml, jinja2, tqdm,
+tiktoken). `speedread --help` is timed end to end as well, since that is
+what every short invocation and container start pays.
+
+    python benchmarks/import_time.py
+    python benchmarks/import_time.py --budget-ms 150 --top 15
+"""
+import argparse
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+REPO_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_DIR))
+
+from tests.import_profile import HEAVY_DEPENDENCIES, import_profile, python_env  # noqa: E402
+
+MODULES = ('speedread.speedread_cli', 'speedread.static_site')
+
+
+def time_command(argv, repeat):
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run(argv, capture_output=True, check=True, env=python_env(), cwd=REPO_DIR)
+        durations.append(time.perf_counter() - start)
+    return statistics.median(durations)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Check the import time of the speedread entry points.')
+    parser.add_argument('--budget-ms', type=float, default=200,
+                        help='Largest accepted median import time per module in ms (default: 200)')
+    parser.add_argument('--repeat', type=int, default=5, help='Number of imports per module')
+    parser.add_argument('--top', type=int, default=10, help='Show the slowest imports of each module')
+    args = parser.parse_args()
+
+    # Compile once so the runs below measure imports, not bytecode compilation
+    import_profile(MODULES[0])
+
+    failures = []
+    for module in MODULES:
+        runs = [import_profile(module) for _ in range(args.repeat)]
+        total_ms = statistics.median(total for total, _ in runs) / 1000
+        timings = runs[-1][1]
+        heavy = sorted({name.split('.')[0] for name in timings} & set(HEAVY_DEPENDENCIES))
+        print(f"{module}: {total_ms:.1f} ms (budget {args.budget_ms:.0f} ms)")
+        slowest = sorted(timings.items(), key=lambda item: item[1][0], reverse=True)[:args.top]
+        for name, (self_us, cumulative_us) in slowest:
+            print(f"  {self_us / 1000:7.1f} ms self {cumulative_us / 1000:8.1f} ms total  {name}")
+        if total_ms > args.budget_ms:
+            failures.append(f"{module} imports in {total_ms:.1f} ms, over the {args.budget_ms:.0f} ms budget")
+        if heavy:
+            failures.append(f"{module} imports {', '.join(heavy)} at import time")
+
+    help_seconds = time_command([sys.executable, '-m', 'speedread.speedread_cli', '--help'], args.repeat)
+    print(f"speedread --help: {help_seconds * 1000:.1f} ms")
+
+    if failures:
+        print('\nFAILED:\n  ' + '\n  '.join(failures))
+        sys.exit(1)
+    print('\nOK')
+
+
+if __name__ == '__main__':
+    main()
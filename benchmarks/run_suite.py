@@ -0,0 +1,215 @@
+"""
+Reproducible end-to-end benchmark of the speedread pipeline.
+
+A synthetic EPUB is generated with tests/make_epub.py and the mock OpenAI server
+runs in process with the given latency and 429 rate. Each repeat then times:
+
+- `epub_to_json` on its own,
+- a full `speedread` run through `speedread_cli.async_main`, broken down
+  into stages with the run_report.json it writes,
+- with --audiobook, `create_audiobook` from the run's MP3s into fresh AAC
+  segments (needs ffmpeg).
+
+Medians over the repeats are written as JSON together with the commit and
+environment. Pass an earlier result file with --compare to print the change
+per metric and exit non-zero when something got slower than --threshold.
+
+    python benchmarks/run_suite.py --chapters 40 --latency 0.1 -o results.json
+    python benchmarks/run_suite.py --chapters 40 --latency 0.1 --rate-limit-rate 0.05 --compare results.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+REPO_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_DIR))
+
+from tests.make_epub import TOC_SHAPES, make_epub  # noqa: E402
+from tests.mock_openai import make_server  # noqa: E402
+
+# Metrics below this many seconds are too noisy to flag as regressions
+MIN_COMPARED_SECONDS = 0.05
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=REPO_DIR, capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def time_epub_to_json(epub_path, workers):
+    from speedread.epub2json import epub_to_json
+    from speedread.openai_client import close_client, get_client
+    try:
+        start = time.perf_counter()
+        book = await epub_to_json(str(epub_path), get_client(), workers=workers)
+        elapsed = time.perf_counter() - start
+    finally:
+        await close_client()
+    if not book:
+        raise RuntimeError(f"epub_to_json failed on {epub_path}")
+    return elapsed, len(book['chapters'])
+
+
+def time_cli(epub_path, args):
+    from speedread import speedread_cli
+    argv = [str(epub_path), '-y', '--no-cache', '--concurrency', str(args.concurrency)]
+    if args.audiobook:
+        argv.append('--audiobook')
+    if args.pipeline:
+        argv.append('--pipeline')
+    saved_argv = sys.argv
+    sys.argv = ['speedread', *argv]
+    try:
+        start = time.perf_counter()
+        asyncio.run(speedread_cli.run())
+        elapsed = time.perf_counter() - start
+    finally:
+        sys.argv = saved_argv
+    output_dir = epub_path.parent / f"{epub_path.stem}_speedread"
+    with open(output_dir / 'run_report.json', 'r', encoding='utf-8') as f:
+        report = json.load(f)
+    if report['status'] != 'completed':
+        raise RuntimeError(f"speedread run {report['status']}, see {output_dir}")
+    return elapsed, report, output_dir
+
+
+def time_create_audiobook(output_dir):
+    from speedread.create_audiobook import create_audiobook
+    segments_dir = output_dir / 'bench_aac_chapters'
+    shutil.rmtree(segments_dir, ignore_errors=True)
+    start = time.perf_counter()
+    create_audiobook(output_dir / 'audio_chapters', output_dir / 'bench_audiobook.m4b',
+                     output_dir / f"{output_dir.name[:-len('_speedread')]}_summary.json", segments_dir)
+    return time.perf_counter() - start
+
+
+def run_once(work_dir, args, server):
+    epub_path = work_dir / 'bench_book.epub'
+    start = time.perf_counter()
+    make_epub(epub_path, args.chapters, args.chapter_kb, args.image_kb, args.toc, args.parts, args.seed)
+    metrics = {'generate_epub': time.perf_counter() - start}
+
+    metrics['epub_to_json'], chapters = asyncio.run(time_epub_to_json(epub_path, args.workers))
+
+    server.request_counts.clear()
+    metrics['cli_total'], report, output_dir = time_cli(epub_path, args)
+    for name, stage in report['stages'].items():
+        metrics[f'stage.{name}'] = stage.get('wall_seconds', stage['seconds'])
+    counters = {
+        'chapters': chapters,
+        'requests': sum(count for path, count in server.request_counts.items() if path != '429'),
+        'rate_limited': server.request_counts.get('429', 0),
+        'retries': sum(stage.get('retries', 0) for stage in report['stages'].values()),
+        'prompt_tokens': sum(usage.get('prompt_tokens', 0) for usage in report['usage'].values()),
+        'tts_characters': sum(usage.get('characters', 0) for usage in report['usage'].values()),
+    }
+
+    if args.audiobook:
+        metrics['create_audiobook'] = time_create_audiobook(output_dir)
+    return metrics, counters
+
+
+def compare(results, baseline_file, threshold):
+    """Print the change of every median against a baseline. Returns the regressed metrics."""
+    with open(baseline_file, 'r', encoding='utf-8') as f:
+        baseline = json.load(f)
+    if baseline['params'] != results['params']:
+        print("Warning: the baseline was run with different parameters")
+    print(f"\nCompared with {baseline_file} (commit {(baseline.get('commit') or 'unknown')[:10]}):")
+    regressions = []
+    for name, value in results['median'].items():
+        old = baseline['median'].get(name)
+        if old is None:
+            print(f"  {name:24} {value:9.3f}s  (new)")
+            continue
+        change = (value - old) / old if old else 0.0
+        flag = ''
+        if old >= MIN_COMPARED_SECONDS and change > threshold:
+            flag = '  REGRESSION'
+            regressions.append(name)
+        print(f"  {name:24} {old:9.3f}s -> {value:9.3f}s  {change:+7.1%}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run the end-to-end speedread benchmark suite.')
+    parser.add_argument('--chapters', type=int, default=20, help='Number of chapters in the synthetic book')
+    parser.add_argument('--chapter-kb', type=int, default=20, help='Text per chapter in KB')
+    parser.add_argument('--image-kb', type=int, default=0, help='Image payload per chapter in KB')
+    parser.add_argument('--toc', choices=TOC_SHAPES, default='both', help='Navigation documents in the EPUB')
+    parser.add_argument('--parts', type=int, default=0, help='Group the chapters under this many part pages')
+    parser.add_argument('--seed', type=int, default=1, help='Seed for the book text and the 429 injection')
+    parser.add_argument('--latency', type=float, default=0.05, help='Mock server latency per request in seconds')
+    parser.add_argument('--rate-limit-rate', type=float, default=0.0,
+                        help='Fraction of mock chat and speech requests answered with 429')
+    parser.add_argument('--concurrency', type=int, default=8, help='API concurrency of the speedread run')
+    parser.add_argument('--workers', type=int, default=None, help='Processes for chapter text extraction')
+    parser.add_argument('--audiobook', action='store_true', help='Also run TTS and build the audiobook (needs ffmpeg)')
+    parser.add_argument('--pipeline', action='store_true', help='Run speedread with --pipeline')
+    parser.add_argument('--repeat', type=int, default=3, help='Number of repeats; medians are reported')
+    parser.add_argument('-o', '--output', help='Write the results as JSON')
+    parser.add_argument('--compare', help='Earlier results JSON to compare against')
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help='Relative slowdown reported as a regression (default: 0.2)')
+    args = parser.parse_args()
+
+    if args.audiobook and not shutil.which('ffmpeg'):
+        sys.exit("--audiobook needs ffmpeg on the PATH")
+
+    server = make_server(latency=args.latency, rate_limit_rate=args.rate_limit_rate, seed=args.seed)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    os.environ['OPENAI_BASE_URL'] = f'http://127.0.0.1:{server.server_port}/v1'
+    os.environ.setdefault('OPENAI_API_KEY', 'mock')
+
+    runs = []
+    try:
+        for i in range(args.repeat):
+            with tempfile.TemporaryDirectory() as work_dir:
+                metrics, counters = run_once(Path(work_dir), args, server)
+            runs.append({'metrics': metrics, 'counters': counters})
+            print(f"Run {i + 1}/{args.repeat}: " + ', '.join(f"{name} {value:.3f}s" for name, value in metrics.items()))
+    finally:
+        server.shutdown()
+
+    names = list(dict.fromkeys(name for run in runs for name in run['metrics']))
+    results = {
+        'commit': git_commit(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'params': {key: value for key, value in vars(args).items() if key not in ('output', 'compare', 'threshold')},
+        'median': {name: statistics.median(run['metrics'][name] for run in runs if name in run['metrics'])
+                   for name in names},
+        'counters': runs[-1]['counters'],
+        'runs': runs,
+    }
+
+    print("\nMedian seconds:")
+    for name, value in results['median'].items():
+        print(f"  {name:24} {value:9.3f}")
+    print(f"Counters: {results['counters']}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"Results saved to {args.output}")
+
+    if args.compare and compare(results, args.compare, args.threshold):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+"""
+Build a small audiobook and check its chapters and tags by parsing the MP4 atoms.
+
+Chapter MP3s are made of silent frames with known durations, so the chapter
+start times in the Nero `chpl` atom can be compared with the expected ones.
+The iTunes tags are read back from `moov/udta/meta/ilst`, and the QuickTime
+chapter track is looked up through its `tref/chap` reference. Needs ffmpeg.
+
+    python benchmarks/verify_m4b.py --chapters 5
+"""
+import argparse
+import sys
+import tempfile
+from pathlib import Path
+
+REPO_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_DIR))
+
+from tests.m4b_helpers import FRAME_SECONDS, build_book, find, has_chapter_track, parse_chpl, parse_ilst, read_atoms  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Verify the chapters and tags written into an M4B.')
+    parser.add_argument('--chapters', type=int, default=5, help='Number of chapters')
+    parser.add_argument('--tolerance', type=float, default=0.1,
+                        help='Allowed chapter start drift in seconds (AAC frames do not align with MP3 frames)')
+    args = parser.parse_args()
+
+    author, title = 'Test Author', 'Test Title: A = B'
+    chapter_frames = [200 + 37 * i for i in range(args.chapters)]
+    problems = []
+    with tempfile.TemporaryDirectory() as work_dir:
+        output_file = build_book(Path(work_dir), chapter_frames, author, title)
+        atoms = read_atoms(output_file.read_bytes())
+
+    moov = find(atoms, b'moov')
+    if not moov:
+        sys.exit("FAIL: no moov atom")
+
+    chpl = find(moov[2], b'udta', b'chpl')
+    chapters = parse_chpl(chpl[1]) if chpl else []
+    if len(chapters) != args.chapters:
+        problems.append(f"expected {args.chapters} chapters in chpl, found {len(chapters)}")
+    expected_start = 0.0
+    for i, ((start, chapter_title), frames) in enumerate(zip(chapters, chapter_frames), 1):
+        expected_title = f"Chapter {i}: Part {i}; the = #{i}"
+        if chapter_title != expected_title:
+            problems.append(f"chapter {i}: title {chapter_title!r}, expected {expected_title!r}")
+        if abs(start - expected_start) > args.tolerance:
+            problems.append(f"chapter {i}: starts at {start:.3f}s, expected {expected_start:.3f}s")
+        expected_start += frames * FRAME_SECONDS
+
+    if not has_chapter_track(moov[2]):
+        problems.append("no QuickTime chapter track (trak/tref/chap)")
+
+    ilst = find(moov[2], b'udta', b'meta', b'ilst')
+    tags = parse_ilst(ilst[2]) if ilst else {}
+    expected_tags = {'title': title, 'album': title, 'artist': author, 'album_artist': author,
+                     'composer': author, 'genre': 'Audiobook'}
+    for key, value in expected_tags.items():
+        if tags.get(key) != value:
+            problems.append(f"tag {key}: {tags.get(key)!r}, expected {value!r}")
+
+    for start, chapter_title in chapters:
+        print(f"  {start:8.3f}s  {chapter_title}")
+    print(f"  tags: {tags}")
+    if problems:
+        for problem in problems:
+            print(f"FAIL: {problem}")
+        sys.exit(1)
+    print("OK: chapters and tags match")
+
+
+if __name__ == '__main__':
+    main()
@@ -1 +1,7 @@
-from .speedread_cli import main as cli_main
+def __getattr__(name):
+    # Importing the package (or any of its modules) must not load the CLI
+    # and everything it imports; cli_main is resolved on first access
+    if name == 'cli_main':
+        from .speedread_cli import main
+        return main
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
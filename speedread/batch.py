@@ -0,0 +1,147 @@
+import asyncio
+import glob
+import json
+import logging
+import time
+from pathlib import Path
+from speedread.batch_api import summarize_with_batch_api
+from speedread.speedread_cli import book_output_dir, load_content_store, process_book, select_main_chapters
+from speedread.utils import atomic_write
+
+
+def find_epubs(inputs):
+    """Expand files, directories and glob patterns into a de-duplicated list of EPUBs."""
+    epubs = []
+    for entry in inputs:
+        path = Path(entry)
+        if path.is_dir():
+            matches = sorted(path.glob('*.epub'))
+        elif path.is_file():
+            matches = [path]
+        else:
+            matches = sorted(Path(match) for match in glob.glob(entry, recursive=True))
+        for match in matches:
+            if match.suffix.lower() == '.epub' and match not in epubs:
+                epubs.append(match)
+    return epubs
+
+
+async def run_batch(inputs, args, client, cache=None, report_file='batch_report.json', books_in_flight=4,
+                    audio_cache=None):
+    """
+    Process many books under one API concurrency budget.
+
+    Several books run at once so that while one is parsing, trimming or in
+    ffmpeg, the others keep the shared API slots busy. A failing book is
+    recorded in the report and does not stop the rest; the report is
+    written even when the run itself is interrupted.
+    """
+    epubs = find_epubs(inputs)
+    if not epubs:
+        logging.error("No EPUB files found.")
+        return None
+    logging.info(f"Batch: {len(epubs)} books, {books_in_flight} at a time, API concurrency {args.concurrency}")
+
+    api_semaphore = asyncio.Semaphore(args.concurrency)
+    book_semaphore = asyncio.Semaphore(books_in_flight)
+    results = {}
+
+    async def run_one(epub_path, batch_error=None):
+        async with book_semaphore:
+            start = time.monotonic()
+            # A book whose batch summaries failed is not summarized live at full price behind the user's back
+            status = 'failed'
+            error = str(batch_error) if batch_error else None
+            if not batch_error:
+                try:
+                    status = await process_book(epub_path, args, client, cache, api_semaphore, audio_cache)
+                except Exception as e:
+                    logging.exception(f"Batch: {epub_path} failed")
+                    error = str(e)
+            elapsed = time.monotonic() - start
+            logging.info(f"Batch: {epub_path.name} {status} in {elapsed:.1f}s")
+            results[epub_path] = {'epub': str(epub_path), 'status': status, 'error': error,
+                                  'seconds': round(elapsed, 2)}
+
+    start = time.monotonic()
+    try:
+        batch_errors = {}
+        if getattr(args, 'batch_api', False):
+            # Summaries come from one Batch API job; process_book then finds them
+            # on disk and only renders HTML and, with --audiobook, the audio.
+            batch_errors = await summarize_books_with_batch_api(epubs, args, client, cache, book_semaphore,
+                                                                api_semaphore)
+        await asyncio.gather(*[run_one(epub_path, batch_errors.get(epub_path)) for epub_path in epubs])
+    finally:
+        # Books that never finished, e.g. on Ctrl-C, are still listed
+        books = [results.get(epub_path, {'epub': str(epub_path), 'status': 'interrupted', 'error': None,
+                                         'seconds': None})
+                 for epub_path in epubs]
+        report = {
+            'books': books,
+            'total': len(books),
+            'completed': sum(book['status'] == 'completed' for book in books),
+            'failed': sum(book['status'] == 'failed' for book in books),
+            'seconds': round(time.monotonic() - start, 2),
+        }
+        if cache:
+            report['cache'] = cache.stats()
+        if audio_cache:
+            report['audio_cache'] = audio_cache.stats()
+
+        with atomic_write(report_file) as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        logging.info(f"Batch finished: {report['completed']}/{report['total']} completed, "
+                     f"{report['failed']} failed. Report saved to {report_file}")
+        for book in books:
+            if book['status'] != 'completed':
+                logging.warning(f"  {book['status']}: {book['epub']} {book['error'] or ''}")
+    return report
+
+
+async def summarize_books_with_batch_api(epubs, args, client, cache, book_semaphore, api_semaphore=None):
+    """
+    Summarize every book without a summary yet in one Batch API job.
+
+    Returns {epub path: exception} for the books whose summaries could not
+    be produced; a book that fails to parse is left to process_book.
+    """
+    async def prepare(epub_path):
+        async with book_semaphore:
+            safe_title, output_dir = book_output_dir(epub_path)
+            summary_json_file = output_dir / f"{safe_title}_summary.json"
+            if summary_json_file.exists():
+                return None
+            try:
+                store = await load_content_store(epub_path, output_dir, safe_title, args, client, cache)
+                if not store:
+                    return None
+                trimmed_content = await select_main_chapters(store, client, cache)
+            except Exception:
+                # process_book will retry this book and record the failure
+                logging.exception(f"Batch API: could not prepare {epub_path}")
+                return None
+            return {
+                'title': store.title,
+                'author': store.author,
+                'chapters': trimmed_content['chapters'],
+                'summary_json_file': summary_json_file,
+                'html_file': output_dir / f"{safe_title}_summary.html",
+            }
+
+    prepared = await asyncio.gather(*[prepare(epub_path) for epub_path in epubs])
+    epubs, books = [epub for epub, book in zip(epubs, prepared) if book], [book for book in prepared if book]
+    if not books:
+        logging.info("Batch API: every book already has a summary")
+        return {}
+    logging.info(f"Batch API: summarizing {sum(len(book['chapters']) for book in books)} chapters "
+                 f"from {len(books)} books")
+    try:
+        errors = await summarize_with_batch_api(client, books, Path(args.batch_state), cache,
+                                                args.chunk_tokens, args.reduce_fan_in, args.poll_interval,
+                                                api_semaphore)
+    except Exception as e:
+        # Submitting, polling or downloading the batch failed: no book got its summaries
+        logging.exception("Batch API: the batch failed")
+        errors = [e] * len(books)
+    return {epub_path: error for epub_path, error in zip(epubs, errors) if error}
@@ -0,0 +1,227 @@
+import asyncio
+import io
+import json
+import logging
+from pathlib import Path
+from speedread.compile_summaries import write_html
+from speedread.manifest import content_hash
+from speedread.rate_limiter import call_with_retry, is_retryable
+from speedread.summarize_book import (
+    DEFAULT_CHUNK_TOKENS, DEFAULT_REDUCE_FAN_IN, SUMMARIZER_PROMPT, build_request, chapter_prompts, complete,
+    reduce_summaries
+)
+from speedread.utils import atomic_write
+
+BATCH_ENDPOINT = '/v1/chat/completions'
+COMPLETION_WINDOW = '24h'
+DEFAULT_POLL_INTERVAL = 60
+FINAL_STATUSES = {'completed', 'failed', 'expired', 'cancelled'}
+# Rate limiter key of the files and batches endpoints, which are not billed per model
+BATCH_API_LIMITER = 'batch-api'
+# Polls in a row that may fail after their own retries before waiting is given up
+MAX_FAILED_POLLS = 5
+
+
+def cache_key(cache, prompt):
+    body = build_request(SUMMARIZER_PROMPT, prompt)
+    return cache.key(body['model'], SUMMARIZER_PROMPT, prompt, body['max_tokens'])
+
+
+def build_batch_requests(books, chunk_tokens=DEFAULT_CHUNK_TOKENS, cache=None):
+    """
+    Turn the chapters of every book into Batch API request lines.
+
+    `books` is a list of (title, chapters). Each chapter contributes one
+    request per map-step prompt; prompts already in the response cache are
+    left out. Returns the request lines and a plan mapping each chapter to
+    its custom_ids.
+    """
+    lines = []
+    plan = []
+    for book_index, (_, chapters) in enumerate(books):
+        book_plan = []
+        for chapter_index, chapter in enumerate(chapters):
+            prompts = chapter_prompts(chapter['title'], chapter['content'], chunk_tokens)
+            custom_ids = []
+            for part_index, prompt in enumerate(prompts):
+                custom_id = f"{book_index}-{chapter_index}-{part_index}"
+                custom_ids.append(custom_id)
+                if cache and cache.get(cache_key(cache, prompt)) is not None:
+                    continue
+                lines.append({
+                    'custom_id': custom_id,
+                    'method': 'POST',
+                    'url': BATCH_ENDPOINT,
+                    'body': build_request(SUMMARIZER_PROMPT, prompt),
+                })
+            book_plan.append({'title': chapter['title'], 'custom_ids': custom_ids, 'prompts': prompts})
+        plan.append(book_plan)
+    return lines, plan
+
+
+def parse_batch_output(text):
+    results = {}
+    for line in text.splitlines():
+        if not line.strip():
+            continue
+        entry = json.loads(line)
+        response = entry.get('response') or {}
+        if response.get('status_code') == 200:
+            results[entry['custom_id']] = response['body']['choices'][0]['message']['content']
+        else:
+            logging.warning(f"Batch request {entry['custom_id']} failed: {entry.get('error') or response}")
+    return results
+
+
+async def submit_batch(client, lines, description):
+    payload = ''.join(json.dumps(line, ensure_ascii=False) + '\n' for line in lines).encode('utf-8')
+    # A fresh file object per attempt, since a failed upload may have read the last one
+    input_file = await call_with_retry(BATCH_API_LIMITER, 0, lambda: client.files.create(
+        file=('speedread_batch.jsonl', io.BytesIO(payload)), purpose='batch'))
+    batch = await call_with_retry(BATCH_API_LIMITER, 0, lambda: client.batches.create(
+        input_file_id=input_file.id,
+        endpoint=BATCH_ENDPOINT,
+        completion_window=COMPLETION_WINDOW,
+        metadata={'description': description},
+    ))
+    logging.info(f"Submitted batch {batch.id} with {len(lines)} requests")
+    return batch
+
+
+async def wait_for_batch(client, batch_id, poll_interval=DEFAULT_POLL_INTERVAL):
+    """
+    Poll a batch until it reaches a final status.
+
+    Each poll is retried with backoff; a poll that still fails with a
+    transient error is skipped, since the batch keeps running on the server,
+    unless MAX_FAILED_POLLS fail in a row.
+    """
+    failed_polls = 0
+    while True:
+        try:
+            batch = await call_with_retry(BATCH_API_LIMITER, 0, lambda: client.batches.retrieve(batch_id))
+        except Exception as e:
+            failed_polls += 1
+            if not is_retryable(e) or failed_polls >= MAX_FAILED_POLLS:
+                raise
+            logging.warning(f"Batch {batch_id}: could not get its status ({type(e).__name__}), "
+                            f"polling again in {poll_interval}s")
+            await asyncio.sleep(poll_interval)
+            continue
+        failed_polls = 0
+        counts = batch.request_counts
+        if counts:
+            logging.info(f"Batch {batch_id}: {batch.status}, {counts.completed}/{counts.total} done, {counts.failed} failed")
+        else:
+            logging.info(f"Batch {batch_id}: {batch.status}")
+        if batch.status in FINAL_STATUSES:
+            return batch
+        await asyncio.sleep(poll_interval)
+
+
+async def fetch_batch_results(client, batch):
+    results = {}
+    for file_id in (batch.output_file_id, batch.error_file_id):
+        if file_id:
+            content = await call_with_retry(BATCH_API_LIMITER, 0, lambda: client.files.content(file_id))
+            results.update(parse_batch_output(content.text))
+    return results
+
+
+async def merge_chapter(client, plan_entry, results, cache=None, reduce_fan_in=DEFAULT_REDUCE_FAN_IN, semaphore=None):
+    """
+    Build one chapter summary from batch results, filling any gaps with live
+    calls. Every live call takes a slot of `semaphore`.
+    """
+    summaries = []
+    for custom_id, prompt in zip(plan_entry['custom_ids'], plan_entry['prompts']):
+        if custom_id in results:
+            summary = results[custom_id]
+            if cache:
+                cache.put(cache_key(cache, prompt), summary)
+        else:
+            # Cached before submission, or failed in the batch
+            summary = await complete(client, SUMMARIZER_PROMPT, prompt, cache, semaphore=semaphore)
+        summaries.append(summary)
+    if len(summaries) == 1:
+        return summaries[0]
+    return await reduce_summaries(client, plan_entry['title'], summaries, cache, reduce_fan_in, semaphore)
+
+
+async def summarize_with_batch_api(client, books, state_file, cache=None, chunk_tokens=DEFAULT_CHUNK_TOKENS,
+                                   reduce_fan_in=DEFAULT_REDUCE_FAN_IN, poll_interval=DEFAULT_POLL_INTERVAL,
+                                   semaphore=None):
+    """
+    Summarize the chapters of many books through the OpenAI Batch API.
+
+    `books` is a list of dicts with 'title', 'author', 'chapters',
+    'summary_json_file' and 'html_file'. The submitted batch id is kept in
+    `state_file`, so an interrupted run resumes polling the same batch
+    instead of paying for a new one. Results are written in the standard
+    summary JSON shape, plus the HTML summary, for each book. The live calls
+    that fill gaps in the batch and merge chunked chapters share `semaphore`.
+
+    A book that cannot be merged does not stop the others. Returns one entry
+    per book: None when its summary was written, otherwise the exception.
+    """
+    state_file = Path(state_file)
+    lines, plan = build_batch_requests([(book['title'], book['chapters']) for book in books], chunk_tokens, cache)
+
+    results = {}
+    if lines:
+        requests_hash = content_hash(*(json.dumps(line, sort_keys=True) for line in lines))
+        batch_id = None
+        if state_file.exists():
+            with open(state_file, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+            if state.get('requests_hash') == requests_hash:
+                batch_id = state['batch_id']
+                logging.info(f"Resuming batch {batch_id}")
+        if not batch_id:
+            batch = await submit_batch(client, lines, f"speedread: {len(books)} books")
+            batch_id = batch.id
+            with atomic_write(state_file) as f:
+                json.dump({'batch_id': batch_id, 'requests_hash': requests_hash}, f)
+
+        batch = await wait_for_batch(client, batch_id, poll_interval)
+        if batch.status != 'completed':
+            logging.warning(f"Batch {batch_id} ended as {batch.status}; missing chapters will be summarized live")
+        results = await fetch_batch_results(client, batch)
+        logging.info(f"Batch {batch_id}: {len(results)}/{len(lines)} requests succeeded")
+    else:
+        logging.info("Every chapter is already cached, nothing to submit")
+
+    errors = []
+    for book, book_plan in zip(books, plan):
+        try:
+            await write_book_summary(client, book, book_plan, results, cache, reduce_fan_in, semaphore)
+        except Exception as e:
+            logging.exception(f"Batch API: could not summarize {book['title']}")
+            errors.append(e)
+        else:
+            errors.append(None)
+
+    # Keep the batch id while a book lacks its summary: a rerun that needs the same requests resumes it
+    if not any(errors):
+        state_file.unlink(missing_ok=True)
+    return errors
+
+
+async def write_book_summary(client, book, book_plan, results, cache=None, reduce_fan_in=DEFAULT_REDUCE_FAN_IN,
+                             semaphore=None):
+    merged = await asyncio.gather(*[
+        merge_chapter(client, entry, results, cache, reduce_fan_in, semaphore) for entry in book_plan
+    ], return_exceptions=True)
+    # Let every chapter settle before failing the book, so no live call is left running
+    for summary in merged:
+        if isinstance(summary, BaseException):
+            raise summary
+    summaries = [
+        {"chapter_id": chapter.get('id'), "chapter_title": chapter['title'], "summary": summary}
+        for chapter, summary in zip(book['chapters'], merged)
+    ]
+    summary_data = {"title": book['title'], "author": book['author'], "summaries": summaries}
+    with atomic_write(book['summary_json_file']) as f:
+        json.dump(summary_data, f)
+    write_html(summary_data, book['html_file'])
+    logging.info(f"Summary JSON saved to: {book['summary_json_file']}")
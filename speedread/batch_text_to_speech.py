@@ -3,45 +3,47 @@ import asyncio
 import json
 import logging
 from pathlib import Path
-from tqdm import tqdm
-from openai import OpenAI
-from speedread.text_to_speech import text_to_speech, VALID_VOICES
+from speedread.cache import DEFAULT_CACHE_DIR, AudioCache
+from speedread.metrics import stage
+from speedread.openai_client import close_client, get_client
+from speedread.manifest import content_hash, is_valid_mp3
+from speedread.text_to_speech import text_to_speech, TTS_MODEL, VALID_VOICES
+from speedread.utils import configure_logging
 
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
-
-async def process_chapter(client, chapter, output_dir, semaphore, voice):
+async def process_chapter(client, chapter, output_dir, semaphore, voice, manifest=None, audio_cache=None):
     try:
         chapter_number = str(chapter.get('number', 0)).zfill(2)
         output_file = output_dir / f"chapter_{chapter_number}.mp3"
-        
-        logging.info(f"Processing chapter: {chapter.get('chapter_title', f'Chapter {chapter_number}')}")
-        logging.info(f"Output file: {output_file}")
+        with stage('tts', chapter.get('chapter_id') or chapter.get('number', 0)):
+            logging.info(f"Processing chapter: {chapter.get('chapter_title', f'Chapter {chapter_number}')}")
+            logging.info(f"Output file: {output_file}")
 
-        if output_file.exists():
-            logging.info(f"Audio file already exists: {output_file}")
-            return output_file
+            if manifest:
+                input_hash = content_hash(TTS_MODEL, voice, chapter['summary'])
+                if manifest.completed_file('tts', chapter_number, input_hash, is_valid_mp3) == output_file:
+                    logging.info(f"Audio file already complete: {output_file}")
+                    return output_file
+            elif output_file.exists():
+                logging.info(f"Audio file already exists: {output_file}")
+                return output_file
 
-        async with semaphore:
-            max_retries = 5
-            retry_delay = 10
-            for attempt in range(max_retries):
-                try:
-                    await text_to_speech(client, chapter['summary'], str(output_file), voice)
-                    break
-                except Exception as e:
-                    if "429" in str(e) and attempt < max_retries - 1:
-                        wait_time = retry_delay * (2 ** attempt)
-                        logging.warning(f"Rate limit exceeded. Retrying in {wait_time} seconds...")
-                        await asyncio.sleep(wait_time)
-                    else:
-                        raise
+            audio_key = audio_cache.key(TTS_MODEL, voice, chapter['summary']) if audio_cache else None
+            if audio_cache and audio_cache.fetch(audio_key, output_file):
+                logging.info(f"Audio reused from cache: {output_file}")
+            else:
+                await text_to_speech(client, chapter['summary'], str(output_file), voice, semaphore)
+                if audio_cache and output_file.exists():
+                    audio_cache.put(audio_key, output_file)
         
-        if output_file.exists():
-            logging.info(f"Successfully generated audio file: {output_file}")
-            return output_file
-        else:
-            logging.error(f"Failed to generate audio file: {output_file}")
-            return None
+            if output_file.exists():
+                logging.info(f"Successfully generated audio file: {output_file}")
+                if manifest:
+                    manifest.record('tts', chapter_number, input_hash, file=output_file,
+                                    chapter_id=chapter.get('chapter_id'))
+                return output_file
+            else:
+                logging.error(f"Failed to generate audio file: {output_file}")
+                return None
     except Exception as e:
         logging.error(f"Error processing chapter {chapter_number}: {str(e)}")
         return None
@@ -53,20 +55,26 @@ async def async_main(args):
     output_dir = Path(args.output_dir)
     output_dir.mkdir(parents=True, exist_ok=True)
 
-    client = OpenAI()
+    client = get_client(args.max_concurrency)
     semaphore = asyncio.Semaphore(args.max_concurrency)
+    audio_cache = None if args.no_cache else AudioCache(args.cache_dir)
     tasks = []
 
     for i, chapter in enumerate(book_data['summaries'], start=1):
         chapter['number'] = i  # Add chapter number
-        task = asyncio.create_task(process_chapter(client, chapter, output_dir, semaphore, args.voice))
+        task = asyncio.create_task(process_chapter(client, chapter, output_dir, semaphore, args.voice,
+                                                   audio_cache=audio_cache))
         tasks.append(task)
 
+    from tqdm import tqdm
     results = []
-    for task in tqdm(asyncio.as_completed(tasks), total=len(tasks), desc="Processing chapters"):
-        result = await task
-        if result:
-            results.append(result)
+    try:
+        for task in tqdm(asyncio.as_completed(tasks), total=len(tasks), desc="Processing chapters"):
+            result = await task
+            if result:
+                results.append(result)
+    finally:
+        await close_client()
 
     print(f"Processed {len(results)} chapters. Audio files saved in {output_dir}")
 
@@ -77,8 +85,12 @@ def main():
     parser.add_argument('--max-concurrency', type=int, default=5, help='Maximum number of concurrent conversions')
     parser.add_argument('--voice', type=str, choices=VALID_VOICES, default="alloy",
                         help='Voice to use for text-to-speech (default: alloy)')
+    parser.add_argument('--cache-dir', default=DEFAULT_CACHE_DIR,
+                        help=f'Directory of the audio cache (default: {DEFAULT_CACHE_DIR})')
+    parser.add_argument('--no-cache', action='store_true', help='Do not read or write the audio cache')
     args = parser.parse_args()
 
+    configure_logging()
     asyncio.run(async_main(args))
 
 if __name__ == "__main__":
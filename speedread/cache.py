@@ -0,0 +1,236 @@
+import hashlib
+import json
+import logging
+import os
+import shutil
+import sqlite3
+import time
+import unicodedata
+from contextlib import contextmanager
+from pathlib import Path
+
+DEFAULT_CACHE_DIR = Path(os.environ.get('SPEEDREAD_CACHE_DIR', Path.home() / '.cache' / 'speedread'))
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+DEFAULT_AUDIO_MAX_BYTES = 2 * 1024 * 1024 * 1024
+# Linux ioctl that makes a copy-on-write clone of a file (btrfs, XFS)
+FICLONE = 0x40049409
+
+
+class ResponseCache:
+    """
+    Persistent, content-addressed cache of API responses.
+
+    Entries live in a single SQLite file and are keyed by a hash of everything
+    that determines the response. Once the stored values exceed max_bytes, the
+    least recently used entries are evicted. SQLite's WAL mode and busy timeout
+    make it safe for several speedread processes to share one cache directory.
+    """
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.path = self.cache_dir / 'responses.sqlite'
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        with self._connect() as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS responses (
+                    key TEXT PRIMARY KEY,
+                    value TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    last_access REAL NOT NULL
+                )
+            """)
+            conn.execute('CREATE INDEX IF NOT EXISTS responses_last_access ON responses (last_access)')
+
+    @contextmanager
+    def _connect(self):
+        # A connection per operation keeps the cache usable from worker threads
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    @staticmethod
+    def key(model, system_prompt, user_prompt, max_tokens=None):
+        payload = json.dumps([model, system_prompt, user_prompt, max_tokens], ensure_ascii=False)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def get(self, key):
+        with self._connect() as conn:
+            row = conn.execute('SELECT value FROM responses WHERE key = ?', (key,)).fetchone()
+            if row:
+                conn.execute('UPDATE responses SET last_access = ? WHERE key = ?', (time.time(), key))
+        if row:
+            self.hits += 1
+            logging.debug(f'Response cache hit: {key[:12]}')
+            return row[0]
+        self.misses += 1
+        return None
+
+    def put(self, key, value):
+        size = len(value.encode('utf-8'))
+        with self._connect() as conn:
+            conn.execute(
+                'INSERT OR REPLACE INTO responses (key, value, size, last_access) VALUES (?, ?, ?, ?)',
+                (key, value, size, time.time())
+            )
+            self._evict(conn)
+
+    def _evict(self, conn):
+        total = conn.execute('SELECT COALESCE(SUM(size), 0) FROM responses').fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        evicted = 0
+        for key, size in conn.execute('SELECT key, size FROM responses ORDER BY last_access').fetchall():
+            if total <= self.max_bytes:
+                break
+            conn.execute('DELETE FROM responses WHERE key = ?', (key,))
+            total -= size
+            evicted += 1
+        logging.info(f'Response cache: evicted {evicted} entries')
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+        }
+
+
+def link_or_copy(source, destination):
+    """
+    Place `source` at `destination` without duplicating its data when the
+    filesystem allows: a hardlink, then a reflink, then a plain copy. The
+    destination appears atomically.
+    """
+    destination = Path(destination)
+    partial_file = destination.with_name(destination.name + '.part')
+    partial_file.unlink(missing_ok=True)
+    try:
+        os.link(source, partial_file)
+    except OSError:
+        # Another filesystem, or no hardlink support
+        with open(source, 'rb') as src, open(partial_file, 'wb') as dst:
+            if not reflink(src, dst):
+                shutil.copyfileobj(src, dst, 1 << 20)
+    os.replace(partial_file, destination)
+    return destination
+
+
+def reflink(src, dst):
+    try:
+        import fcntl
+        fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+        return True
+    except (ImportError, OSError):
+        return False
+
+
+class AudioCache:
+    """
+    Content-addressed store of synthesized audio, shared across books and runs.
+
+    Files are keyed by a hash of the TTS model, voice and normalized text, so
+    the same summary is never synthesized twice, whatever the chapter number
+    or output directory. Cached files are hardlinked (or reflinked) into the
+    book's audio directory. Once the store exceeds max_bytes, the least
+    recently used files are evicted.
+    """
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_AUDIO_MAX_BYTES):
+        self.audio_dir = Path(cache_dir) / 'audio'
+        self.audio_dir.mkdir(parents=True, exist_ok=True)
+        self.path = Path(cache_dir) / 'audio.sqlite'
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.bytes_saved = 0
+        with self._connect() as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS audio (
+                    key TEXT PRIMARY KEY,
+                    size INTEGER NOT NULL,
+                    last_access REAL NOT NULL
+                )
+            """)
+            conn.execute('CREATE INDEX IF NOT EXISTS audio_last_access ON audio (last_access)')
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    @staticmethod
+    def key(model, voice, text):
+        # Whitespace and Unicode normalization differences do not change the speech
+        normalized = ' '.join(unicodedata.normalize('NFC', text).split())
+        payload = json.dumps([model, voice, normalized], ensure_ascii=False)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def _file(self, key):
+        return self.audio_dir / key[:2] / f"{key}.mp3"
+
+    def fetch(self, key, destination):
+        """Materialize the cached audio for `key` at `destination`. Returns False on a miss."""
+        cached_file = self._file(key)
+        with self._connect() as conn:
+            row = conn.execute('SELECT size FROM audio WHERE key = ?', (key,)).fetchone()
+            if row and not cached_file.exists():
+                conn.execute('DELETE FROM audio WHERE key = ?', (key,))
+                row = None
+            if row:
+                conn.execute('UPDATE audio SET last_access = ? WHERE key = ?', (time.time(), key))
+        if not row:
+            self.misses += 1
+            return False
+        link_or_copy(cached_file, destination)
+        self.hits += 1
+        self.bytes_saved += row[0]
+        logging.debug(f'Audio cache hit: {key[:12]}')
+        return True
+
+    def put(self, key, source):
+        cached_file = self._file(key)
+        cached_file.parent.mkdir(exist_ok=True)
+        link_or_copy(source, cached_file)
+        with self._connect() as conn:
+            conn.execute(
+                'INSERT OR REPLACE INTO audio (key, size, last_access) VALUES (?, ?, ?)',
+                (key, cached_file.stat().st_size, time.time())
+            )
+            self._evict(conn)
+
+    def _evict(self, conn):
+        total = conn.execute('SELECT COALESCE(SUM(size), 0) FROM audio').fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        evicted = 0
+        for key, size in conn.execute('SELECT key, size FROM audio ORDER BY last_access').fetchall():
+            if total <= self.max_bytes:
+                break
+            conn.execute('DELETE FROM audio WHERE key = ?', (key,))
+            # Hardlinked copies in book directories keep their data
+            self._file(key).unlink(missing_ok=True)
+            total -= size
+            evicted += 1
+        logging.info(f'Audio cache: evicted {evicted} files')
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'bytes_saved': self.bytes_saved,
+        }
@@ -1,47 +1,80 @@
 import argparse
 import json
 import re
-from jinja2 import Environment, FileSystemLoader
+from functools import lru_cache
+from pathlib import Path
+from speedread.utils import atomic_write
+
+TEMPLATE_DIR = Path(__file__).resolve().parent / 'templates'
+TEMPLATE_NAME = 'book_summary.html'
+
+BOLD = re.compile(r'\*\*(.*?)\*\*')
+NUMBERED_ITEM = re.compile(r'^\d+\.\s(.*)$', re.MULTILINE)
+ADJACENT_OL = re.compile(r'</ol>\s*<ol>')
+BULLET_ITEM = re.compile(r'^\*\s(.*)$', re.MULTILINE)
+ADJACENT_UL = re.compile(r'</ul>\s*<ul>')
+PARAGRAPH_BREAK = re.compile(r'\n\n')
 
 def read_json_summaries(file_path):
     with open(file_path, 'r', encoding='utf-8') as f:
         return json.load(f)
 
+@lru_cache(maxsize=None)
+def get_environment():
+    from jinja2 import Environment, FileSystemLoader
+    # Templates ship inside the package and are compiled once per process
+    return Environment(loader=FileSystemLoader(TEMPLATE_DIR), auto_reload=False)
+
+@lru_cache(maxsize=None)
+def get_template(name=TEMPLATE_NAME):
+    return get_environment().get_template(name)
+
 def markdown_to_html(text):
     # Convert bold
-    text = re.sub(r'\*\*(.*?)\*\*', r'<strong>\1</strong>', text)
+    text = BOLD.sub(r'<strong>\1</strong>', text)
     
     # Convert numbered lists
-    text = re.sub(r'^\d+\.\s(.*)$', r'<ol><li>\1</li></ol>', text, flags=re.MULTILINE)
-    text = re.sub(r'</ol>\s*<ol>', '', text)  # Merge adjacent <ol> tags
+    text = NUMBERED_ITEM.sub(r'<ol><li>\1</li></ol>', text)
+    text = ADJACENT_OL.sub('', text)  # Merge adjacent <ol> tags
     
     # Convert bullet points
-    text = re.sub(r'^\*\s(.*)$', r'<ul><li>\1</li></ul>', text, flags=re.MULTILINE)
-    text = re.sub(r'</ul>\s*<ul>', '', text)  # Merge adjacent <ul> tags
+    text = BULLET_ITEM.sub(r'<ul><li>\1</li></ul>', text)
+    text = ADJACENT_UL.sub('', text)  # Merge adjacent <ul> tags
     
     return text
 
-def create_html_content(book_data):
-    env = Environment(loader=FileSystemLoader('templates'))
-    template = env.get_template('book_summary.html')
-
-    chapters = []
-    for i, chapter in enumerate(book_data['summaries'], 1):
-        formatted_summary = ''.join([f'<p>{markdown_to_html(p.strip())}</p>' for p in chapter['summary'].split('\n\n') if p.strip()])
-        chapters.append({
-            'number': i,
-            'name': chapter['chapter_title'],
-            'content': formatted_summary
-        })
-
-    return template.render(
+def format_summary(summary):
+    return ''.join(f'<p>{markdown_to_html(p.strip())}</p>' for p in PARAGRAPH_BREAK.split(summary) if p.strip())
+
+def render_html(book_data, template_name=TEMPLATE_NAME):
+    """Yield the summary page in pieces, formatting each chapter only as it is rendered."""
+    summaries = book_data['summaries']
+    chapters = [
+        {'number': i, 'id': chapter.get('chapter_id'), 'name': chapter['chapter_title']}
+        for i, chapter in enumerate(summaries, 1)
+    ]
+    sections = (
+        {**toc_entry, 'content': format_summary(chapter['summary'])}
+        for toc_entry, chapter in zip(chapters, summaries)
+    )
+    return get_template(template_name).generate(
         title=book_data['title'],
         author=book_data['author'],
         chapters=chapters,
-        book_title=book_data['title'],  # Add this line
-        book_author=book_data['author']  # Add this line
+        sections=sections,
+        book_title=book_data['title'],
+        book_author=book_data['author']
     )
 
+def create_html_content(book_data):
+    return ''.join(render_html(book_data))
+
+def write_html(book_data, output_file, template_name=TEMPLATE_NAME):
+    """Stream the rendered page into `output_file`, replacing it atomically."""
+    with atomic_write(output_file) as f:
+        for piece in render_html(book_data, template_name):
+            f.write(piece)
+
 def main():
     parser = argparse.ArgumentParser(description='Compile chapter summaries into a single HTML file.')
     parser.add_argument('summary_file', help='JSON file containing the combined summaries')
@@ -49,10 +82,7 @@ def main():
     args = parser.parse_args()
 
     book_data = read_json_summaries(args.summary_file)
-    html_content = create_html_content(book_data)
-
-    with open(args.output, 'w', encoding='utf-8') as f:
-        f.write(html_content)
+    write_html(book_data, args.output)
 
     print(f"Summary compiled and saved to {args.output}")
 
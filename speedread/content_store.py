@@ -0,0 +1,114 @@
+import json
+import logging
+import os
+import sqlite3
+import zlib
+from contextlib import contextmanager
+from pathlib import Path
+from speedread.epub_metadata import ensure_chapter_ids
+from speedread.utils import atomic_write
+
+SCHEMA_VERSION = 1
+
+
+class ContentStore:
+    """
+    Chapter-addressable store of a parsed book.
+
+    A single SQLite file holds the book metadata and one row per chapter with
+    its ID, title, text size and zlib-compressed text. Opening the store and
+    listing chapters never reads chapter bodies; each body is decompressed
+    only when it is asked for.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        with self._connect() as conn:
+            meta = dict(conn.execute('SELECT key, value FROM book'))
+        if int(meta.get('schema_version', 0)) != SCHEMA_VERSION:
+            raise ValueError(f"{self.path} has unsupported schema version {meta.get('schema_version')}")
+        self.title = meta['title']
+        self.author = meta['author']
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path)
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    @classmethod
+    def write(cls, path, book):
+        """Store a parsed book (title, author, chapters with content) and open it."""
+        path = Path(path)
+        partial_file = path.with_name(path.name + '.part')
+        partial_file.unlink(missing_ok=True)
+
+        def rows():
+            for position, chapter in enumerate(ensure_chapter_ids(book['chapters'])):
+                encoded = chapter['content'].encode('utf-8')
+                yield position, chapter['id'], chapter['title'], len(encoded), zlib.compress(encoded)
+
+        conn = sqlite3.connect(partial_file)
+        try:
+            with conn:
+                conn.execute('CREATE TABLE book (key TEXT PRIMARY KEY, value TEXT NOT NULL)')
+                conn.execute("""
+                    CREATE TABLE chapters (
+                        position INTEGER PRIMARY KEY,
+                        id TEXT NOT NULL UNIQUE,
+                        title TEXT NOT NULL,
+                        size INTEGER NOT NULL,
+                        content BLOB NOT NULL
+                    )
+                """)
+                conn.executemany('INSERT INTO book (key, value) VALUES (?, ?)', [
+                    ('schema_version', str(SCHEMA_VERSION)),
+                    ('title', book['title']),
+                    ('author', book['author']),
+                ])
+                conn.executemany(
+                    'INSERT INTO chapters (position, id, title, size, content) VALUES (?, ?, ?, ?, ?)', rows()
+                )
+        finally:
+            conn.close()
+        os.replace(partial_file, path)
+        return cls(path)
+
+    @classmethod
+    def from_json(cls, path, json_file):
+        """Convert a legacy `_content.json` file into a store."""
+        logging.info(f"Converting {json_file} to {path}")
+        with open(json_file, 'r', encoding='utf-8') as f:
+            return cls.write(path, json.load(f))
+
+    def chapters(self):
+        """Chapter IDs, titles and sizes in reading order, without their text."""
+        with self._connect() as conn:
+            return [
+                {'id': chapter_id, 'title': title, 'size': size}
+                for chapter_id, title, size in conn.execute('SELECT id, title, size FROM chapters ORDER BY position')
+            ]
+
+    def read_chapter(self, chapter_id):
+        with self._connect() as conn:
+            row = conn.execute('SELECT title, content FROM chapters WHERE id = ?', (chapter_id,)).fetchone()
+        if row is None:
+            raise KeyError(chapter_id)
+        return {'id': chapter_id, 'title': row[0], 'content': zlib.decompress(row[1]).decode('utf-8')}
+
+    def iter_chapters(self):
+        """Yield every chapter with its text, one at a time."""
+        with self._connect() as conn:
+            for chapter_id, title, content in conn.execute('SELECT id, title, content FROM chapters ORDER BY position'):
+                yield {'id': chapter_id, 'title': title, 'content': zlib.decompress(content).decode('utf-8')}
+
+    def export_markdown(self, markdown_file):
+        """Write the book as markdown, streaming one chapter at a time."""
+        with atomic_write(markdown_file) as f:
+            f.write(f"# {self.title}\nby {self.author}\n\n")
+            for chapter in self.iter_chapters():
+                f.write(f"# {chapter['title']}\n")
+                f.write(chapter['content'])
+                f.write("\n\n")
@@ -5,10 +5,12 @@ import argparse
 import tempfile
 import logging
 import re
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from tqdm import tqdm
-
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+from speedread.manifest import file_hash
+from speedread.metrics import stage
+from speedread.mp3_info import mp3_duration
+from speedread.utils import atomic_write, configure_logging
 
 def get_duration(file_path):
     cmd = ['ffprobe', '-v', 'quiet', '-print_format', 'json', '-show_format', str(file_path)]
@@ -17,6 +19,13 @@ def get_duration(file_path):
     data = json.loads(result.stdout)
     return float(data['format']['duration'])
 
+def chapter_duration(file_path):
+    try:
+        return mp3_duration(file_path)
+    except ValueError as e:
+        logging.warning(f"Could not read MP3 frames ({e}), falling back to ffprobe")
+        return get_duration(file_path)
+
 def clean_chapter_title(chapter_number, chapter_title):
     # Remove leading chapter numbers if present
     cleaned_title = re.sub(r'^\d+\.?\s*:?\s*', '', chapter_title).strip()
@@ -36,110 +45,162 @@ def read_summary_file(summary_file):
     return author, title, summary_data
 
 def create_file_list(mp3_files, temp_dir_path):
+    from tqdm import tqdm
     file_list_path = temp_dir_path / 'file_list.txt'
     with open(file_list_path, 'w') as f:
         for mp3_file in tqdm(mp3_files, desc="Creating file list"):
             f.write(f"file '{mp3_file.absolute()}'\n")
     return file_list_path
 
-def combine_mp3_files(file_list_path, output_file):
-    logging.info("Combining MP3 files into M4B...")
-    cmd = ['ffmpeg', '-f', 'concat', '-safe', '0', '-i', str(file_list_path),
-           '-c:a', 'aac', '-b:a', '64k', '-f', 'mp4', str(output_file)]
+def source_hash_file(aac_file):
+    """Sidecar holding the hash of the MP3 a segment was encoded from."""
+    return Path(aac_file).with_name(Path(aac_file).name + '.sha256')
+
+def encode_chapter(mp3_file, aac_file):
+    """Encode one chapter MP3 to an AAC segment that can later be stream-copied."""
+    aac_file = Path(aac_file)
+    partial_file = aac_file.with_suffix('.part.m4a')
+    source_hash = file_hash(mp3_file)
+    cmd = ['ffmpeg', '-y', '-v', 'error', '-i', str(mp3_file), '-vn',
+           '-c:a', 'aac', '-b:a', '64k', str(partial_file)]
     logging.info(f"Running command: {' '.join(cmd)}")
     subprocess.run(cmd, check=True)
+    # Never leave the old hash next to the new segment, even after a crash
+    source_hash_file(aac_file).unlink(missing_ok=True)
+    os.replace(partial_file, aac_file)
+    with atomic_write(source_hash_file(aac_file)) as f:
+        f.write(source_hash)
+    return aac_file
+
+def segment_is_current(mp3_file, aac_file):
+    """
+    A segment is reusable if it was encoded from an MP3 with the same
+    content. mtimes cannot tell: MP3s hardlinked from the audio cache keep
+    the cache entry's older mtime.
+    """
+    hash_file = source_hash_file(aac_file)
+    if not aac_file.exists() or not hash_file.exists():
+        return False
+    return hash_file.read_text(encoding='utf-8').strip() == file_hash(mp3_file)
+
+def encode_chapters(mp3_files, segments_dir, workers=None):
+    """
+    Encode every chapter MP3 to its own AAC segment, one ffmpeg per core.
+
+    Segments encoded from an MP3 with the same content are kept, so after
+    one chapter changes only that chapter is re-encoded.
+    """
+    segments_dir = Path(segments_dir)
+    segments_dir.mkdir(parents=True, exist_ok=True)
+    aac_files = [segments_dir / f"{mp3_file.stem}.m4a" for mp3_file in mp3_files]
+    stale = [(mp3_file, aac_file) for mp3_file, aac_file in zip(mp3_files, aac_files)
+             if not segment_is_current(mp3_file, aac_file)]
+    logging.info(f"Encoding {len(stale)} of {len(mp3_files)} chapters to AAC...")
+    if stale:
+        from tqdm import tqdm
+        # Each worker thread only waits on its own ffmpeg process
+        with ThreadPoolExecutor(max_workers=workers or os.cpu_count() or 1) as executor:
+            list(tqdm(executor.map(lambda pair: encode_chapter(*pair), stale), total=len(stale),
+                      desc="Encoding chapters"))
+    return aac_files
+
+def combine_aac_files(file_list_path, metadata_file, output_file):
+    """
+    Stream-copy the AAC segments into the M4B, writing the chapters and
+    tags from `metadata_file` in the same pass.
+    """
+    logging.info("Combining AAC segments into M4B...")
+    output_file = Path(output_file)
+    partial_file = output_file.with_name(output_file.name + '.part')
+    # The ipod muxer is the one meant for .m4a/.m4b; it writes iTunes tags and
+    # both a QuickTime chapter track and a Nero chpl atom
+    cmd = ['ffmpeg', '-y', '-v', 'error', '-f', 'concat', '-safe', '0', '-i', str(file_list_path),
+           '-i', str(metadata_file), '-map', '0:a', '-map_metadata', '1', '-map_chapters', '1',
+           '-c', 'copy', '-f', 'ipod', str(partial_file)]
+    logging.info(f"Running command: {' '.join(cmd)}")
+    subprocess.run(cmd, check=True)
+    os.replace(partial_file, output_file)
 
 def create_chapter_information(mp3_files, summary_data):
     logging.info("Creating chapter information...")
     chapters = []
     current_time = 0
-    for i, (mp3_file, chapter_data) in enumerate(tqdm(zip(mp3_files, summary_data['summaries']), desc="Processing chapters"), 1):
-        duration = get_duration(mp3_file)
+    for i, (mp3_file, chapter_data) in enumerate(zip(mp3_files, summary_data['summaries']), 1):
+        duration = chapter_duration(mp3_file)
         clean_title = clean_chapter_title(i, chapter_data['chapter_title'])
-        chapters.append(f"CHAPTER{i:02d}={format_time(current_time)}")
-        if clean_title:
-            chapters.append(f"CHAPTER{i:02d}NAME=Chapter {i}: {clean_title}")
-        else:
-            chapters.append(f"CHAPTER{i:02d}NAME=Chapter {i}")
+        chapters.append({
+            'title': f"Chapter {i}: {clean_title}" if clean_title else f"Chapter {i}",
+            'start': current_time,
+            'end': current_time + duration,
+        })
         current_time += duration
     return chapters
 
-def write_chapter_file(chapters, output_file):
-    chapters_file = output_file.with_suffix('.chapters.txt')
-    with open(chapters_file, 'w') as f:
-        f.write('\n'.join(chapters))
-    return chapters_file
+def escape_ffmetadata(value):
+    # '=', ';', '#', '\' and newlines are special in FFMETADATA files
+    return re.sub(r'([=;#\\\n])', r'\\\1', str(value))
 
-def add_chapters_and_metadata(output_file, author, title):
-    logging.info("Adding chapters to M4B file...")
-    try:
-        cmd = ['mp4chaps', '-i', str(output_file)]
-        logging.info(f"Running command: {' '.join(cmd)}")
-        subprocess.run(cmd, check=True)
-        
-        metadata_cmd = ['mp4tags']
-        metadata_cmd.extend(['-a', author])
-        metadata_cmd.extend(['-s', title])
-        metadata_cmd.extend(['-A', title])  # Set album name to title
-        metadata_cmd.extend(['-m', author])  # Set composer to author
-        metadata_cmd.extend(['-w', author])  # Set writer to author
-        metadata_cmd.append(str(output_file))
-        logging.info(f"Running command: {' '.join(metadata_cmd)}")
-        subprocess.run(metadata_cmd, check=True)
-        
-        logging.info("Metadata added successfully.")
-    except subprocess.CalledProcessError as e:
-        logging.error(f"Error adding chapters or metadata: {e}")
-        logging.error("Error output:")
-        logging.error(e.stderr)
-        logging.error("Make sure mp4chaps and mp4tags are installed and in your PATH.")
-        logging.error("You can try installing them with: brew install mp4v2")
-        return False
-    return True
+def write_metadata_file(chapters, author, title, metadata_file):
+    """Write an FFMETADATA file with the book tags and chapter marks (in milliseconds)."""
+    tags = {
+        'title': title,
+        'album': title,
+        'artist': author,
+        'album_artist': author,
+        'composer': author,
+        'genre': 'Audiobook',
+    }
+    lines = [';FFMETADATA1']
+    lines.extend(f"{key}={escape_ffmetadata(value)}" for key, value in tags.items())
+    for chapter in chapters:
+        lines.extend([
+            '[CHAPTER]',
+            'TIMEBASE=1/1000',
+            f"START={round(chapter['start'] * 1000)}",
+            f"END={round(chapter['end'] * 1000)}",
+            f"title={escape_ffmetadata(chapter['title'])}",
+        ])
+    with open(metadata_file, 'w', encoding='utf-8') as f:
+        f.write('\n'.join(lines) + '\n')
+    return metadata_file
 
-def create_audiobook(input_dir, output_file, summary_file):
+def create_audiobook(input_dir, output_file, summary_file, segments_dir=None, workers=None):
     input_dir = Path(input_dir)
     output_file = Path(output_file)
     mp3_files = sorted(input_dir.glob('*.mp3'))
+    segments_dir = Path(segments_dir) if segments_dir else input_dir.parent / 'aac_chapters'
     
     logging.info("Creating audiobook...")
     
     author, title, summary_data = read_summary_file(summary_file)
+    with stage('encode'):
+        aac_files = encode_chapters(mp3_files, segments_dir, workers)
     
-    with tempfile.TemporaryDirectory() as temp_dir:
+    with stage('audiobook'), tempfile.TemporaryDirectory() as temp_dir:
         temp_dir_path = Path(temp_dir)
         
-        file_list_path = create_file_list(mp3_files, temp_dir_path)
-        combine_mp3_files(file_list_path, output_file)
-        
+        file_list_path = create_file_list(aac_files, temp_dir_path)
         chapters = create_chapter_information(mp3_files, summary_data)
-        chapters_file = write_chapter_file(chapters, output_file)
-        
-        success = add_chapters_and_metadata(output_file, author, title)
-        
-        # Clean up the chapters file
-        os.remove(chapters_file)
+        metadata_file = write_metadata_file(chapters, author, title, temp_dir_path / 'metadata.txt')
+        combine_aac_files(file_list_path, metadata_file, output_file)
     
-    if success:
-        logging.info("Audiobook creation completed!")
-        logging.info(f"Audiobook file: {output_file}")
-        logging.info("You can now try playing the audiobook to check if it works correctly.")
-    else:
-        logging.error("Audiobook creation failed.")
-
-def format_time(seconds):
-    hours, remainder = divmod(seconds, 3600)
-    minutes, seconds = divmod(remainder, 60)
-    return f"{int(hours):02d}:{int(minutes):02d}:{seconds:06.3f}"
+    logging.info("Audiobook creation completed!")
+    logging.info(f"Audiobook file: {output_file}")
+    logging.info("You can now try playing the audiobook to check if it works correctly.")
 
 def main():
     parser = argparse.ArgumentParser(description='Create an M4B audiobook from MP3 files with chapters.')
     parser.add_argument('input_dir', help='Directory containing input MP3 files')
     parser.add_argument('output_file', help='Path for the output M4B audiobook file')
     parser.add_argument('summary_file', help='Path to the JSON summary file')
+    parser.add_argument('--segments-dir', help='Directory for the per-chapter AAC segments '
+                        '(default: aac_chapters next to the input directory)')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='Number of chapters encoded in parallel (default: CPU count)')
     args = parser.parse_args()
 
-    create_audiobook(args.input_dir, args.output_file, args.summary_file)
+    configure_logging()
+    create_audiobook(args.input_dir, args.output_file, args.summary_file, args.segments_dir, args.workers)
     print(f"Audiobook created: {args.output_file}")
 
 if __name__ == "__main__":
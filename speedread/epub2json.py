@@ -1,57 +1,60 @@
 import argparse
+import asyncio
 import json
 import logging
-import os
-import tempfile
-import zipfile
-from bs4 import BeautifulSoup
+from speedread.epub_archive import EpubArchive
 from speedread.epub_metadata import extract_toc_from_epub
+from speedread.html_text import DEFAULT_BACKEND, TEXT_BACKENDS, extract_texts, html_to_text
+from speedread.metrics import profiled, profiling, stage
+from speedread.openai_client import close_client, get_client
 from speedread.trim_chapters import trim_chapters
 
-def extract_chapter_content(temp_dir, toc_path, chapter_src):
-    base_dir = os.path.dirname(toc_path)
-    chapter_path = os.path.join(temp_dir, base_dir, chapter_src)
-    if os.path.exists(chapter_path):
-        logging.debug(f'Loading chapter content from {chapter_path}')
-        with open(chapter_path, 'r', encoding='utf-8', errors='ignore') as f:
-            soup = BeautifulSoup(f, 'html.parser')
-            return soup.get_text()
+def read_chapter_document(archive, chapter_src):
+    if archive.exists(chapter_src):
+        logging.debug(f'Loading chapter content from {chapter_src}')
+        return archive.read(chapter_src)
     else:
-        raise Error(f"Cannot find chapter file: {chapter_path}")
+        raise ValueError(f"Cannot find chapter file: {chapter_src}")
 
-def epub_to_json(epub_path):
+def extract_chapter_content(archive, chapter_src, backend=DEFAULT_BACKEND):
+    return html_to_text(read_chapter_document(archive, chapter_src), backend)
+
+def extract_chapters_content(archive, chapters, backend=DEFAULT_BACKEND, workers=None):
+    if profiling():
+        # cProfile only sees this process, so keep the extraction out of the worker pool
+        workers = 1
+    with profiled():
+        documents = [read_chapter_document(archive, chapter['src']) for chapter in chapters]
+        results = extract_texts(documents, backend, workers)
+
+    total_time = 0
+    for chapter, (content, elapsed) in zip(chapters, results):
+        chapter['content'] = content
+        total_time += elapsed
+        logging.info(f"Extracted '{chapter['title']}' in {elapsed * 1000:.1f} ms ({len(content)} chars)")
+    logging.info(f"Extracted {len(chapters)} chapters with {backend} in {total_time:.2f}s of CPU time")
+
+async def epub_to_json(epub_path, client, backend=DEFAULT_BACKEND, workers=None, cache=None):
     try:
-        with tempfile.TemporaryDirectory() as temp_dir:
-            # Extract EPUB contents
-            with zipfile.ZipFile(epub_path, 'r') as zip_ref:
-                zip_ref.extractall(temp_dir)
-            
+        with EpubArchive(epub_path) as archive:
             # Extract metadata
-            metadata = extract_toc_from_epub(epub_path)
+            with stage('parse'), profiled():
+                metadata = extract_toc_from_epub(archive)
+            for chapter in metadata['chapters']:
+                # Document sizes help tell front and back matter from chapters
+                if archive.exists(chapter['src']):
+                    chapter['size'] = archive.size(chapter['src'])
             
             # Trim chapters
-            trimmed_metadata = trim_chapters(metadata)
-            
-            # Find the TOC file path
-            toc_path = None
-            for root, _, files in os.walk(temp_dir):
-                for file in files:
-                    file_path = os.path.join(root, file)
-                    with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                        content = f.read()
-                        if 'navPoint' in content:
-                            toc_path = file_path
-                            break
-                if toc_path:
-                    break
-            
-            if not toc_path:
-                raise ValueError("Could not find TOC file in EPUB")
+            trimmed_metadata = await trim_chapters(metadata, client, cache)
             
             # Extract chapter contents
+            with stage('parse'):
+                await asyncio.to_thread(extract_chapters_content, archive, trimmed_metadata['chapters'], backend,
+                                        workers)
             for chapter in trimmed_metadata['chapters']:
-                chapter['content'] = extract_chapter_content(temp_dir, toc_path, chapter['src'])
                 del chapter['src']  # Remove the 'src' key as it's no longer needed
+                chapter.pop('size', None)
             
             # Cleanup phase: discard chapters with content less than 1KB
             trimmed_metadata['chapters'] = [
@@ -67,13 +70,23 @@ def epub_to_json(epub_path):
         print(f"Error processing EPUB file: {e}")
         return None
 
+async def convert_with_client(args):
+    try:
+        return await epub_to_json(args.epub_file, get_client(), args.text_backend, args.workers)
+    finally:
+        await close_client()
+
 def main():
     parser = argparse.ArgumentParser(description='Convert EPUB to structured JSON with metadata and content.')
     parser.add_argument('epub_file', help='Path to the EPUB file')
     parser.add_argument('-o', '--output', help='Path to save the output JSON file', default=None)
+    parser.add_argument('--text-backend', choices=TEXT_BACKENDS, default=DEFAULT_BACKEND,
+                        help=f'HTML to text converter (default: {DEFAULT_BACKEND})')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='Number of processes for chapter text extraction (default: CPU count)')
     args = parser.parse_args()
 
-    structured_content = epub_to_json(args.epub_file)
+    structured_content = asyncio.run(convert_with_client(args))
 
     if args.output:
         with open(args.output, 'w', encoding='utf-8') as f:
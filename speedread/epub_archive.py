@@ -0,0 +1,111 @@
+import logging
+import posixpath
+import zipfile
+from urllib.parse import unquote
+
+CONTAINER_PATH = 'META-INF/container.xml'
+NCX_MEDIA_TYPE = 'application/x-dtbncx+xml'
+
+
+def parse_xml(data):
+    # bs4 is only needed once a book is actually opened
+    from bs4 import BeautifulSoup
+    return BeautifulSoup(data, 'xml')
+
+
+class EpubArchive:
+    """
+    A single open handle on an EPUB file.
+
+    The archive is opened once and members are read straight from the zip on
+    demand, so the metadata and content stages can share it without
+    extracting anything to disk.
+    """
+
+    def __init__(self, epub_path):
+        self.path = epub_path
+        self.zip = zipfile.ZipFile(epub_path, 'r')
+        self._names = set(self.zip.namelist())
+        self.opf_path = self._find_opf()
+        self.opf = parse_xml(self.read(self.opf_path))
+        self.manifest = {}
+        for item in self.opf.find_all('item'):
+            if item.get('id') and item.get('href'):
+                self.manifest[item['id']] = item
+        self.toc_path, self.toc_type = self._find_toc()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        self.zip.close()
+
+    def read(self, member):
+        logging.debug(f'Reading {member} from {self.path}')
+        return self.zip.read(member)
+
+    def read_text(self, member):
+        return self.read(member).decode('utf-8', errors='ignore')
+
+    def exists(self, member):
+        return member in self._names
+
+    def size(self, member):
+        """Uncompressed size of a member, without reading it."""
+        return self.zip.getinfo(member).file_size
+
+    def resolve(self, base_member, href):
+        """Resolve an href found in base_member to an archive member name."""
+        href = unquote(href.split('#')[0])
+        return posixpath.normpath(posixpath.join(posixpath.dirname(base_member), href))
+
+    def manifest_path(self, item):
+        return self.resolve(self.opf_path, item['href'])
+
+    def spine(self):
+        """Archive member names of the spine items, in reading order."""
+        paths = []
+        spine = self.opf.find('spine')
+        if not spine:
+            return paths
+        for itemref in spine.find_all('itemref'):
+            item = self.manifest.get(itemref.get('idref'))
+            if item:
+                paths.append(self.manifest_path(item))
+        return paths
+
+    def _find_opf(self):
+        if self.exists(CONTAINER_PATH):
+            container = parse_xml(self.read(CONTAINER_PATH))
+            rootfile = container.find('rootfile')
+            if rootfile and rootfile.get('full-path') and self.exists(rootfile['full-path']):
+                return rootfile['full-path']
+            logging.warning('container.xml does not point to a valid OPF, searching the archive')
+        for name in sorted(self._names):
+            if name.endswith('.opf'):
+                return name
+        raise ValueError("content.opf file not found in EPUB")
+
+    def _find_toc(self):
+        # EPUB 2: the spine names the NCX explicitly
+        spine = self.opf.find('spine')
+        if spine and spine.get('toc') in self.manifest:
+            return self.manifest_path(self.manifest[spine['toc']]), 'ncx'
+        for item in self.manifest.values():
+            if item.get('media-type') == NCX_MEDIA_TYPE:
+                return self.manifest_path(item), 'ncx'
+        # EPUB 3: the navigation document is flagged in the manifest
+        for item in self.manifest.values():
+            if 'nav' in (item.get('properties') or '').split():
+                return self.manifest_path(item), 'nav'
+        raise ValueError("Navigation file not found in EPUB")
+
+
+def open_epub(epub):
+    """Return an EpubArchive for a path, or the archive itself if one is passed."""
+    if isinstance(epub, EpubArchive):
+        return epub
+    return EpubArchive(epub)
@@ -1,67 +1,84 @@
 import logging
-import os
-import tempfile
-import zipfile
 import json
 import argparse
-from bs4 import BeautifulSoup
+from speedread.epub_archive import open_epub, parse_xml
 
-def extract_toc_from_epub(epub_path):
-    with tempfile.TemporaryDirectory() as temp_dir:
-        # Unzip the EPUB file
-        with zipfile.ZipFile(epub_path, 'r') as zip_ref:
-            zip_ref.extractall(temp_dir)
-        
-        # Find content.opf and navigation files
-        content_opf = None
-        nav_file = None
-        for root, _, files in os.walk(temp_dir):
-            for file in files:
-                file_path = os.path.join(root, file)
-                if file == 'content.opf':
-                    content_opf = file_path
-                elif 'toc' in file.lower() and file.endswith('.ncx'):
-                    nav_file = file_path
-        
-        if not content_opf:
-            raise ValueError("content.opf file not found in EPUB")
-        if not nav_file:
-            raise ValueError("Navigation file not found in EPUB")
-        
-        # Parse content.opf file
-        with open(content_opf, 'r', encoding='utf-8') as f:
-            opf_soup = BeautifulSoup(f, 'xml')
-        
-        # Extract metadata
-        metadata = {}
-        metadata['title'] = opf_soup.find('dc:title').text.strip() if opf_soup.find('dc:title') else "Unknown Title"
-        metadata['author'] = opf_soup.find('dc:creator').text.strip() if opf_soup.find('dc:creator') else "Unknown Author"
-        
-        # Parse the navigation file
-        with open(nav_file, 'r', encoding='utf-8') as f:
-            nav_soup = BeautifulSoup(f, 'xml')
-        
-        # Extract chapters
-        chapters = []
-        seen_sources = {}  # Track sources we've already processed
-        for navPoint in nav_soup.find_all('navPoint'):
-            label = navPoint.find('text').string
-            content = navPoint.find('content')
-            if content:
-                src = content.get('src', '').split('#')[0]
-                if src in seen_sources:
-                    logging.debug(f'Skipping duplicate chapter source: {src} (previously used in "{seen_sources[src]}")')
-                    continue
-                chapter = {"title": label, "src": src}
-                seen_sources[src] = label
-                logging.info(f'Found chapter: {chapter}')
-                chapters.append(chapter)
-            else:
-                logging.warning(f'Chapter without content: {label}')
-        
-        metadata['chapters'] = chapters
-        
-        return metadata
+def chapter_id(spine_index, src):
+    """Stable chapter ID: position of the document in the spine plus its archive path."""
+    return f"{spine_index}:{src}"
+
+def ensure_chapter_ids(chapters):
+    """Give chapters parsed before IDs existed one based on their TOC position."""
+    for index, chapter in enumerate(chapters):
+        chapter.setdefault('id', f"toc:{index}")
+    return chapters
+
+def extract_toc_from_epub(epub):
+    archive = open_epub(epub)
+    try:
+        return extract_toc_from_archive(archive)
+    finally:
+        if archive is not epub:
+            archive.close()
+
+def extract_toc_from_archive(archive):
+    # Extract metadata
+    opf_soup = archive.opf
+    metadata = {}
+    metadata['title'] = opf_soup.find('dc:title').text.strip() if opf_soup.find('dc:title') else "Unknown Title"
+    metadata['author'] = opf_soup.find('dc:creator').text.strip() if opf_soup.find('dc:creator') else "Unknown Author"
+
+    # Parse the navigation file
+    nav_soup = parse_xml(archive.read(archive.toc_path))
+    if archive.toc_type == 'ncx':
+        entries = parse_ncx(nav_soup)
+    else:
+        entries = parse_nav(nav_soup)
+
+    # Extract chapters
+    spine_positions = {member: index for index, member in enumerate(archive.spine())}
+    chapters = []
+    seen_sources = {}  # Track sources we've already processed
+    for label, href in entries:
+        if href is None:
+            logging.warning(f'Chapter without content: {label}')
+            continue
+        src = archive.resolve(archive.toc_path, href)
+        if src in seen_sources:
+            logging.debug(f'Skipping duplicate chapter source: {src} (previously used in "{seen_sources[src]}")')
+            continue
+        # Sources are unique here, so the ID is too; -1 marks documents outside the spine
+        chapter = {"id": chapter_id(spine_positions.get(src, -1), src), "title": label, "src": src}
+        seen_sources[src] = label
+        logging.info(f'Found chapter: {chapter}')
+        chapters.append(chapter)
+
+    metadata['chapters'] = chapters
+
+    return metadata
+
+def parse_ncx(nav_soup):
+    entries = []
+    for navPoint in nav_soup.find_all('navPoint'):
+        label = navPoint.find('text').string
+        content = navPoint.find('content')
+        entries.append((label, content.get('src', '') if content else None))
+    return entries
+
+def parse_nav(nav_soup):
+    toc_nav = None
+    for nav in nav_soup.find_all('nav'):
+        if 'toc' in (nav.get('epub:type') or nav.get('type') or '').split():
+            toc_nav = nav
+            break
+    if toc_nav is None:
+        raise ValueError("Navigation document has no toc nav element")
+
+    entries = []
+    for a in toc_nav.find_all('a'):
+        label = a.get_text().strip()
+        entries.append((label, a.get('href')))
+    return entries
 
 def main():
     parser = argparse.ArgumentParser(description='Extract metadata from EPUB file.')
@@ -0,0 +1,129 @@
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+# Elements that start a new paragraph in the lxml backend's output
+BLOCK_TAGS = {
+    'address', 'article', 'aside', 'blockquote', 'caption', 'dd', 'div', 'dl', 'dt',
+    'figcaption', 'figure', 'footer', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'header',
+    'hr', 'li', 'main', 'nav', 'ol', 'p', 'pre', 'section', 'table', 'td', 'th', 'tr', 'ul',
+}
+SKIP_TAGS = {'head', 'script', 'style', 'template', 'title'}
+
+
+def bs4_to_text(document):
+    """
+    The original extraction: html.parser followed by get_text().
+
+    Output is identical to what epub2json produced before the backends
+    existed, including the text of <title> and the source whitespace. That
+    code read the documents in text mode, so CRLF and CR line endings are
+    translated to '\n' the same way.
+    """
+    from bs4 import BeautifulSoup
+    text = document.decode('utf-8', errors='ignore').replace('\r\n', '\n').replace('\r', '\n')
+    soup = BeautifulSoup(text, 'html.parser')
+    return soup.get_text()
+
+
+def lxml_to_text(document):
+    """
+    Block-aware extraction with lxml.
+
+    Normalization compared to bs4_to_text:
+    - only the <body> is read; <head>, <script> and <style> are skipped
+    - runs of whitespace inside a line collapse to a single space
+    - every block element (p, div, h1-h6, li, ...) becomes its own paragraph,
+      and paragraphs are separated by a blank line
+    - <br> becomes a single newline inside its paragraph
+    """
+    import lxml.html
+    from lxml import etree
+
+    parser = lxml.html.HTMLParser(encoding='utf-8', remove_comments=True)
+    try:
+        root = lxml.html.fromstring(document, parser=parser)
+    except etree.ParserError:
+        # Empty or whitespace-only document; the chapter is dropped later as too short
+        return ''
+    if root is None:
+        return ''
+    body = root.find('.//body')
+    if body is None:
+        body = root
+
+    paragraphs = []
+    lines = [[]]
+
+    def flush():
+        text = '\n'.join(' '.join(''.join(line).split()) for line in lines).strip()
+        if text:
+            paragraphs.append(text)
+        lines[:] = [[]]
+
+    skip_depth = 0
+    for event, element in etree.iterwalk(body, events=('start', 'end')):
+        tag = element.tag if isinstance(element.tag, str) else ''
+        if event == 'start':
+            if tag in SKIP_TAGS:
+                skip_depth += 1
+            if skip_depth:
+                continue
+            if tag in BLOCK_TAGS:
+                flush()
+            elif tag == 'br':
+                lines.append([])
+            if element.text:
+                lines[-1].append(element.text)
+        else:
+            if tag in SKIP_TAGS:
+                skip_depth -= 1
+            if skip_depth:
+                continue
+            if tag in BLOCK_TAGS:
+                flush()
+            if element.tail and element is not body:
+                lines[-1].append(element.tail)
+    flush()
+
+    return '\n\n'.join(paragraphs)
+
+
+TEXT_BACKENDS = {
+    'lxml': lxml_to_text,
+    'bs4': bs4_to_text,
+}
+DEFAULT_BACKEND = 'lxml'
+
+
+def html_to_text(document, backend=DEFAULT_BACKEND):
+    return TEXT_BACKENDS[backend](document)
+
+
+def _timed_html_to_text(job):
+    backend, document = job
+    start = time.perf_counter()
+    text = html_to_text(document, backend)
+    return text, time.perf_counter() - start
+
+
+def extract_texts(documents, backend=DEFAULT_BACKEND, workers=None):
+    """
+    Convert a list of HTML documents (bytes) to text, in order.
+
+    Documents are fanned out over a process pool of `workers` processes
+    (default: one per CPU). With a single worker, or a single document, the
+    work runs in-process. Returns a list of (text, seconds) tuples.
+    """
+    if backend not in TEXT_BACKENDS:
+        raise ValueError(f"Unknown text backend: {backend}")
+    workers = workers or os.cpu_count() or 1
+    jobs = [(backend, document) for document in documents]
+
+    if workers == 1 or len(jobs) <= 1:
+        return [_timed_html_to_text(job) for job in jobs]
+
+    logging.debug(f'Extracting {len(jobs)} documents with {workers} workers ({backend})')
+    with ProcessPoolExecutor(max_workers=min(workers, len(jobs))) as executor:
+        return list(executor.map(_timed_html_to_text, jobs))
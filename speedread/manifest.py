@@ -0,0 +1,104 @@
+import hashlib
+import json
+import logging
+import os
+import time
+from pathlib import Path
+from speedread.mp3_info import id3v2_size, parse_frame_header
+
+MANIFEST_NAME = 'manifest.jsonl'
+
+
+def content_hash(*parts):
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(str(part).encode('utf-8'))
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+
+def file_hash(path, block_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def is_valid_mp3(path):
+    """Cheap sanity check that a file starts with an MPEG audio frame."""
+    with open(path, 'rb') as f:
+        f.seek(id3v2_size(f.read(10)))
+        return parse_frame_header(f.read(4), 0) is not None
+
+
+class Manifest:
+    """
+    Append-only journal of per-chapter stage completions for one book.
+
+    Every completed stage appends one JSON line (stage, chapter key, hash of
+    the stage's inputs, and the outputs) and fsyncs it, so after a crash the
+    next run knows exactly which chapter outputs are still valid. A torn
+    last line from a crash mid-write is ignored.
+    """
+
+    def __init__(self, output_dir):
+        self.path = Path(output_dir) / MANIFEST_NAME
+        self.records = {}
+        if self.path.exists():
+            self._load()
+
+    def _load(self):
+        with open(self.path, 'rb') as f:
+            data = f.read()
+        complete = data[:data.rfind(b'\n') + 1]
+        if len(complete) < len(data):
+            # Drop a torn final line so the next append starts on a fresh line
+            logging.warning(f"Discarding incomplete last record in {self.path}")
+            with open(self.path, 'r+b') as f:
+                f.truncate(len(complete))
+        for line_number, line in enumerate(complete.decode('utf-8', errors='replace').splitlines(), 1):
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                logging.warning(f"Ignoring unreadable manifest line {line_number} in {self.path}")
+                continue
+            self.records[(record['stage'], record['key'])] = record
+        logging.info(f"Loaded {len(self.records)} completed stage records from {self.path}")
+
+    def get(self, stage, key, input_hash):
+        record = self.records.get((stage, str(key)))
+        if record and record['input_hash'] == input_hash:
+            return record
+        return None
+
+    def record(self, stage, key, input_hash, file=None, **outputs):
+        record = {'stage': stage, 'key': str(key), 'input_hash': input_hash, 'time': time.time(), **outputs}
+        if file is not None:
+            # Files are stored relative to the manifest so the output dir can move
+            record['file'] = os.path.relpath(file, self.path.parent)
+            record['size'] = Path(file).stat().st_size
+        line = json.dumps(record, ensure_ascii=False) + '\n'
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(line)
+            f.flush()
+            os.fsync(f.fileno())
+        self.records[(stage, str(key))] = record
+        return record
+
+    def completed_file(self, stage, key, input_hash, validate=None):
+        """
+        Return the file a stage recorded for this input, if it is still on
+        disk with the recorded size and passes `validate`.
+        """
+        record = self.get(stage, key, input_hash)
+        if not record or 'file' not in record:
+            return None
+        path = self.path.parent / record['file']
+        if not path.exists() or path.stat().st_size != record['size']:
+            logging.warning(f"{stage} output for {key} is missing or truncated: {path}")
+            return None
+        if validate and not validate(path):
+            logging.warning(f"{stage} output for {key} failed validation: {path}")
+            return None
+        return path
@@ -0,0 +1,212 @@
+import copy
+import cProfile
+import json
+import pstats
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from speedread.utils import atomic_write
+
+RUN_REPORT_NAME = 'run_report.json'
+PROFILE_NAME = 'run_profile.pstats'
+# USD per million prompt/completion tokens or synthesized characters, for the cost estimate
+PRICES = {
+    'gpt-4-turbo': {'prompt_tokens': 10.0, 'completion_tokens': 30.0},
+    'gpt-3.5-turbo-16k': {'prompt_tokens': 3.0, 'completion_tokens': 4.0},
+    'tts-1': {'characters': 15.0},
+    'tts-1-hd': {'characters': 30.0},
+}
+
+_run = ContextVar('speedread_run', default=None)
+# (stage, chapter) that counters recorded right now belong to
+_scope = ContextVar('speedread_scope', default=(None, None))
+
+
+class RunMetrics:
+    """
+    Timings and counters for one run, broken down by stage and by chapter.
+
+    Instrumented code finds the active run through a context variable, which
+    asyncio tasks and `asyncio.to_thread` calls inherit, so nothing has to be
+    passed down the call chain and code running outside a run records
+    nothing. Stage seconds are summed over all spans of the stage; wall
+    seconds run from its first start to its last end, so for a stage that
+    runs chapters concurrently the two differ by the overlap.
+    """
+
+    def __init__(self, profile=False):
+        self.started = time.time()
+        self._start = time.perf_counter()
+        self.stages = {}
+        self.chapters = {}
+        self.usage = {}
+        self.profiles = [] if profile else None
+        self._lock = threading.Lock()
+
+    def _stage(self, name):
+        return self.stages.setdefault(name, {'calls': 0, 'seconds': 0.0, 'first_start': None, 'last_end': None})
+
+    def _chapter(self, stage, chapter):
+        return self.chapters.setdefault(str(chapter), {}).setdefault(stage, {'seconds': 0.0})
+
+    def add_span(self, stage, chapter, start, end):
+        with self._lock:
+            entry = self._stage(stage)
+            entry['calls'] += 1
+            entry['seconds'] += end - start
+            entry['first_start'] = start if entry['first_start'] is None else min(entry['first_start'], start)
+            entry['last_end'] = end if entry['last_end'] is None else max(entry['last_end'], end)
+            if chapter is not None:
+                self._chapter(stage, chapter)['seconds'] += end - start
+
+    def add(self, stage, chapter, counters):
+        stage = stage or 'other'
+        with self._lock:
+            targets = [self._stage(stage)]
+            if chapter is not None:
+                targets.append(self._chapter(stage, chapter))
+            for target in targets:
+                for name, value in counters.items():
+                    target[name] = target.get(name, 0) + value
+
+    def add_usage(self, model, counters):
+        with self._lock:
+            entry = self.usage.setdefault(model, {'requests': 0})
+            entry['requests'] += 1
+            for name, value in counters.items():
+                entry[name] = entry.get(name, 0) + value
+
+    def add_profile(self, profile):
+        with self._lock:
+            self.profiles.append(profile)
+
+    def cost(self, model, counters):
+        prices = PRICES.get(model, {})
+        return sum(counters.get(name, 0) * price / 1_000_000 for name, price in prices.items())
+
+    def report(self, **extra):
+        with self._lock:
+            stages = {}
+            for name, entry in self.stages.items():
+                stage = {key: value for key, value in entry.items() if key not in ('first_start', 'last_end')}
+                if entry['first_start'] is not None:
+                    stage['wall_seconds'] = entry['last_end'] - entry['first_start']
+                stages[name] = stage
+            usage = {model: {**counters, 'cost_usd': round(self.cost(model, counters), 4)}
+                     for model, counters in self.usage.items()}
+            return {
+                **extra,
+                'started': self.started,
+                'seconds': time.perf_counter() - self._start,
+                'stages': stages,
+                'chapters': copy.deepcopy(self.chapters),
+                'usage': usage,
+                'cost_usd': round(sum(entry['cost_usd'] for entry in usage.values()), 4),
+            }
+
+    def write_report(self, path, **extra):
+        with atomic_write(path) as f:
+            json.dump(self.report(**extra), f, ensure_ascii=False, indent=2)
+
+    def dump_profile(self, path):
+        """Merge the profiles of every profiled section into one pstats file. False if there were none."""
+        with self._lock:
+            profiles = list(self.profiles or [])
+        if not profiles:
+            return False
+        stats = pstats.Stats(profiles[0])
+        for profile in profiles[1:]:
+            stats.add(profile)
+        stats.dump_stats(str(path))
+        return True
+
+
+@contextmanager
+def collecting(metrics):
+    """Make `metrics` the active run for the enclosed code and the tasks it starts."""
+    token = _run.set(metrics)
+    try:
+        yield metrics
+    finally:
+        _run.reset(token)
+
+
+@contextmanager
+def stage(name, chapter=None):
+    """Time the enclosed code as `name`, for `chapter` if given; counters recorded inside go there too."""
+    metrics = _run.get()
+    if metrics is None:
+        yield
+        return
+    token = _scope.set((name, chapter))
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics.add_span(name, chapter, start, time.perf_counter())
+        _scope.reset(token)
+
+
+def record(**counters):
+    """Add to counters of the current stage and chapter."""
+    metrics = _run.get()
+    if metrics is not None:
+        metrics.add(*_scope.get(), counters)
+
+
+def record_completion(model, usage):
+    """Record the token usage a chat completion response reports."""
+    if usage is None:
+        return
+    counters = {'prompt_tokens': usage.prompt_tokens or 0, 'completion_tokens': usage.completion_tokens or 0}
+    record(**counters)
+    metrics = _run.get()
+    if metrics is not None:
+        metrics.add_usage(model, counters)
+
+
+def record_speech(model, characters):
+    record(tts_characters=characters)
+    metrics = _run.get()
+    if metrics is not None:
+        metrics.add_usage(model, {'characters': characters})
+
+
+@asynccontextmanager
+async def acquire(semaphore):
+    """`async with semaphore`, recording the time spent waiting for a slot as queue wait. No-op without one."""
+    if semaphore is None:
+        yield
+        return
+    start = time.perf_counter()
+    async with semaphore:
+        record(queue_wait_seconds=time.perf_counter() - start)
+        yield
+
+
+def profiling():
+    """True when the active run was started with profiling."""
+    metrics = _run.get()
+    return metrics is not None and metrics.profiles is not None
+
+
+@contextmanager
+def profiled():
+    """cProfile the enclosed CPU-bound code when the active run was started with profiling."""
+    metrics = _run.get()
+    if metrics is None or metrics.profiles is None:
+        yield
+        return
+    profile = cProfile.Profile()
+    try:
+        profile.enable()
+    except ValueError:
+        # Another profiler is already active on this thread
+        yield
+        return
+    try:
+        yield
+    finally:
+        profile.disable()
+        metrics.add_profile(profile)
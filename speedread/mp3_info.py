@@ -0,0 +1,155 @@
+import mmap
+from pathlib import Path
+
+# Bitrates in kbps by [version is MPEG-1][layer], indexed by the 4-bit field
+BITRATES = {
+    (True, 1): (0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448),
+    (True, 2): (0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384),
+    (True, 3): (0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320),
+    (False, 1): (0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256),
+    (False, 2): (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+    (False, 3): (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+}
+# Sample rates by the 2-bit version field (0: MPEG-2.5, 2: MPEG-2, 3: MPEG-1)
+SAMPLE_RATES = {0: (11025, 12000, 8000), 2: (22050, 24000, 16000), 3: (44100, 48000, 32000)}
+
+
+def id3v2_size(data):
+    """Size of a leading ID3v2 tag (header, body and footer), or 0."""
+    if len(data) < 10 or data[:3] != b'ID3':
+        return 0
+    # The tag size is a 28-bit synchsafe integer
+    size = (data[6] << 21) | (data[7] << 14) | (data[8] << 7) | data[9]
+    footer = 10 if data[5] & 0x10 else 0
+    return 10 + size + footer
+
+
+def parse_frame_header(data, offset):
+    """
+    Decode the 4-byte MPEG audio frame header at `offset`.
+
+    Returns (frame_length, samples_per_frame, sample_rate, side_info_length),
+    or None if the bytes are not a valid header.
+    """
+    if offset + 4 > len(data) or data[offset] != 0xFF or (data[offset + 1] & 0xE0) != 0xE0:
+        return None
+    b1, b2, b3 = data[offset + 1], data[offset + 2], data[offset + 3]
+    version = (b1 >> 3) & 0x03
+    layer = 4 - ((b1 >> 1) & 0x03)
+    bitrate_index = b2 >> 4
+    sample_rate_index = (b2 >> 2) & 0x03
+    if version == 1 or layer == 4 or bitrate_index in (0, 15) or sample_rate_index == 3:
+        # Reserved values, or free-format bitrate which has no fixed frame length
+        return None
+    mpeg1 = version == 3
+    bitrate = BITRATES[(mpeg1, layer)][bitrate_index] * 1000
+    sample_rate = SAMPLE_RATES[version][sample_rate_index]
+    padding = (b2 >> 1) & 0x01
+    if layer == 1:
+        samples = 384
+        length = (12 * bitrate // sample_rate + padding) * 4
+    elif layer == 2 or mpeg1:
+        samples = 1152
+        length = 144 * bitrate // sample_rate + padding
+    else:
+        samples = 576
+        length = 72 * bitrate // sample_rate + padding
+    mono = (b3 >> 6) == 3
+    if mpeg1:
+        side_info = 17 if mono else 32
+    else:
+        side_info = 9 if mono else 17
+    return length, samples, sample_rate, side_info
+
+
+def xing_frame_count(data, offset, side_info):
+    """Frame count from a Xing/Info header in the first frame, if present."""
+    tag = offset + 4 + side_info
+    if data[tag:tag + 4] not in (b'Xing', b'Info'):
+        return None
+    flags = int.from_bytes(data[tag + 4:tag + 8], 'big')
+    if not flags & 0x01:
+        return None
+    return int.from_bytes(data[tag + 8:tag + 12], 'big')
+
+
+def audio_data_offset(data):
+    """
+    Offset of the first audio frame, past any ID3v2 tag and Xing/Info frame.
+    Used to concatenate MP3 streams without carrying over per-file headers.
+    """
+    offset = find_first_frame(data)
+    if offset is None:
+        return id3v2_size(data[:10])
+    length, _, _, side_info = parse_frame_header(data, offset)
+    tag = offset + 4 + side_info
+    if data[tag:tag + 4] in (b'Xing', b'Info'):
+        offset += length
+    return offset
+
+
+def find_first_frame(data, start=0):
+    """
+    Offset of the first frame that is followed by another valid frame (or
+    the end of the data), skipping any ID3v2 tag. None if there is none.
+    """
+    offset = start + id3v2_size(data[start:start + 10])
+    end = len(data)
+    while offset < end - 3:
+        header = parse_frame_header(data, offset)
+        if header:
+            next_offset = offset + header[0]
+            if next_offset >= end or parse_frame_header(data, next_offset):
+                return offset
+        offset = data.find(b'\xff', offset + 1)
+        if offset < 0:
+            return None
+    return None
+
+
+def scan_mp3(data):
+    """Return (duration_seconds, frame_count) by walking the frame headers."""
+    offset = find_first_frame(data)
+    if offset is None:
+        raise ValueError("no MPEG audio frames found")
+    length, samples, sample_rate, side_info = parse_frame_header(data, offset)
+    frames = xing_frame_count(data, offset, side_info)
+    if frames is not None:
+        # The Xing/Info frame itself carries no audio
+        return frames * samples / sample_rate, frames
+
+    frames = 0
+    duration = 0.0
+    end = len(data)
+    while offset < end:
+        header = parse_frame_header(data, offset)
+        if header is None:
+            # Resynchronize on the next candidate sync byte (skips ID3v1/APE tags and junk)
+            offset = data.find(b'\xff', offset + 1)
+            if offset < 0:
+                break
+            continue
+        length, samples, sample_rate, _ = header
+        if offset + length > end:
+            # Truncated final frame
+            break
+        frames += 1
+        duration += samples / sample_rate
+        offset += length
+    return duration, frames
+
+
+def mp3_duration(path):
+    """
+    Duration of an MP3 file in seconds, computed from its frame headers
+    without decoding audio or spawning ffprobe.
+    """
+    path = Path(path)
+    if path.stat().st_size == 0:
+        raise ValueError(f"{path} is empty")
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        try:
+            duration, _ = scan_mp3(data)
+        except ValueError as e:
+            raise ValueError(f"{path}: {e}") from None
+    return duration
@@ -0,0 +1,44 @@
+DEFAULT_MAX_CONNECTIONS = 64
+
+_client = None
+
+
+def get_client(max_connections=DEFAULT_MAX_CONNECTIONS):
+    """
+    Return the process-wide AsyncOpenAI client.
+
+    All stages share one client and therefore one pooled HTTP connection
+    pool, so concurrency costs sockets rather than threads. The pool size is
+    fixed by the first call.
+    """
+    global _client
+    if _client is None:
+        # openai and httpx take most of the package's import time, so load them on first use
+        import httpx
+        from openai import AsyncOpenAI, DefaultAsyncHttpxClient
+
+        limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+        # Retries are handled by speedread.rate_limiter so they share one budget
+        _client = AsyncOpenAI(http_client=DefaultAsyncHttpxClient(limits=limits), max_retries=0)
+    return _client
+
+
+class LazyClient:
+    """
+    Stand-in for the process-wide client that creates it on first attribute
+    access, so a run that never calls the API, like a resume that only
+    renders HTML, does not load openai and httpx.
+    """
+
+    def __init__(self, max_connections=DEFAULT_MAX_CONNECTIONS):
+        self.max_connections = max_connections
+
+    def __getattr__(self, name):
+        return getattr(get_client(self.max_connections), name)
+
+
+async def close_client():
+    global _client
+    if _client is not None:
+        await _client.close()
+        _client = None
@@ -0,0 +1,105 @@
+import asyncio
+import logging
+import time
+
+_DONE = object()
+
+
+class Stage:
+    """
+    One step of a streaming pipeline.
+
+    `worker` is a coroutine function that takes an item and returns it (or a
+    replacement) for the next stage. Up to `concurrency` items are processed
+    at once, and at most `queue_size` finished items wait for the next stage
+    before this one blocks.
+    """
+
+    def __init__(self, name, worker, concurrency, queue_size=None):
+        self.name = name
+        self.worker = worker
+        self.concurrency = concurrency
+        self.queue_size = queue_size or concurrency * 2
+        self.latencies = []
+        self.queue_waits = []
+        self.max_depth = 0
+
+
+async def _run_stage(stage, inbox, outbox):
+    async def work():
+        while True:
+            depth = inbox.qsize()
+            entry = await inbox.get()
+            if entry is _DONE:
+                # Leave the marker for the sibling workers
+                await inbox.put(_DONE)
+                return
+            stage.max_depth = max(stage.max_depth, depth)
+            item, enqueued = entry
+            started = time.monotonic()
+            stage.queue_waits.append(started - enqueued)
+            try:
+                result = await stage.worker(item)
+            except Exception as e:
+                logging.error(f"{stage.name}: failed on {item!r:.80}: {e}")
+                continue
+            stage.latencies.append(time.monotonic() - started)
+            if result is not None and outbox is not None:
+                await outbox.put((result, time.monotonic()))
+
+    await asyncio.gather(*[work() for _ in range(stage.concurrency)])
+    if outbox is not None:
+        await outbox.put(_DONE)
+
+
+async def _monitor(stages, queues, interval):
+    while True:
+        await asyncio.sleep(interval)
+        depths = [f"{stage.name}={queue.qsize()}" for stage, queue in zip(stages, queues)]
+        logging.info(f"Pipeline queue depth: {', '.join(depths)}")
+
+
+def _log_stage_summary(stage):
+    if not stage.latencies:
+        logging.info(f"Stage {stage.name}: no items completed")
+        return
+    latencies = sorted(stage.latencies)
+    mean_wait = sum(stage.queue_waits) / len(stage.queue_waits)
+    logging.info(f"Stage {stage.name}: {len(latencies)} items, "
+                 f"latency mean {sum(latencies) / len(latencies):.2f}s / max {latencies[-1]:.2f}s, "
+                 f"queue wait mean {mean_wait:.2f}s, max queue depth {stage.max_depth}")
+
+
+async def run_pipeline(items, stages, monitor_interval=10):
+    """
+    Stream items through the stages, each stage running as soon as its
+    input is ready. Returns the items that made it out of the last stage.
+    """
+    queues = [asyncio.Queue(maxsize=stage.queue_size) for stage in stages]
+    results = []
+
+    async def collect(item):
+        results.append(item)
+        return item
+
+    sink = Stage('collect', collect, 1)
+    queues.append(asyncio.Queue())
+
+    async def feed():
+        for item in items:
+            await queues[0].put((item, time.monotonic()))
+        await queues[0].put(_DONE)
+
+    monitor = asyncio.create_task(_monitor(stages, queues, monitor_interval))
+    try:
+        await asyncio.gather(
+            feed(),
+            *[_run_stage(stage, queues[i], queues[i + 1]) for i, stage in enumerate(stages)],
+            _run_stage(sink, queues[-1], None),
+        )
+    finally:
+        monitor.cancel()
+
+    for stage in stages:
+        _log_stage_summary(stage)
+    return results
@@ -0,0 +1,175 @@
+import asyncio
+import logging
+import random
+import re
+import time
+import weakref
+from speedread.metrics import record
+
+DEFAULT_REQUESTS_PER_MINUTE = 500
+DEFAULT_TOKENS_PER_MINUTE = 150000
+# Fraction of the advertised limits we aim for, to stay just under the ceiling
+HEADROOM = 0.95
+MAX_RETRIES = 6
+BASE_RETRY_DELAY = 1.0
+MAX_RETRY_DELAY = 60.0
+
+_DURATION_PART = re.compile(r'(\d+(?:\.\d+)?)(ms|s|m|h)')
+_DURATION_UNITS = {'ms': 0.001, 's': 1, 'm': 60, 'h': 3600}
+
+
+def parse_duration(value):
+    """Parse the reset durations OpenAI sends, e.g. '20ms', '1.5s', '6m0s'."""
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    parts = _DURATION_PART.findall(value)
+    if not parts:
+        return None
+    return sum(float(amount) * _DURATION_UNITS[unit] for amount, unit in parts)
+
+
+class TokenBucket:
+    def __init__(self, per_minute):
+        self.capacity = per_minute
+        self.level = per_minute
+        self.updated = time.monotonic()
+
+    def refill(self, now):
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.capacity / 60)
+        self.updated = now
+
+    def wait_time(self, amount):
+        missing = min(amount, self.capacity) - self.level
+        return max(0.0, missing * 60 / self.capacity)
+
+
+class RateLimiter:
+    """
+    Requests-per-minute and tokens-per-minute budget for one model.
+
+    Callers acquire their request and token cost before dispatching. Limits
+    start at the defaults and follow the x-ratelimit-* response headers, so
+    after the first response the limiter tracks the account's real ceiling.
+    """
+
+    def __init__(self, model, requests_per_minute=DEFAULT_REQUESTS_PER_MINUTE,
+                 tokens_per_minute=DEFAULT_TOKENS_PER_MINUTE):
+        self.model = model
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.paused_until = 0.0
+        # Created on first use, inside the loop that waits on it
+        self._lock = None
+
+    async def acquire(self, tokens=0):
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        # The lock keeps waiters in FIFO order so large requests are not starved
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.requests.refill(now)
+                self.tokens.refill(now)
+                wait = max(self.paused_until - now,
+                           self.requests.wait_time(1),
+                           self.tokens.wait_time(tokens))
+                if wait <= 0:
+                    self.requests.level -= 1
+                    self.tokens.level -= min(tokens, self.tokens.capacity)
+                    return
+                logging.debug(f'{self.model}: waiting {wait:.2f}s for rate limit budget')
+                await asyncio.sleep(wait)
+
+    def pause(self, seconds):
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+    def update_from_headers(self, headers):
+        if not headers:
+            return
+        for bucket, kind in ((self.requests, 'requests'), (self.tokens, 'tokens')):
+            limit = headers.get(f'x-ratelimit-limit-{kind}')
+            remaining = headers.get(f'x-ratelimit-remaining-{kind}')
+            try:
+                if limit is not None:
+                    bucket.capacity = max(1.0, float(limit) * HEADROOM)
+                if remaining is not None:
+                    bucket.level = min(bucket.level, float(remaining) - float(limit or 0) * (1 - HEADROOM))
+            except ValueError:
+                logging.debug(f'Ignoring malformed rate limit header for {kind}: {limit}/{remaining}')
+
+
+# Limiters per event loop, so their lock and pause state never outlive the
+# loop that uses them and a later asyncio.run starts from the defaults
+_limiters = weakref.WeakKeyDictionary()
+
+
+def get_limiter(model):
+    """Return the running loop's limiter for a model, shared by every stage."""
+    limiters = _limiters.setdefault(asyncio.get_running_loop(), {})
+    if model not in limiters:
+        limiters[model] = RateLimiter(model)
+    return limiters[model]
+
+
+def retry_delay(attempt, error=None):
+    if error is not None and getattr(error, 'response', None) is not None:
+        headers = error.response.headers
+        retry_after_ms = headers.get('retry-after-ms')
+        if retry_after_ms:
+            try:
+                return float(retry_after_ms) / 1000
+            except ValueError:
+                pass
+        retry_after = parse_duration(headers.get('retry-after'))
+        if retry_after is not None:
+            return retry_after
+    # Full jitter keeps concurrent retries from arriving in lockstep
+    return random.uniform(0, min(MAX_RETRY_DELAY, BASE_RETRY_DELAY * 2 ** attempt))
+
+
+def is_retryable(error):
+    from openai import APIConnectionError, APIStatusError, APITimeoutError, RateLimitError
+    if isinstance(error, RateLimitError):
+        return getattr(error, 'code', None) != 'insufficient_quota'
+    if isinstance(error, (APIConnectionError, APITimeoutError)):
+        return True
+    if isinstance(error, APIStatusError):
+        return error.status_code >= 500 or error.status_code == 409
+    return False
+
+
+async def call_with_retry(model, tokens, request, max_retries=MAX_RETRIES):
+    """
+    Run `request` (a coroutine function) under the model's rate limiter.
+
+    Rate limit, connection and server errors are retried with jittered
+    exponential backoff, honouring Retry-After when the server sends it. A
+    429 pauses every caller of the model, not just the one that hit it.
+    """
+    limiter = get_limiter(model)
+    for attempt in range(max_retries + 1):
+        wait_start = time.perf_counter()
+        await limiter.acquire(tokens)
+        record(api_calls=1, rate_limit_wait_seconds=time.perf_counter() - wait_start)
+        try:
+            result = await request()
+        except Exception as e:
+            if attempt == max_retries or not is_retryable(e):
+                raise
+            response = getattr(e, 'response', None)
+            if response is not None:
+                limiter.update_from_headers(response.headers)
+            delay = retry_delay(attempt, e)
+            if getattr(e, 'status_code', None) == 429:
+                limiter.pause(delay)
+            record(retries=1)
+            logging.warning(f"{model}: {type(e).__name__}, retrying in {delay:.1f}s "
+                            f"(attempt {attempt + 1}/{max_retries})")
+            await asyncio.sleep(delay)
+            continue
+        limiter.update_from_headers(getattr(result, 'headers', None))
+        return result
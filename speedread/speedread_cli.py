@@ -1,100 +1,287 @@
 import argparse
 import os
+import sys
 from pathlib import Path
 import json
 import logging
 import asyncio
-
-# Get log level from environment variable, default to INFO
-log_level = os.environ.get('LOG_LEVEL', 'INFO').upper()
-logging.basicConfig(
-    level=getattr(logging, log_level),
-    format='%(asctime)s - %(levelname)s - %(message)s'
-)
-
-from speedread.utils import sanitize_filename
-
-from speedread.epub2json import epub_to_json
-from speedread.trim_chapters import trim_chapters
-from speedread.summarize_book import summarize_chapter
-from speedread.compile_summaries import create_html_content
-from speedread.batch_text_to_speech import process_chapter
-from speedread.text_to_speech import VALID_VOICES
-from speedread.create_audiobook import create_audiobook
-
-from openai import OpenAI
-
-
-async def summarize_chapters(client, chapters, max_concurrency):
-    async def summarize(chapter):
+from speedread.utils import atomic_write, configure_logging, int_at_least, sanitize_filename
+from speedread.metrics import PROFILE_NAME, RUN_REPORT_NAME, RunMetrics, acquire, collecting, profiled, stage
+from speedread.openai_client import LazyClient, close_client
+
+# Stage modules are imported by the functions that run each stage, so that
+# `--help`, `site` and a resume that only renders HTML do not load them all
+
+
+async def summarize_journaled(client, number, chapter, cache=None, manifest=None,
+                              chunk_tokens=None, reduce_fan_in=None, semaphore=None):
+    from speedread.manifest import content_hash
+    from speedread.summarize_book import DEFAULT_CHUNK_TOKENS, DEFAULT_REDUCE_FAN_IN, MODEL as SUMMARY_MODEL, summarize_chapter
+
+    chunk_tokens = chunk_tokens or DEFAULT_CHUNK_TOKENS
+    reduce_fan_in = reduce_fan_in or DEFAULT_REDUCE_FAN_IN
+    input_hash = content_hash(SUMMARY_MODEL, chapter['title'], chapter['content'], chunk_tokens, reduce_fan_in)
+    # Keyed by chapter ID so a changed trim does not mix up chapters on resume
+    key = chapter.get('id', number)
+    if manifest:
+        record = manifest.get('summary', key, input_hash)
+        if record:
+            logging.info(f"Summary already complete: {chapter['title']}")
+            return record['summary']
+
+    summary = await summarize_chapter(client, chapter['content'], chapter['title'], cache,
+                                      chunk_tokens, reduce_fan_in, semaphore)
+    if manifest:
+        manifest.record('summary', key, input_hash, chapter_title=chapter['title'], summary=summary)
+    return summary
+
+async def summarize_chapters(client, chapters, max_concurrency, cache=None, chunk_tokens=None, reduce_fan_in=None,
+                             manifest=None, semaphore=None):
+    async def summarize(number, chapter):
         return {
+            "chapter_id": chapter.get('id'),
             "chapter_title": chapter['title'],
-            "summary": await asyncio.to_thread(summarize_chapter, client, chapter['content'], chapter['title'])
+            "summary": await summarize_journaled(client, number, chapter, cache, manifest,
+                                                 chunk_tokens, reduce_fan_in, semaphore)
         }
 
-    semaphore = asyncio.Semaphore(max_concurrency)
-    async def bounded_summarize(chapter):
-        async with semaphore:
-            return await summarize(chapter)
+    # Every API request takes a slot, not every chapter, so chunked chapters stay within the limit
+    semaphore = semaphore or asyncio.Semaphore(max_concurrency)
+    async def bounded_summarize(number, chapter):
+        with stage('summarize', chapter.get('id', number)):
+            return await summarize(number, chapter)
 
-    tasks = [bounded_summarize(chapter) for chapter in chapters]
+    tasks = [bounded_summarize(number, chapter) for number, chapter in enumerate(chapters, start=1)]
     return await asyncio.gather(*tasks)
 
-async def async_main():
-    logging.getLogger("openai").setLevel(logging.WARNING)
+async def stream_chapters(client, chapters, audio_dir, segments_dir, args, cache=None, manifest=None,
+                          semaphore=None, audio_cache=None):
+    """
+    Summarize, synthesize and encode each chapter independently, so a chapter
+    starts TTS as soon as its own summary is ready.
+
+    Every chapter comes out of the pipeline, with its summary (None if
+    summarizing failed) and its MP3 (None if there is no audio). A TTS or
+    encode failure only costs the chapter its audio, never its summary.
+    """
+    from speedread.batch_text_to_speech import process_chapter
+    from speedread.pipeline import Stage, run_pipeline
+
+    semaphore = semaphore or asyncio.Semaphore(args.concurrency)
+
+    async def summarize(item):
+        with stage('summarize', item['chapter_id'] or item['number']):
+            try:
+                item['summary'] = await summarize_journaled(client, item['number'], item['chapter'], cache, manifest,
+                                                            args.chunk_tokens, args.reduce_fan_in, semaphore)
+            except Exception as e:
+                logging.error(f"Error summarizing '{item['chapter_title']}': {e}")
+                item['summary'] = None
+        return item
+
+    async def synthesize(item):
+        item['mp3'] = None
+        if item['summary'] is not None:
+            item['mp3'] = await process_chapter(client, item, audio_dir, semaphore, args.voice, manifest,
+                                                audio_cache)
+        return item
+
+    async def encode(item):
+        if item['mp3']:
+            try:
+                with stage('encode', item['chapter_id'] or item['number']):
+                    await asyncio.to_thread(encode_journaled, item['mp3'], segments_dir, manifest)
+            except Exception as e:
+                logging.error(f"Error encoding {item['mp3']}, will retry when assembling: {e}")
+        return item
+
+    items = [
+        {'number': i, 'chapter_id': chapter.get('id'), 'chapter_title': chapter['title'], 'chapter': chapter}
+        for i, chapter in enumerate(chapters, start=1)
+    ]
+    stages = [
+        Stage('summarize', summarize, args.concurrency),
+        Stage('tts', synthesize, args.concurrency),
+        Stage('encode', encode, os.cpu_count() or 1),
+    ]
+    results = await run_pipeline(items, stages)
+    results.sort(key=lambda item: item['number'])
+    if len(results) < len(items):
+        logging.warning(f"{len(items) - len(results)} chapters failed in the pipeline")
+    return results
+
+def encode_journaled(mp3_file, segments_dir, manifest=None):
+    from speedread.create_audiobook import encode_chapter
+    from speedread.manifest import file_hash
+
+    aac_file = segments_dir / f"{mp3_file.stem}.m4a"
+    if not manifest:
+        return encode_chapter(mp3_file, aac_file)
+    input_hash = file_hash(mp3_file)
+    if manifest.completed_file('aac', mp3_file.stem, input_hash) == aac_file:
+        logging.info(f"AAC segment already complete: {aac_file}")
+        return aac_file
+    encode_chapter(mp3_file, aac_file)
+    manifest.record('aac', mp3_file.stem, input_hash, file=aac_file)
+    return aac_file
+
+def confirm_audiobook(args):
+    logging.info("Ready to start text-to-speech conversion.")
+    if args.yes:
+        return True
+    response = input("Would you like to proceed with creating the audiobook? (y/n): ").lower().strip()
+    if response != 'y':
+        logging.info("Audiobook creation cancelled.")
+        return False
+    return True
+
+def add_book_arguments(parser):
+    from speedread.cache import DEFAULT_AUDIO_MAX_BYTES, DEFAULT_CACHE_DIR, DEFAULT_MAX_BYTES
+    from speedread.html_text import DEFAULT_BACKEND, TEXT_BACKENDS
+    from speedread.summarize_book import DEFAULT_CHUNK_TOKENS, DEFAULT_REDUCE_FAN_IN
+    from speedread.text_to_speech import VALID_VOICES
 
-    parser = argparse.ArgumentParser(description='Convert EPUB to HTML summary and audiobook.')
-    parser.add_argument('epub_file', help='Path to the input EPUB file')
     parser.add_argument('--audiobook', action='store_true', help='Create audiobook (optional)')
     parser.add_argument('--concurrency', type=int, default=5, help='Number of concurrent summarization operations')
     parser.add_argument('--voice', type=str, choices=VALID_VOICES, default="alloy",
                         help='Voice to use for text-to-speech (default: alloy)')
     parser.add_argument('-y', '--yes', action='store_true',
                         help='Skip confirmation prompts')
-    args = parser.parse_args()
-
-    epub_path = Path(args.epub_file)
-    if not epub_path.exists():
-        logging.error(f"Error: File {epub_path} does not exist.")
-        return
-
+    parser.add_argument('--text-backend', choices=TEXT_BACKENDS, default=DEFAULT_BACKEND,
+                        help=f'HTML to text converter used when parsing the EPUB (default: {DEFAULT_BACKEND})')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='Number of processes for chapter text extraction (default: CPU count)')
+    parser.add_argument('--cache-dir', default=DEFAULT_CACHE_DIR,
+                        help=f'Directory of the API response cache (default: {DEFAULT_CACHE_DIR})')
+    parser.add_argument('--cache-size-mb', type=int, default=DEFAULT_MAX_BYTES // 2**20,
+                        help='Size cap of the API response cache in MB')
+    parser.add_argument('--audio-cache-size-mb', type=int, default=DEFAULT_AUDIO_MAX_BYTES // 2**20,
+                        help='Size cap of the synthesized audio cache in MB')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='Do not read or write the API response and audio caches')
+    parser.add_argument('--chunk-tokens', type=int_at_least(1), default=DEFAULT_CHUNK_TOKENS,
+                        help=f'Chapters longer than this many tokens are summarized in chunks (default: {DEFAULT_CHUNK_TOKENS})')
+    parser.add_argument('--reduce-fan-in', type=int_at_least(2), default=DEFAULT_REDUCE_FAN_IN,
+                        help=f'Number of chunk summaries merged per reduce call (default: {DEFAULT_REDUCE_FAN_IN})')
+    parser.add_argument('--pipeline', action='store_true',
+                        help='With --audiobook, stream each chapter through summary, TTS and encoding as soon as it is ready')
+    parser.add_argument('--profile', action='store_true',
+                        help=f'Save a cProfile dump of the CPU-bound stages as {PROFILE_NAME} in the output dir')
+
+def book_output_dir(epub_path):
     safe_title = sanitize_filename(epub_path.stem)
     output_dir = epub_path.parent / f"{safe_title}_speedread"
     output_dir.mkdir(exist_ok=True)
+    return safe_title, output_dir
+
+def log_step(number, description, progress=None):
+    """Log the start of a pipeline step and pass it to the `progress(number, description)` hook, if any."""
+    logging.info(f"Step {number}: {description}")
+    if progress:
+        progress(number, description)
 
+async def load_content_store(epub_path, output_dir, safe_title, args, client, cache=None, progress=None):
+    """Open the parsed book in the output dir, parsing the EPUB on first use."""
+    from speedread.content_store import ContentStore
+
+    content_file = output_dir / f"{safe_title}_content.sqlite"
     content_json_file = output_dir / f"{safe_title}_content.json"
     markdown_file = output_dir / f"{safe_title}_content.md"
-    summary_json_file = output_dir / f"{safe_title}_summary.json"
-    html_file = output_dir / f"{safe_title}_summary.html"
 
-    structured_content = None
+    if content_file.exists():
+        logging.info("Loading existing content...")
+        return ContentStore(content_file)
     if content_json_file.exists():
-        logging.info("Loading existing content from JSON...")
-        with open(content_json_file, 'r', encoding='utf-8') as f:
-            structured_content = json.load(f)
-    else:
-        logging.info("Step 1: Parsing EPUB...")
-        structured_content = epub_to_json(str(epub_path))
-        if not structured_content:
-            logging.error("Error: Failed to convert EPUB to structured text.")
-            return
-        
-        # Save as JSON for internal use
-        with open(content_json_file, 'w', encoding='utf-8') as f:
-            json.dump(structured_content, f, ensure_ascii=False, indent=2)
-        logging.info(f"Content JSON saved to: {content_json_file}")
+        # Written by an older version
+        return ContentStore.from_json(content_file, content_json_file)
+
+    log_step(1, "Parsing EPUB...", progress)
+    from speedread.epub2json import epub_to_json
+    structured_content = await epub_to_json(str(epub_path), client, args.text_backend, args.workers, cache)
+    if not structured_content:
+        logging.error("Error: Failed to convert EPUB to structured text.")
+        return None
+
+    with stage('parse'), profiled():
+        store = ContentStore.write(content_file, structured_content)
+        logging.info(f"Content saved to: {content_file}")
 
         # Save as markdown for human reading
-        markdown_content = f"# {structured_content['title']}\nby {structured_content['author']}\n\n"
-        for chapter in structured_content['chapters']:
-            markdown_content += f"# {chapter['title']}\n{chapter['content']}\n\n"
-        
-        with open(markdown_file, 'w', encoding='utf-8') as f:
-            f.write(markdown_content)
-        logging.info(f"Human-readable markdown saved to: {markdown_file}")
+        store.export_markdown(markdown_file)
+    logging.info(f"Human-readable markdown saved to: {markdown_file}")
+    return store
+
+async def select_main_chapters(store, client, cache=None, progress=None):
+    from speedread.trim_chapters import trim_chapters
+
+    chapters = store.chapters()
+    logging.info(f"Original chapter count: {len(chapters)}")
+    log_step(2, "Trimming chapters...", progress)
+    content_for_trimming = {
+        'title': store.title,
+        'author': store.author,
+        'chapters': chapters
+    }
+    trimmed_content = await trim_chapters(content_for_trimming, client, cache)
+
+    # Only the kept chapters' text is read, looked up by ID: titles repeat
+    # ("Notes", "Part One") and would match the wrong chapter
+    return {
+        'title': trimmed_content['title'],
+        'author': trimmed_content['author'],
+        'chapters': [store.read_chapter(chapter['id']) for chapter in trimmed_content['chapters']]
+    }
+
+async def process_book(epub_path, args, client, cache=None, semaphore=None, audio_cache=None, progress=None):
+    """
+    Run every stage for one EPUB. Returns 'completed', 'cancelled' or 'failed'.
+
+    `semaphore` bounds concurrent API calls; pass a shared one to run several
+    books against a single budget. `progress(number, description)` is called
+    as each numbered step starts. Stage timings, API usage and cost are
+    written to `run_report.json` in the book's output dir, and with
+    `--profile` a cProfile dump of the CPU-bound stages next to it.
+    """
+    epub_path = Path(epub_path)
+    if not epub_path.exists():
+        logging.error(f"Error: File {epub_path} does not exist.")
+        return 'failed'
+
+    _, output_dir = book_output_dir(epub_path)
+    metrics = RunMetrics(profile=getattr(args, 'profile', False))
+    status = 'failed'
+    try:
+        with collecting(metrics):
+            status = await run_book_stages(epub_path, args, client, cache, semaphore, audio_cache, progress)
+    finally:
+        report_file = output_dir / RUN_REPORT_NAME
+        metrics.write_report(report_file, epub=str(epub_path), status=status)
+        logging.info(f"Run report saved to: {report_file}")
+        if metrics.dump_profile(output_dir / PROFILE_NAME):
+            logging.info(f"Profile saved to: {output_dir / PROFILE_NAME} (inspect with python -m pstats)")
+    return status
+
+async def run_book_stages(epub_path, args, client, cache=None, semaphore=None, audio_cache=None, progress=None):
+    from speedread.compile_summaries import write_html
+    from speedread.manifest import Manifest
+
+    safe_title, output_dir = book_output_dir(epub_path)
+
+    manifest = Manifest(output_dir)
+    semaphore = semaphore or asyncio.Semaphore(args.concurrency)
+
+    summary_json_file = output_dir / f"{safe_title}_summary.json"
+    html_file = output_dir / f"{safe_title}_summary.html"
+    audio_dir = output_dir / "audio_chapters"
+    segments_dir = output_dir / "aac_chapters"
+    streamed = False
 
-    title = structured_content['title']
-    author = structured_content['author']
+    store = await load_content_store(epub_path, output_dir, safe_title, args, client, cache, progress)
+    if not store:
+        return 'failed'
+
+    title = store.title
+    author = store.author
     logging.info(f"Book: '{title}' by {author}")
     summaries = None
 
@@ -105,26 +292,7 @@ async def async_main():
             summary_data = json.load(f)
         summaries = summary_data['summaries']
     else:
-
-        logging.info(f"Original chapter count: {len(structured_content['chapters'])}")
-        logging.info("Step 2: Trimming chapters...")
-        content_for_trimming = {
-            'title': structured_content['title'],
-            'author': structured_content['author'],
-            'chapters': [{'title': chapter['title']} for chapter in structured_content['chapters']]
-        }
-        trimmed_content = trim_chapters(content_for_trimming)
-        
-        full_trimmed_content = {
-            'title': trimmed_content['title'],
-            'author': trimmed_content['author'],
-            'chapters': []
-        }
-        for trimmed_chapter in trimmed_content['chapters']:
-            for full_chapter in structured_content['chapters']:
-                if trimmed_chapter['title'] == full_chapter['title']:
-                    full_trimmed_content['chapters'].append(full_chapter)
-                    break
+        full_trimmed_content = await select_main_chapters(store, client, cache, progress)
         
         chapter_count = len(full_trimmed_content['chapters'])
         logging.info(f"Trimmed chapter count: {chapter_count}")
@@ -139,55 +307,102 @@ async def async_main():
             response = input("\nWould you like to proceed with summarizing these chapters? (y/n): ").lower().strip()
             if response != 'y':
                 logging.info("Summarization cancelled.")
-                return
-
-        logging.info("Step 3: Summarizing book...")
-        client = OpenAI()
-        summaries = await summarize_chapters(client, full_trimmed_content['chapters'], args.concurrency)
+                return 'cancelled'
+
+        if args.pipeline and args.audiobook:
+            if not confirm_audiobook(args):
+                return 'cancelled'
+            log_step(3, "Summarizing, converting and encoding chapters as a pipeline...", progress)
+            audio_dir.mkdir(exist_ok=True)
+            segments_dir.mkdir(exist_ok=True)
+            results = await stream_chapters(client, full_trimmed_content['chapters'], audio_dir, segments_dir, args,
+                                            cache, manifest, semaphore, audio_cache)
+            summarized = [item for item in results if item['summary'] is not None]
+            if len(summarized) < chapter_count:
+                # Writing the summary JSON now would make the next run treat it as final
+                raise RuntimeError(f"{chapter_count - len(summarized)} of {chapter_count} chapters could not be "
+                                   f"summarized; run again to retry them")
+            summaries = [
+                {"chapter_id": item['chapter_id'], "chapter_title": item['chapter_title'], "summary": item['summary']}
+                for item in summarized
+            ]
+            streamed_audio = len([item for item in results if item['mp3']])
+            streamed = True
+        else:
+            log_step(3, "Summarizing book...", progress)
+            summaries = await summarize_chapters(client, full_trimmed_content['chapters'], args.concurrency, cache,
+                                                 args.chunk_tokens, args.reduce_fan_in, manifest, semaphore)
 
         # Save summary JSON
-        with open(summary_json_file, 'w') as f:
+        with atomic_write(summary_json_file) as f:
             json.dump({
                 "title": title,
                 "author": author,
                 "summaries": summaries
             }, f)
         logging.info(f"Summary JSON saved to: {summary_json_file}")
-
-    logging.info("Step 4: Compiling summaries...")
-    html_content = create_html_content({
-        "title": title,
-        "author": author,
-        "summaries": summaries
-    })
-
-    with open(html_file, 'w', encoding='utf-8') as f:
-        f.write(html_content)
+        if cache:
+            stats = cache.stats()
+            logging.info(f"Response cache: {stats['hits']} hits, {stats['misses']} misses")
+
+    log_step(4, "Compiling summaries...", progress)
+    with stage('html'), profiled():
+        write_html({
+            "title": title,
+            "author": author,
+            "summaries": summaries
+        }, html_file)
     logging.info(f"HTML summary saved to: {html_file}")
 
-    if args.audiobook:
-        logging.info("Ready to start text-to-speech conversion.")
-        if not args.yes:
-            response = input("Would you like to proceed with creating the audiobook? (y/n): ").lower().strip()
-            if response != 'y':
-                logging.info("Audiobook creation cancelled.")
-                return
+    if args.audiobook and streamed:
+        if streamed_audio < len(summaries):
+            logging.error(f"Audio is missing for {len(summaries) - streamed_audio} of {len(summaries)} chapters. "
+                          f"Skipping audiobook creation; run again to retry them.")
+            return 'failed'
+        log_step(5, "Creating audiobook from pipelined chapters...", progress)
+        from speedread.create_audiobook import create_audiobook
+        audiobook_file = output_dir / f"{safe_title}_audiobook.m4b"
+        try:
+            await asyncio.to_thread(create_audiobook, str(audio_dir), str(audiobook_file), str(summary_json_file),
+                                    segments_dir)
+            logging.info(f"Audiobook saved to: {audiobook_file}")
+        except Exception as e:
+            logging.error(f"Error creating audiobook: {e}")
+            logging.exception("Error creating audiobook")
+            return 'failed'
+    elif args.audiobook:
+        if not confirm_audiobook(args):
+            return 'cancelled'
             
-        logging.info("Step 5: Converting text to speech...")
-        audio_dir = output_dir / "audio_chapters"
+        log_step(5, "Converting text to speech...", progress)
+        from speedread.batch_text_to_speech import process_chapter
+        from speedread.create_audiobook import create_audiobook
         audio_dir.mkdir(exist_ok=True)
+        segments_dir.mkdir(exist_ok=True)
+        encode_semaphore = asyncio.Semaphore(os.cpu_count() or 1)
+
+        async def synthesize_and_encode(chapter):
+            mp3_file = await process_chapter(client, chapter, audio_dir, semaphore, args.voice, manifest, audio_cache)
+            if mp3_file:
+                # Encode while the remaining chapters are still in TTS
+                try:
+                    with stage('encode', chapter['chapter_id'] or chapter['number']):
+                        async with acquire(encode_semaphore):
+                            await asyncio.to_thread(encode_journaled, mp3_file, segments_dir, manifest)
+                except Exception as e:
+                    logging.error(f"Error encoding {mp3_file}, will retry when assembling: {e}")
+            return mp3_file
 
-        client = OpenAI()
-        semaphore = asyncio.Semaphore(args.concurrency)
         tasks = []
 
         for i, chapter in enumerate(summaries, start=1):
             chapter_with_number = {
                 'number': i,
+                'chapter_id': chapter.get('chapter_id'),
                 'chapter_title': chapter['chapter_title'],
                 'summary': chapter['summary']
             }
-            task = asyncio.create_task(process_chapter(client, chapter_with_number, audio_dir, semaphore, args.voice))
+            task = asyncio.create_task(synthesize_and_encode(chapter_with_number))
             tasks.append(task)
 
         results = await asyncio.gather(*tasks)
@@ -200,21 +415,85 @@ async def async_main():
         if not audio_files:
             logging.error("Error: No audio files were generated. Skipping audiobook creation.")
             logging.error("Please check the OpenAI API key and network connection.")
-            return
-
-        logging.info("Step 6: Creating audiobook...")
+            return 'failed'
+        if len(audio_files) < len(summaries):
+            # The audiobook's chapter marks are matched to the MP3s by position
+            logging.error(f"Audio is missing for {len(summaries) - len(audio_files)} of {len(summaries)} chapters. "
+                          f"Skipping audiobook creation; run again to retry them.")
+            return 'failed'
+
+        log_step(6, "Creating audiobook...", progress)
         audiobook_file = output_dir / f"{safe_title}_audiobook.m4b"
         try:
-            create_audiobook(str(audio_dir), str(audiobook_file), str(summary_json_file))
+            await asyncio.to_thread(create_audiobook, str(audio_dir), str(audiobook_file), str(summary_json_file),
+                                    segments_dir)
             logging.info(f"Audiobook saved to: {audiobook_file}")
         except Exception as e:
             logging.error(f"Error creating audiobook: {e}")
             logging.exception("Error creating audiobook")
+            return 'failed'
 
     logging.info("Processing completed.")
+    return 'completed'
+
+async def async_main():
+    logging.getLogger("openai").setLevel(logging.WARNING)
+
+    if sys.argv[1:2] == ['batch']:
+        from speedread.batch_api import DEFAULT_POLL_INTERVAL
+
+        parser = argparse.ArgumentParser(prog='speedread batch',
+                                         description='Summarize many EPUBs under one shared concurrency budget.')
+        parser.add_argument('inputs', nargs='+', help='EPUB files, directories or glob patterns')
+        parser.add_argument('--report', default='batch_report.json', help='Path of the JSON summary report')
+        parser.add_argument('--books-in-flight', type=int, default=4,
+                            help='Number of books processed at the same time (default: 4)')
+        parser.add_argument('--batch-api', action='store_true',
+                            help='Summarize through the OpenAI Batch API (cheaper, completes within 24h)')
+        parser.add_argument('--poll-interval', type=float, default=DEFAULT_POLL_INTERVAL,
+                            help=f'Seconds between Batch API status checks (default: {DEFAULT_POLL_INTERVAL})')
+        parser.add_argument('--batch-state', default='speedread_batch_state.json',
+                            help='File recording the submitted Batch API job, used to resume polling')
+        add_book_arguments(parser)
+        args = parser.parse_args(sys.argv[2:])
+        # Nobody is around to answer prompts for hundreds of books
+        args.yes = True
+    else:
+        parser = argparse.ArgumentParser(description='Convert EPUB to HTML summary and audiobook.')
+        parser.add_argument('epub_file', help='Path to the input EPUB file')
+        add_book_arguments(parser)
+        args = parser.parse_args()
+
+    from speedread.cache import AudioCache, ResponseCache
+
+    cache = None if args.no_cache else ResponseCache(args.cache_dir, args.cache_size_mb * 2**20)
+    audio_cache = None if args.no_cache else AudioCache(args.cache_dir, args.audio_cache_size_mb * 2**20)
+    client = LazyClient(args.concurrency)
+
+    if hasattr(args, 'inputs'):
+        from speedread.batch import run_batch
+        await run_batch(args.inputs, args, client, cache, args.report, args.books_in_flight, audio_cache)
+    else:
+        await process_book(args.epub_file, args, client, cache, audio_cache=audio_cache)
+        if audio_cache and args.audiobook:
+            stats = audio_cache.stats()
+            logging.info(f"Audio cache: {stats['hits']} hits, {stats['misses']} misses, "
+                         f"{stats['bytes_saved'] / 2**20:.1f} MB not synthesized")
+
+async def run():
+    try:
+        await async_main()
+    finally:
+        await close_client()
 
 def main():
-    asyncio.run(async_main())
+    configure_logging()
+    if sys.argv[1:2] == ['site']:
+        # Rendering only; no API client or event loop needed
+        from speedread.static_site import main as site_main
+        site_main(sys.argv[2:])
+        return
+    asyncio.run(run())
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,188 @@
+import argparse
+import json
+import logging
+import time
+from pathlib import Path
+from speedread.compile_summaries import TEMPLATE_DIR, get_template, write_html
+from speedread.manifest import content_hash, file_hash
+from speedread.utils import atomic_write, configure_logging
+
+OUTPUT_DIR_SUFFIX = '_speedread'
+SITE_STATE_NAME = 'site_state.json'
+BOOK_TEMPLATE = 'site_book.html'
+INDEX_TEMPLATE = 'site_index.html'
+ASSETS = ('speedread.css', 'speedread.js')
+DEFAULT_SITE_TITLE = 'Speedread Library'
+
+
+def find_summaries(inputs):
+    """Find `<title>_summary.json` in every `_speedread` output dir under the inputs."""
+    summaries = []
+    for entry in inputs:
+        path = Path(entry)
+        if not path.is_dir():
+            logging.warning(f"Site: skipping {entry}, not a directory")
+            continue
+        output_dirs = [path] if path.name.endswith(OUTPUT_DIR_SUFFIX) else sorted(path.rglob(f'*{OUTPUT_DIR_SUFFIX}'))
+        for output_dir in output_dirs:
+            safe_title = output_dir.name[:-len(OUTPUT_DIR_SUFFIX)]
+            summary_file = output_dir / f"{safe_title}_summary.json"
+            if summary_file.is_file() and summary_file not in summaries:
+                summaries.append(summary_file)
+    return summaries
+
+
+def assign_slugs(summary_files):
+    """Page names from the output dir names, made unique in a stable order."""
+    slugs = {}
+    for summary_file in sorted(summary_files):
+        base = summary_file.name[:-len('_summary.json')]
+        slug, n = base, 2
+        while slug in slugs:
+            slug = f"{base}_{n}"
+            n += 1
+        slugs[slug] = summary_file
+    return slugs
+
+
+def templates_fingerprint():
+    """Hash of every template and asset; when it changes all pages are rebuilt."""
+    return content_hash(*(f"{path.name}:{file_hash(path)}" for path in sorted(TEMPLATE_DIR.iterdir())))
+
+
+def load_state(state_file):
+    try:
+        with open(state_file, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+    except (OSError, json.JSONDecodeError) as e:
+        logging.warning(f"Site: ignoring unreadable {state_file}, rebuilding everything: {e}")
+        return {}
+
+
+def write_assets(assets_dir):
+    assets_dir.mkdir(parents=True, exist_ok=True)
+    for name in ASSETS:
+        data = (TEMPLATE_DIR / name).read_bytes()
+        target = assets_dir / name
+        if not target.exists() or target.read_bytes() != data:
+            with atomic_write(target, 'wb') as f:
+                f.write(data)
+
+
+def render_book(summary_file, page_file):
+    with open(summary_file, 'r', encoding='utf-8') as f:
+        book_data = json.load(f)
+    write_html(book_data, page_file, BOOK_TEMPLATE)
+    chapter_titles = ' '.join(chapter['chapter_title'] for chapter in book_data['summaries'])
+    return {
+        'title': book_data['title'],
+        'author': book_data['author'],
+        'search': ' '.join([book_data['title'], book_data['author'], chapter_titles]).lower(),
+    }
+
+
+def build_site(inputs, site_dir, site_title=DEFAULT_SITE_TITLE, force=False):
+    """
+    Render every book summary under `inputs` into a static site in `site_dir`.
+
+    Pages share one CSS/JS bundle in `assets/` and are listed on a searchable
+    `index.html`. The state file records each book's summary size, mtime and
+    hash, so a rebuild only re-renders books whose summary changed (a file
+    that was merely touched is hashed but not re-rendered) and only rewrites
+    the index when the set of books or their titles changed.
+    """
+    site_dir = Path(site_dir)
+    books_dir = site_dir / 'books'
+    books_dir.mkdir(parents=True, exist_ok=True)
+    state_file = site_dir / SITE_STATE_NAME
+    recorded = load_state(state_file)
+    state = {} if force else recorded
+
+    fingerprint = templates_fingerprint()
+    rebuild_all = state.get('templates') != fingerprint
+    previous_books = {} if rebuild_all else state.get('books', {})
+    write_assets(site_dir / 'assets')
+
+    books = {}
+    rendered = unchanged = failed = 0
+    for slug, summary_file in assign_slugs(find_summaries(inputs)).items():
+        page_file = books_dir / f"{slug}.html"
+        stat = summary_file.stat()
+        signature = [stat.st_size, stat.st_mtime_ns]
+        previous = previous_books.get(slug)
+        digest = None
+        if previous and previous['source'] == str(summary_file) and page_file.exists():
+            if previous['signature'] == signature:
+                books[slug] = previous
+                unchanged += 1
+                continue
+            digest = file_hash(summary_file)
+            if previous['hash'] == digest:
+                books[slug] = {**previous, 'signature': signature}
+                unchanged += 1
+                continue
+        try:
+            # Rendered to a temporary file, so a failure leaves the existing page in place
+            entry = render_book(summary_file, page_file)
+        except Exception as e:
+            logging.error(f"Site: could not render {summary_file}: {e}")
+            failed += 1
+            kept = recorded.get('books', {}).get(slug)
+            if kept and page_file.exists():
+                # Keep the old page listed, but without a signature or hash so the next build retries it
+                books[slug] = {**kept, 'signature': None, 'hash': None}
+            continue
+        books[slug] = {'source': str(summary_file), 'signature': signature,
+                       'hash': digest or file_hash(summary_file), **entry}
+        rendered += 1
+        logging.info(f"Site: rendered {page_file}")
+
+    removed = [slug for slug in recorded.get('books', {}) if slug not in books]
+    for slug in removed:
+        (books_dir / f"{slug}.html").unlink(missing_ok=True)
+        logging.info(f"Site: removed {slug}")
+
+    index_file = site_dir / 'index.html'
+    listing = [(slug, books[slug]['title'], books[slug]['author'], books[slug]['search']) for slug in sorted(books)]
+    index_hash = content_hash(site_title, json.dumps(listing))
+    index_rebuilt = rebuild_all or state.get('index') != index_hash or not index_file.exists()
+    if index_rebuilt:
+        entries = sorted(
+            ({'href': f"books/{slug}.html", 'title': title, 'author': author, 'search': search}
+             for slug, title, author, search in listing),
+            key=lambda book: (book['title'].lower(), book['author'].lower())
+        )
+        with atomic_write(index_file) as f:
+            for piece in get_template(INDEX_TEMPLATE).generate(site_title=site_title, books=entries):
+                f.write(piece)
+
+    with atomic_write(state_file) as f:
+        json.dump({'templates': fingerprint, 'index': index_hash, 'books': books}, f, ensure_ascii=False)
+
+    return {'books': len(books), 'rendered': rendered, 'unchanged': unchanged, 'failed': failed,
+            'removed': len(removed), 'index_rebuilt': index_rebuilt}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='speedread site',
+                                     description='Build a static site from the summaries of many books.')
+    parser.add_argument('inputs', nargs='*', default=['.'],
+                        help='Directories containing _speedread output dirs (default: current directory)')
+    parser.add_argument('-o', '--output-dir', default='speedread_site', help='Site directory (default: speedread_site)')
+    parser.add_argument('--title', default=DEFAULT_SITE_TITLE, help='Title of the index page')
+    parser.add_argument('--force', action='store_true', help='Re-render every page')
+    args = parser.parse_args(argv)
+
+    start = time.monotonic()
+    result = build_site(args.inputs, args.output_dir, args.title, args.force)
+    logging.info(f"Site: {result['books']} books, {result['rendered']} rendered, {result['unchanged']} unchanged, "
+                 f"{result['failed']} failed, {result['removed']} removed in {time.monotonic() - start:.2f}s. "
+                 f"Open {Path(args.output_dir) / 'index.html'}")
+    return result
+
+
+if __name__ == '__main__':
+    configure_logging()
+    main()
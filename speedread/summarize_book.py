@@ -1,8 +1,17 @@
 import argparse
-from openai import OpenAI
+import asyncio
 import os
+import sys
 import json
-from tqdm import tqdm
+import logging
+from pathlib import Path
+from speedread.cache import DEFAULT_CACHE_DIR, ResponseCache
+from speedread.manifest import content_hash
+from speedread.metrics import acquire, record, record_completion
+from speedread.openai_client import close_client, get_client
+from speedread.rate_limiter import call_with_retry
+from speedread.tokens import chunk_text, count_message_tokens
+from speedread.utils import atomic_write, configure_logging, int_at_least, sanitize_filename
 
 MODEL = "gpt-4-turbo"  # or "gpt-3.5-turbo" if GPT-4 is not available
 
@@ -14,56 +23,199 @@ def read_json_file(file_path):
     with open(file_path, 'r', encoding='utf-8') as file:
         return json.load(file)
 
-def summarize_chapter(client, chapter_content, chapter_title):
-    prompt = f"{SUMMARIZER_PROMPT}\n\nChapter title: {chapter_title}\nChapter text to summarize:\n{chapter_content}\n\nPlease provide a concise summary of this chapter:"
-    
-    response = client.chat.completions.create(
-        model=MODEL,
-        messages=[
-            {"role": "system", "content": SUMMARIZER_PROMPT},
+REDUCE_PROMPT = """
+The following are summaries of consecutive sections of one book chapter, in order. Merge them into a single summary of the whole chapter in the same style, keeping the most memorable anecdotes, facts and insights and removing repetition.
+"""
+
+MAX_TOKENS = 1000
+DEFAULT_CHUNK_TOKENS = 12000
+DEFAULT_REDUCE_FAN_IN = 8
+DEFAULT_MAX_CONCURRENCY = 5
+
+def build_summary_prompt(chapter_title, chapter_content, part=None):
+    if part:
+        heading = f"Chapter title: {chapter_title} (part {part[0]} of {part[1]})"
+    else:
+        heading = f"Chapter title: {chapter_title}"
+    return f"{heading}\nChapter text to summarize:\n{chapter_content}\n\nPlease provide a concise summary of this chapter:"
+
+def build_reduce_prompt(chapter_title, summaries):
+    sections = '\n\n'.join(f"Section {i}:\n{summary}" for i, summary in enumerate(summaries, 1))
+    return f"{REDUCE_PROMPT}\nChapter title: {chapter_title}\n\n{sections}\n\nPlease provide the merged summary of this chapter:"
+
+def build_request(system_prompt, prompt, max_tokens=MAX_TOKENS):
+    """The chat completion request body, shared by the live and Batch API paths."""
+    return {
+        "model": MODEL,
+        "messages": [
+            {"role": "system", "content": system_prompt},
             {"role": "user", "content": prompt}
         ],
-        max_tokens=1000,
-    )
-    return response.choices[0].message.content
+        "max_tokens": max_tokens,
+    }
 
-def main():
-    parser = argparse.ArgumentParser(description='Summarize a book chapter by chapter using GPT-4.')
-    parser.add_argument('json_file', help='Path to the JSON file containing book content')
-    parser.add_argument('-o', '--output_dir', help='Directory to save the output summaries', default='summaries')
-    args = parser.parse_args()
+def chapter_prompts(chapter_title, chapter_content, chunk_tokens=DEFAULT_CHUNK_TOKENS):
+    """The map-step prompts for a chapter: one, or one per chunk if it is oversized."""
+    chunks = chunk_text(chapter_content, chunk_tokens, MODEL)
+    if len(chunks) == 1:
+        return [build_summary_prompt(chapter_title, chapter_content)]
+    return [build_summary_prompt(chapter_title, chunk, (i, len(chunks))) for i, chunk in enumerate(chunks, 1)]
 
-    if not os.getenv('OPENAI_API_KEY'):
-        raise ValueError("OPENAI_API_KEY environment variable is not set.")
+async def complete(client, system_prompt, prompt, cache=None, max_tokens=MAX_TOKENS, semaphore=None):
+    """One chat completion, holding a slot of `semaphore` (if given) only while the request runs."""
+    if cache:
+        cache_key = cache.key(MODEL, system_prompt, prompt, max_tokens)
+        cached_summary = cache.get(cache_key)
+        if cached_summary is not None:
+            record(cache_hits=1)
+            return cached_summary
+
+    request = build_request(system_prompt, prompt, max_tokens)
+    async with acquire(semaphore):
+        response = await call_with_retry(
+            MODEL,
+            count_message_tokens(request['messages'], MODEL) + max_tokens,
+            lambda: client.chat.completions.with_raw_response.create(**request)
+        )
+    completion = response.parse()
+    record_completion(MODEL, completion.usage)
+    summary = completion.choices[0].message.content
+
+    if cache:
+        cache.put(cache_key, summary)
+    return summary
+
+async def summarize_chapter(client, chapter_content, chapter_title, cache=None,
+                            chunk_tokens=DEFAULT_CHUNK_TOKENS, reduce_fan_in=DEFAULT_REDUCE_FAN_IN, semaphore=None):
+    """
+    Summarize a chapter, map-reducing it in chunks if it is oversized. Every
+    request takes its own slot of `semaphore`, so a long chapter does not
+    exceed the concurrency limit.
+    """
+    prompts = chapter_prompts(chapter_title, chapter_content, chunk_tokens)
+    if len(prompts) == 1:
+        return await complete(client, SUMMARIZER_PROMPT, prompts[0], cache, semaphore=semaphore)
+
+    # Map: summarize every chunk concurrently
+    logging.info(f"Summarizing '{chapter_title}' in {len(prompts)} chunks")
+    summaries = await asyncio.gather(*[complete(client, SUMMARIZER_PROMPT, prompt, cache, semaphore=semaphore)
+                                       for prompt in prompts])
+    return await reduce_summaries(client, chapter_title, summaries, cache, reduce_fan_in, semaphore)
+
+async def reduce_summaries(client, chapter_title, summaries, cache=None, reduce_fan_in=DEFAULT_REDUCE_FAN_IN,
+                           semaphore=None):
+    if reduce_fan_in < 2:
+        # A fan-in of 1 never shrinks the list, and every round is a paid call
+        raise ValueError(f"reduce_fan_in must be at least 2, got {reduce_fan_in}")
+    # Reduce: merge groups of reduce_fan_in summaries until one remains
+    while len(summaries) > 1:
+        groups = [summaries[i:i + reduce_fan_in] for i in range(0, len(summaries), reduce_fan_in)]
+        summaries = await asyncio.gather(*[
+            complete(client, SUMMARIZER_PROMPT, build_reduce_prompt(chapter_title, group), cache,
+                     semaphore=semaphore)
+            for group in groups
+        ])
+    return summaries[0]
+
+async def async_main(args):
+    client = get_client()
+    try:
+        return await summarize_book_chapters(client, args)
+    finally:
+        await close_client()
+
+def chapter_files(output_dir, number, chapter):
+    """The JSON and text output of a chapter. Numbered, so any title makes a valid filename."""
+    stem = f"chapter_{str(number).zfill(2)}"
+    return (Path(output_dir) / f"{stem}_summary.json",
+            Path(output_dir) / f"{stem}_{sanitize_filename(chapter['title'])[:100]}_summary.txt")
+
+def chapter_input_hash(chapter, chunk_tokens, reduce_fan_in):
+    return content_hash(MODEL, chapter['title'], chapter['content'], chunk_tokens, reduce_fan_in)
+
+def read_chapter_summary(json_file, input_hash):
+    """A chapter's saved summary, or None if it is missing, unreadable or for different input."""
+    try:
+        with open(json_file, 'r', encoding='utf-8') as f:
+            summary_data = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(summary_data, dict) or summary_data.get('input_hash') != input_hash \
+            or not isinstance(summary_data.get('summary'), str):
+        return None
+    return summary_data
+
+async def summarize_to_file(client, number, chapter, output_dir, semaphore, cache=None,
+                            chunk_tokens=DEFAULT_CHUNK_TOKENS, reduce_fan_in=DEFAULT_REDUCE_FAN_IN):
+    """
+    Summarize one chapter into its own JSON file, unless a valid one already
+    exists. The text file is written first and the JSON last, so an existing
+    JSON file always means the chapter is complete.
+    """
+    json_file, text_file = chapter_files(output_dir, number, chapter)
+    input_hash = chapter_input_hash(chapter, chunk_tokens, reduce_fan_in)
+    if read_chapter_summary(json_file, input_hash):
+        logging.info(f"Summary already complete: {chapter['title']}")
+        return json_file
 
-    client = OpenAI()
+    chapter_summary = await summarize_chapter(client, chapter['content'], chapter['title'], cache,
+                                              chunk_tokens, reduce_fan_in, semaphore)
+
+    with atomic_write(text_file) as f:
+        f.write(f"Chapter: {chapter['title']}\n\n")
+        f.write(chapter_summary)
+    with atomic_write(json_file) as f:
+        json.dump({
+            "chapter_id": chapter.get('id'),
+            "chapter_title": chapter['title'],
+            "summary": chapter_summary,
+            "input_hash": input_hash,
+        }, f, ensure_ascii=False, indent=2)
+    return json_file
+
+async def summarize_book_chapters(client, args):
+    """
+    Summarize the chapters of a book concurrently, at most args.max_concurrency
+    at a time. Every chapter is saved as soon as it is done and chapters with
+    valid output are skipped, so an interrupted run resumes where it stopped.
+    Returns the number of chapters that failed.
+    """
+    from tqdm import tqdm
+    cache = None if args.no_cache else ResponseCache(args.cache_dir)
     book_data = read_json_file(args.json_file)
-    
+    chapters = book_data['chapters']
+
     os.makedirs(args.output_dir, exist_ok=True)
-    
+    semaphore = asyncio.Semaphore(args.max_concurrency)
+
+    async def summarize(number, chapter):
+        try:
+            return await summarize_to_file(client, number, chapter, args.output_dir, semaphore, cache,
+                                           args.chunk_tokens, args.reduce_fan_in)
+        except Exception as e:
+            logging.error(f"Error summarizing '{chapter['title']}': {e}")
+            return None
+
+    tasks = [asyncio.create_task(summarize(number, chapter)) for number, chapter in enumerate(chapters, start=1)]
+    failed = 0
+    for task in tqdm(asyncio.as_completed(tasks), total=len(tasks), desc="Summarizing Chapters"):
+        if await task is None:
+            failed += 1
+
+    if failed:
+        print(f"\n{failed} of {len(chapters)} chapters failed. Run again to summarize the remaining chapters.")
+        return failed
+
+    # Assemble the combined summaries from the per-chapter files
     summaries = []
-    for chapter in tqdm(book_data['chapters'], desc="Summarizing Chapters"):
-        chapter_summary = summarize_chapter(client, chapter['content'], chapter['title'])
-        
-        output_file = os.path.join(args.output_dir, f"chapter_{chapter['title']}_summary.txt")
-        with open(output_file, 'w', encoding='utf-8') as f:
-            f.write(f"Chapter: {chapter['title']}\n\n")
-            f.write(chapter_summary)
-        
-        chapter_number = str(len(summaries) + 1).zfill(2)
-        output_file = os.path.join(args.output_dir, f"chapter_{chapter_number}_summary.json")
-        summary_data = {
-            "chapter_title": chapter['title'],
-            "summary": chapter_summary
-        }
-        with open(output_file, 'w', encoding='utf-8') as f:
-            json.dump(summary_data, f, ensure_ascii=False, indent=2)
-        
+    for number, chapter in enumerate(chapters, start=1):
+        json_file, _ = chapter_files(args.output_dir, number, chapter)
+        summary_data = read_json_file(json_file)
+        summary_data.pop('input_hash', None)
         summaries.append(summary_data)
 
-    # Save the combined summaries
     summaries_file = os.path.join(args.output_dir, "summaries.json")
-    with open(summaries_file, 'w', encoding='utf-8') as f:
+    with atomic_write(summaries_file) as f:
         json.dump({
             "title": book_data['title'],
             "author": book_data['author'],
@@ -72,6 +224,28 @@ def main():
 
     print(f"\nAll chapter summaries have been saved to the '{args.output_dir}' directory.")
     print(f"Combined summaries saved to {summaries_file}")
+    return 0
+
+def main():
+    parser = argparse.ArgumentParser(description='Summarize a book chapter by chapter using GPT-4.')
+    parser.add_argument('json_file', help='Path to the JSON file containing book content')
+    parser.add_argument('-o', '--output_dir', help='Directory to save the output summaries', default='summaries')
+    parser.add_argument('--cache-dir', default=DEFAULT_CACHE_DIR, help='Directory of the API response cache')
+    parser.add_argument('--no-cache', action='store_true', help='Do not read or write the API response cache')
+    parser.add_argument('--chunk-tokens', type=int_at_least(1), default=DEFAULT_CHUNK_TOKENS,
+                        help='Chapters longer than this many tokens are summarized in chunks')
+    parser.add_argument('--reduce-fan-in', type=int_at_least(2), default=DEFAULT_REDUCE_FAN_IN,
+                        help='Number of chunk summaries merged per reduce call')
+    parser.add_argument('--max-concurrency', type=int, default=DEFAULT_MAX_CONCURRENCY,
+                        help=f'Maximum number of chapters summarized at the same time (default: {DEFAULT_MAX_CONCURRENCY})')
+    args = parser.parse_args()
+
+    if not os.getenv('OPENAI_API_KEY'):
+        raise ValueError("OPENAI_API_KEY environment variable is not set.")
+
+    configure_logging()
+    if asyncio.run(async_main(args)):
+        sys.exit(1)
 
 if __name__ == "__main__":
     main()
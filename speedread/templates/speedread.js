@@ -0,0 +1,27 @@
+const modeToggle = document.getElementById('mode-toggle');
+const body = document.body;
+const modes = ['light', 'dark', 'medium'];
+let currentModeIndex = 0;
+
+modeToggle.addEventListener('click', () => {
+    body.classList.remove(`${modes[currentModeIndex]}-mode`);
+    currentModeIndex = (currentModeIndex + 1) % modes.length;
+    body.classList.add(`${modes[currentModeIndex]}-mode`);
+    modeToggle.textContent = `Toggle ${modes[(currentModeIndex + 1) % modes.length].charAt(0).toUpperCase() + modes[(currentModeIndex + 1) % modes.length].slice(1)} Mode`;
+});
+
+const search = document.getElementById('search');
+if (search) {
+    const books = Array.from(document.querySelectorAll('#books li'));
+    const noResults = document.getElementById('no-results');
+    search.addEventListener('input', () => {
+        const terms = search.value.toLowerCase().split(/\s+/).filter(Boolean);
+        let shown = 0;
+        for (const book of books) {
+            const matches = terms.every(term => book.dataset.search.includes(term));
+            book.hidden = !matches;
+            shown += matches;
+        }
+        noResults.hidden = shown > 0;
+    });
+}
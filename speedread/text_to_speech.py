@@ -1,30 +1,141 @@
+import os
+import re
 import sys
+import shutil
 import argparse
 from pathlib import Path
-from openai import OpenAI
 import asyncio
-from openai import APIError
+from speedread.metrics import acquire, record_speech
+from speedread.mp3_info import audio_data_offset, id3v2_size
+from speedread.openai_client import close_client, get_client
+from speedread.rate_limiter import call_with_retry, get_limiter
 
+TTS_MODEL = "tts-1"
 VALID_VOICES = ["alloy", "echo", "fable", "onyx", "nova", "shimmer"]
+# The speech endpoint rejects inputs longer than this many characters
+MAX_INPUT_CHARS = 4096
+DEFAULT_CHUNK_CONCURRENCY = 4
 
-async def text_to_speech(client, text, output_file, voice):
-    response = await asyncio.to_thread(
-        client.audio.speech.create,
-        model="tts-1",
-        voice=voice,
-        input=text
-    )
-    
-    await asyncio.to_thread(response.stream_to_file, output_file)
+# Whitespace after sentence-ending punctuation, optionally followed by a closing quote or bracket
+SENTENCE_BREAK = re.compile(r'(?<=[.!?…])\s+|(?<=[.!?…]["\'”’)\]])\s+')
+
+def split_long(text, max_chars):
+    """Split a single overlong sentence on word boundaries, or mid-word as a last resort."""
+    pieces = []
+    current = ''
+    for word in text.split():
+        while len(word) > max_chars:
+            if current:
+                pieces.append(current)
+                current = ''
+            pieces.append(word[:max_chars])
+            word = word[max_chars:]
+        if current and len(current) + 1 + len(word) > max_chars:
+            pieces.append(current)
+            current = word
+        else:
+            current = f"{current} {word}" if current else word
+    if current:
+        pieces.append(current)
+    return pieces
+
+def split_for_speech(text, max_chars=MAX_INPUT_CHARS):
+    """
+    Split text into pieces of at most `max_chars`, breaking between sentences
+    so each piece reads naturally on its own. Short text is returned whole.
+    """
+    text = text.strip()
+    if len(text) <= max_chars:
+        return [text]
+    chunks = []
+    current = ''
+    for sentence in SENTENCE_BREAK.split(text):
+        for piece in split_long(sentence, max_chars) if len(sentence) > max_chars else [sentence]:
+            if current and len(current) + 1 + len(piece) > max_chars:
+                chunks.append(current)
+                current = piece
+            else:
+                current = f"{current} {piece}" if current else piece
+    if current:
+        chunks.append(current)
+    return chunks
+
+async def synthesize_chunk(client, text, output_file, voice, semaphore):
+    async def synthesize():
+        async with client.audio.speech.with_streaming_response.create(
+            model=TTS_MODEL,
+            voice=voice,
+            input=text
+        ) as response:
+            get_limiter(TTS_MODEL).update_from_headers(response.headers)
+            await stream_to_file(response, output_file)
+
+    async with acquire(semaphore):
+        await call_with_retry(TTS_MODEL, 0, synthesize)
+    record_speech(TTS_MODEL, len(text))
+
+async def text_to_speech(client, text, output_file, voice, semaphore=None):
+    """
+    Synthesize `text` into `output_file`.
+
+    Text over the endpoint's input limit is split on sentence boundaries.
+    The pieces are synthesized concurrently, each holding one `semaphore`
+    slot, and appended to the output in order as soon as each one and all
+    before it are done.
+    """
+    semaphore = semaphore or asyncio.Semaphore(DEFAULT_CHUNK_CONCURRENCY)
+    chunks = split_for_speech(text)
+    if len(chunks) == 1:
+        await synthesize_chunk(client, chunks[0], output_file, voice, semaphore)
+        return
+
+    chunk_files = [f"{output_file}.chunk{i:03d}" for i in range(len(chunks))]
+    tasks = [
+        asyncio.create_task(synthesize_chunk(client, chunk, chunk_file, voice, semaphore))
+        for chunk, chunk_file in zip(chunks, chunk_files)
+    ]
+    partial_file = f"{output_file}.part"
+    try:
+        with open(partial_file, 'wb') as out:
+            for task, chunk_file in zip(tasks, chunk_files):
+                await task
+                await asyncio.to_thread(append_audio, out, chunk_file)
+                os.remove(chunk_file)
+        os.replace(partial_file, output_file)
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        for path in [partial_file, *chunk_files]:
+            Path(path).unlink(missing_ok=True)
+
+def append_audio(out, chunk_file, block_size=1 << 20):
+    """Append the audio frames of one MP3 piece, dropping its ID3 tag and Xing/Info frame."""
+    with open(chunk_file, 'rb') as f:
+        tag_size = id3v2_size(f.read(10))
+        f.seek(tag_size)
+        start = audio_data_offset(f.read(1 << 16))
+        f.seek(tag_size + start)
+        shutil.copyfileobj(f, out, block_size)
+
+async def stream_to_file(response, output_file):
+    # Write to a temporary name so an interrupted download never looks complete
+    partial_file = f"{output_file}.part"
+    with open(partial_file, 'wb') as f:
+        async for chunk in response.iter_bytes():
+            await asyncio.to_thread(f.write, chunk)
+    os.replace(partial_file, output_file)
 
 async def async_main():
+    from openai import APIError
+
     parser = argparse.ArgumentParser(description='Convert text from stdin to speech MP3.')
     parser.add_argument('output', type=str, help='Output MP3 file path')
     parser.add_argument('--voice', type=str, choices=VALID_VOICES, default="alloy",
                         help='Voice to use for text-to-speech (default: alloy)')
     args = parser.parse_args()
 
-    client = OpenAI()
+    client = get_client()
     text = sys.stdin.read().strip()
 
     if not text:
@@ -46,6 +157,8 @@ async def async_main():
     except Exception as e:
         print(f"Error: {str(e)}", file=sys.stderr)
         sys.exit(1)
+    finally:
+        await close_client()
 
 def main():
     asyncio.run(async_main())
@@ -0,0 +1,62 @@
+from functools import lru_cache
+
+FALLBACK_ENCODING = 'cl100k_base'
+PARAGRAPH_SEPARATOR = '\n\n'
+
+
+@lru_cache(maxsize=None)
+def get_encoding(model):
+    import tiktoken
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        return tiktoken.get_encoding(FALLBACK_ENCODING)
+
+
+def count_tokens(text, model):
+    return len(get_encoding(model).encode(text, disallowed_special=()))
+
+
+def count_message_tokens(messages, model):
+    # Each message carries a few tokens of framing on top of its content
+    return sum(count_tokens(message['content'], model) + 4 for message in messages) + 3
+
+
+def chunk_text(text, max_tokens, model):
+    """
+    Split text into pieces of at most max_tokens, on paragraph boundaries.
+
+    Paragraphs are packed greedily in order, counting the separator between
+    them. A single paragraph longer than max_tokens is cut on token
+    boundaries as a last resort.
+    """
+    if max_tokens < 1:
+        raise ValueError(f"max_tokens must be at least 1, got {max_tokens}")
+    encoding = get_encoding(model)
+    if len(encoding.encode(text, disallowed_special=())) <= max_tokens:
+        return [text]
+
+    separator_tokens = len(encoding.encode(PARAGRAPH_SEPARATOR, disallowed_special=()))
+
+    chunks = []
+    current = []
+    current_tokens = 0
+    for paragraph in text.split(PARAGRAPH_SEPARATOR):
+        if not paragraph.strip():
+            continue
+        tokens = encoding.encode(paragraph, disallowed_special=())
+        if len(tokens) > max_tokens:
+            if current:
+                chunks.append(PARAGRAPH_SEPARATOR.join(current))
+                current, current_tokens = [], 0
+            for start in range(0, len(tokens), max_tokens):
+                chunks.append(encoding.decode(tokens[start:start + max_tokens]))
+            continue
+        if current and current_tokens + separator_tokens + len(tokens) > max_tokens:
+            chunks.append(PARAGRAPH_SEPARATOR.join(current))
+            current, current_tokens = [], 0
+        current_tokens += len(tokens) + (separator_tokens if current else 0)
+        current.append(paragraph)
+    if current:
+        chunks.append(PARAGRAPH_SEPARATOR.join(current))
+    return chunks
@@ -1,17 +1,124 @@
 import argparse
+import asyncio
 import json
-import os
-from openai import OpenAI
+import logging
+import re
+from speedread.metrics import profiled, record, record_completion, stage
+from speedread.openai_client import close_client, get_client
+from speedread.rate_limiter import call_with_retry
+from speedread.tokens import count_message_tokens
 
-def trim_chapters(metadata):
-    client = OpenAI()
-    
-    prompt = """
+MODEL = "gpt-3.5-turbo-16k"
+SYSTEM_PROMPT = "You are a helpful assistant that processes book metadata."
+# Entries smaller than this are title pages, dividers and the like
+MIN_CHAPTER_BYTES = 1024
+# The kept chapters should hold at least this share of the book's text
+MIN_KEPT_SHARE = 0.5
+
+FRONT_MATTER = (
+    'cover', 'title page', 'half title', 'copyright', 'contents', 'table of contents', 'dedication',
+    'epigraph', 'foreword', 'preface', 'introduction', 'prologue', 'praise for', 'also by', 'other books by',
+    'books by', 'list of', 'maps', 'frontispiece', "author's note", 'authors note', 'a note on', 'note on',
+    "translator's", "editor's", 'chronology', 'timeline', 'dramatis personae', 'cast of characters',
+    'how to use this book', 'about this book', 'front matter', 'begin reading',
+)
+BACK_MATTER = (
+    'appendix', 'appendices', 'notes', 'endnotes', 'end notes', 'bibliography', 'references', 'works cited',
+    'further reading', 'suggested reading', 'recommended reading', 'sources', 'index', 'glossary',
+    'acknowledgments', 'acknowledgements', 'about the author', 'about the authors', 'about the publisher',
+    'also by', 'other books by', 'books by', 'copyright', 'credits', 'photo credits', 'illustration credits',
+    'permissions', 'colophon', 'afterword', 'postscript', 'reading group guide', 'discussion questions',
+    'questions for discussion', 'a conversation with', 'an interview with', 'excerpt', 'sneak peek', 'preview',
+    'newsletter', 'sign up', 'back matter', 'praise for', 'connect with', 'more from', 'coming soon',
+    "author's note", 'a note on', 'resources', 'abbreviations', 'contributors', 'also available', 'dedication',
+)
+# Narrative sections that close the main text rather than follow it
+STORY_ENDINGS = ('epilogue', 'conclusion', 'coda', 'finale')
+
+NUMBER_WORDS = (
+    'one|two|three|four|five|six|seven|eight|nine|ten|eleven|twelve|thirteen|fourteen|fifteen|sixteen|'
+    'seventeen|eighteen|nineteen|twenty|thirty|forty|fifty|sixty|seventy|eighty|ninety|hundred'
+)
+ROMAN = r'm{0,3}(?:cm|cd|d?c{0,3})(?:xc|xl|l?x{0,3})(?:ix|iv|v?i{0,3})'
+NUMBERED_TITLE = re.compile(
+    rf'^(?:(?:chapter|ch\.?|part|book|section|lesson|letter|day|act|canto|volume|step)\s+(?:\d+|{ROMAN}|(?:{NUMBER_WORDS})\b)'
+    rf'|\d+(?:[.):\-–—]|\s|$)'
+    rf'|(?=[ivxlcdm])(?:{ROMAN})(?:[.):\-–—]|$)'
+    rf'|(?:{NUMBER_WORDS})(?:[-\s]?(?:{NUMBER_WORDS}))?(?:[.):\-–—]|$))',
+    re.IGNORECASE
+)
+
+
+def normalize_title(title):
+    # TOC entries without a label have no title
+    title = title or ''
+    return ' '.join(title.lower().replace('’', "'").split())
+
+
+def matches(title, phrases):
+    return any(title == phrase or title.startswith(phrase + ' ') or title.startswith(phrase + ':')
+               for phrase in phrases)
+
+
+def classify_title(title):
+    """Return 'main', 'front', 'back', 'matter' (either end) or 'unknown'."""
+    title = normalize_title(title)
+    if not title:
+        return 'unknown'
+    if NUMBERED_TITLE.match(title) or matches(title, STORY_ENDINGS):
+        return 'main'
+    front, back = matches(title, FRONT_MATTER), matches(title, BACK_MATTER)
+    if front and back:
+        return 'matter'
+    if front:
+        return 'front'
+    if back:
+        return 'back'
+    return 'unknown'
+
+
+def classify_chapters(chapters):
+    """
+    Find the first and last main chapters from TOC titles, spine order and
+    document sizes. Returns (first, last, confident); when not confident the
+    range is only a best guess.
+    """
+    kinds = [classify_title(chapter.get('title')) for chapter in chapters]
+    sizes = [chapter.get('size') for chapter in chapters]
+
+    def is_matter(index, side):
+        if kinds[index] in (side, 'matter'):
+            return True
+        # Tiny unnamed entries at the edges are title pages, part dividers and such
+        return kinds[index] == 'unknown' and sizes[index] is not None and sizes[index] < MIN_CHAPTER_BYTES
+
+    first = 0
+    while first < len(chapters) and is_matter(first, 'front'):
+        first += 1
+    last = len(chapters) - 1
+    while last > first and is_matter(last, 'back'):
+        last -= 1
+    if first > last:
+        return 0, len(chapters) - 1, False
+
+    confident = kinds[first] == 'main' and kinds[last] == 'main'
+    if confident and all(size is not None for size in sizes):
+        total = sum(sizes)
+        confident = total == 0 or sum(sizes[first:last + 1]) >= MIN_KEPT_SHARE * total
+    return first, last, confident
+
+
+def build_bounds_prompt(metadata):
+    lines = []
+    for index, chapter in enumerate(metadata['chapters']):
+        size = f" ({chapter['size']} bytes)" if chapter.get('size') is not None else ''
+        lines.append(f"{index}: {chapter['title']}{size}")
+    toc = '\n'.join(lines)
+    return f"""
     You are an AI assistant tasked with identifying the main chapters of a book.
-    Given a JSON structure containing book metadata and chapters, your job is to:
-    1. Identify the main chapters of the book. Examples of chapters that are not considered main are prefaces, introductions, appendices, endnotes, about the author, etc.
-    2. Identify the first main chapter and the last. Keep all chapters in between them and discard all the rest. Never discard a chapter between the first and the last main chapters even if it does not look to be a main chapter.
-    3. Return a new JSON structure with only the main chapters.
+    Below is the table of contents of "{metadata.get('title', '')}" by {metadata.get('author', '')}, one entry per line as index: title (document size).
+
+    Identify the first and the last main chapters. Everything between them is kept, everything before and after is discarded.
 
     Use these guidelines:
     - Main chapters usually have numeric or clear sequential titles.
@@ -19,28 +126,88 @@ def trim_chapters(metadata):
     - Chapters at the end like "Appendix", "Notes", "Bibliography", "Index" are usually not main chapters.
     - If in doubt, err on the side of inclusion.
 
-    Here's the book metadata and chapters:
-    {json_data}
+    {toc}
 
-    Please return only a valid JSON structure with the trimmed chapters, maintaining the original format.
+    Reply with only a JSON object of the form {{"first": <index>, "last": <index>}}.
     """
 
-    content = prompt.format(json_data=json.dumps(metadata, indent=2))
-    response = client.chat.completions.create(
-        model="gpt-3.5-turbo-16k",
-        messages=[
-            {"role": "system", "content": "You are a helpful assistant that processes book metadata."},
-            {"role": "user", "content": content }
-        ],
-        temperature=0.2,
+
+def parse_bounds(content, chapter_count):
+    match = re.search(r'"first"\s*:\s*(\d+).*?"last"\s*:\s*(\d+)', content, re.DOTALL)
+    if not match:
+        return None
+    first, last = int(match.group(1)), int(match.group(2))
+    if not 0 <= first <= last < chapter_count:
+        return None
+    return first, last
+
+
+async def ask_for_bounds(metadata, client, cache=None):
+    """Ask the model for the first and last main chapter indices. None if the reply is unusable."""
+    content = build_bounds_prompt(metadata)
+    chapter_count = len(metadata['chapters'])
+
+    if cache:
+        cache_key = cache.key(MODEL, SYSTEM_PROMPT, content)
+        cached_response = cache.get(cache_key)
+        if cached_response is not None:
+            record(cache_hits=1)
+            return parse_bounds(cached_response, chapter_count)
+
+    messages = [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": content}
+    ]
+    response = await call_with_retry(
+        MODEL,
+        count_message_tokens(messages, MODEL) + 20,
+        lambda: client.chat.completions.with_raw_response.create(
+            model=MODEL,
+            messages=messages,
+            temperature=0,
+            max_tokens=20,
+        )
     )
+    completion = response.parse()
+    record_completion(MODEL, completion.usage)
+    response_content = completion.choices[0].message.content
+    bounds = parse_bounds(response_content, chapter_count)
+    if bounds and cache:
+        cache.put(cache_key, response_content)
+    return bounds
 
-    try:
-        trimmed_metadata = json.loads(response.choices[0].message.content)
-        return trimmed_metadata
-    except json.JSONDecodeError:
-        print("Error: The AI response was not valid JSON. Using original metadata.")
+
+async def trim_chapters(metadata, client, cache=None):
+    """
+    Keep only the main chapters of the book.
+
+    A rule-based pass over the TOC resolves most books without an API call.
+    The model is asked, for the first and last indices only, when the rules
+    are not confident.
+    """
+    chapters = metadata['chapters']
+    if not chapters:
         return metadata
+    with stage('trim'):
+        with profiled():
+            first, last, confident = classify_chapters(chapters)
+        if confident:
+            logging.info(f"Trimmed by rules: keeping chapters {first + 1}-{last + 1} of {len(chapters)}")
+        else:
+            bounds = await ask_for_bounds(metadata, client, cache)
+            if bounds:
+                first, last = bounds
+                logging.info(f"Trimmed by {MODEL}: keeping chapters {first + 1}-{last + 1} of {len(chapters)}")
+            else:
+                logging.warning(f"{MODEL} did not return usable chapter indices, using the rule-based guess "
+                                f"{first + 1}-{last + 1} of {len(chapters)}")
+    return {**metadata, 'chapters': chapters[first:last + 1]}
+
+async def trim_with_client(metadata):
+    try:
+        return await trim_chapters(metadata, get_client())
+    finally:
+        await close_client()
 
 def main():
     parser = argparse.ArgumentParser(description='Trim non-chapter content from book metadata JSON.')
@@ -53,7 +220,7 @@ def main():
         metadata = json.load(f)
 
     # Trim chapters
-    trimmed_metadata = trim_chapters(metadata)
+    trimmed_metadata = asyncio.run(trim_with_client(metadata))
 
     # Output result
     if args.output:
@@ -1,5 +1,9 @@
+import argparse
+import logging
+import os
 import re
 import unicodedata
+from contextlib import contextmanager
 
 def sanitize_filename(filename):
     """
@@ -19,3 +23,48 @@ def sanitize_filename(filename):
         filename = '_' + filename
     
     return filename[:255]  # Truncate to a safe length
+
+
+def int_at_least(minimum):
+    """argparse type for an integer option with a lower bound."""
+    def parse(value):
+        try:
+            number = int(value)
+        except ValueError:
+            raise argparse.ArgumentTypeError(f"invalid int value: {value!r}")
+        if number < minimum:
+            raise argparse.ArgumentTypeError(f"must be at least {minimum}, got {number}")
+        return number
+    return parse
+
+
+def configure_logging():
+    """
+    Set up the root logger for a command-line entry point, at the level in
+    the LOG_LEVEL environment variable (default INFO).
+
+    Called from main() rather than at import, so importing a module never
+    reconfigures the logging of the program that imported it.
+    """
+    log_level = os.environ.get('LOG_LEVEL', 'INFO').upper()
+    logging.basicConfig(level=getattr(logging, log_level), format='%(asctime)s - %(levelname)s - %(message)s')
+
+
+@contextmanager
+def atomic_write(path, mode='w', encoding='utf-8'):
+    """
+    Open a temporary file next to path and move it into place on success,
+    so a crash never leaves a half-written file under the final name.
+    """
+    temp_path = f"{path}.tmp"
+    try:
+        with open(temp_path, mode, encoding=None if 'b' in mode else encoding) as f:
+            yield f
+            f.flush()
+            os.fsync(f.fileno())
+    except BaseException:
+        # The file under the final name is left as it was
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    os.replace(temp_path, path)
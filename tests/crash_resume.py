@@ -0,0 +1,85 @@
+"""
+Run speedread in a subprocess, SIGKILL it at random points and inspect
+what the resumed run left behind.
+
+Shared by tests/test_fault_injection.py and benchmarks/fault_injection.py.
+"""
+import json
+import os
+import signal
+import subprocess
+import sys
+from pathlib import Path
+
+from speedread.manifest import Manifest, is_valid_mp3
+from speedread.mp3_info import mp3_duration
+
+REPO_DIR = Path(__file__).resolve().parent.parent
+
+
+def mock_api_env(server):
+    """Environment that points a speedread subprocess at a mock_openai server."""
+    return dict(os.environ,
+                OPENAI_BASE_URL=f'http://127.0.0.1:{server.server_port}/v1',
+                OPENAI_API_KEY='mock',
+                PYTHONPATH=os.pathsep.join(filter(None, [str(REPO_DIR), os.environ.get('PYTHONPATH')])),
+                LOG_LEVEL='WARNING')
+
+
+def speedread_command(epub_file, extra_args):
+    return [sys.executable, '-m', 'speedread.speedread_cli', str(epub_file),
+            '-y', '--audiobook', '--no-cache', '--concurrency', '4', *extra_args]
+
+
+def run_to_completion(epub_file, env, extra_args):
+    subprocess.run(speedread_command(epub_file, extra_args), env=env, check=True,
+                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def run_with_kills(epub_file, env, extra_args, kills, max_delay, rng):
+    """Kill up to `kills` runs after a random delay each, then let one finish. Returns the kill count."""
+    killed = 0
+    while True:
+        process = subprocess.Popen(speedread_command(epub_file, extra_args), env=env,
+                                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        if killed < kills:
+            delay = rng.uniform(0, max_delay)
+            try:
+                process.wait(timeout=delay)
+            except subprocess.TimeoutExpired:
+                process.send_signal(signal.SIGKILL)
+                process.wait()
+                killed += 1
+                continue
+        if process.wait() != 0:
+            raise RuntimeError(f"speedread exited with status {process.returncode}")
+        return killed
+
+
+def book_outputs(work_dir):
+    output_dir = next(Path(work_dir).glob('*_speedread'))
+    summary_file = next(output_dir.glob('*_summary.json'))
+    with open(summary_file, 'r', encoding='utf-8') as f:
+        summaries = json.load(f)['summaries']
+    audio = {path.name: path.read_bytes() for path in sorted((output_dir / 'audio_chapters').glob('*.mp3'))}
+    return output_dir, summaries, audio
+
+
+def audio_durations(output_dir):
+    """{file name: seconds} of every chapter MP3, read from the frame headers."""
+    return {path.name: mp3_duration(path) for path in sorted((Path(output_dir) / 'audio_chapters').glob('*.mp3'))}
+
+
+def check_manifest(output_dir):
+    """Problems with the files the manifest records as complete, or an empty list."""
+    manifest = Manifest(output_dir)
+    problems = []
+    for (stage, key), record in manifest.records.items():
+        if 'file' not in record:
+            continue
+        path = output_dir / record['file']
+        if not path.exists() or path.stat().st_size != record['size']:
+            problems.append(f"{stage}/{key}: {path} missing or truncated")
+        elif stage == 'tts' and not is_valid_mp3(path):
+            problems.append(f"{stage}/{key}: {path} is not valid MP3")
+    return problems
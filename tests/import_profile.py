@@ -0,0 +1,39 @@
+"""
+Parse `python -X importtime` output. Shared by tests/test_import_time.py
+and benchmarks/import_time.py.
+"""
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+REPO_DIR = Path(__file__).resolve().parent.parent
+# Loaded by the code that uses them; a short invocation must not pay for them
+HEAVY_DEPENDENCIES = ('openai', 'httpx', 'bs4', 'lxml', 'jinja2', 'tqdm', 'tiktoken')
+
+
+def python_env():
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [str(REPO_DIR), os.environ.get('PYTHONPATH')])))
+    # A warm bytecode cache, as in an installed package
+    env.pop('PYTHONDONTWRITEBYTECODE', None)
+    return env
+
+
+def import_profile(module):
+    """(total microseconds, {module: (self, cumulative)}) from one `-X importtime` run."""
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                            capture_output=True, text=True, env=python_env(), cwd=REPO_DIR)
+    if result.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{result.stderr}")
+    timings = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        timings[name.strip()] = (int(self_us), int(cumulative_us))
+    return timings[module][1], timings
+
+
+def heavy_import_us(timings):
+    """Cumulative microseconds spent importing the heavy dependencies' top-level packages."""
+    return sum(cumulative for name, (_, cumulative) in timings.items() if name in HEAVY_DEPENDENCIES)
@@ -0,0 +1,100 @@
+"""
+Read back the chapters and tags of an M4B by parsing its MP4 atoms.
+
+Shared by the audiobook tests and benchmarks/verify_m4b.py. `build_book`
+writes chapter MP3s of silent frames with known durations, so chapter start
+times can be checked against FRAME_SECONDS.
+"""
+import json
+import struct
+
+from speedread.create_audiobook import create_audiobook
+from tests.mock_openai import SILENT_MP3_FRAME
+
+FRAME_SECONDS = 1152 / 44100
+CONTAINERS = {b'moov', b'trak', b'mdia', b'minf', b'stbl', b'udta', b'tref', b'ilst'}
+# Boxes with a 4-byte version/flags field before their children
+FULL_CONTAINERS = {b'meta'}
+ILST_TAGS = {b'\xa9nam': 'title', b'\xa9alb': 'album', b'\xa9ART': 'artist', b'aART': 'album_artist',
+             b'\xa9wrt': 'composer', b'\xa9gen': 'genre'}
+
+
+def read_atoms(data, start=0, end=None, parent=None):
+    """Parse MP4 atoms into a list of (type, payload, children) tuples."""
+    end = len(data) if end is None else end
+    atoms = []
+    offset = start
+    while offset + 8 <= end:
+        size, kind = struct.unpack('>I4s', data[offset:offset + 8])
+        header = 8
+        if size == 1:
+            size = struct.unpack('>Q', data[offset + 8:offset + 16])[0]
+            header = 16
+        elif size == 0:
+            size = end - offset
+        if size < header:
+            raise ValueError(f"Invalid atom size {size} for {kind!r} at {offset}")
+        body_start, body_end = offset + header, offset + size
+        children = []
+        if kind in CONTAINERS or parent == b'ilst':
+            # Every ilst item holds a 'data' atom
+            children = read_atoms(data, body_start, body_end, kind)
+        elif kind in FULL_CONTAINERS:
+            children = read_atoms(data, body_start + 4, body_end, kind)
+        atoms.append((kind, data[body_start:body_end], children))
+        offset = body_end
+    return atoms
+
+
+def find(atoms, *path):
+    for kind, payload, children in atoms:
+        if kind == path[0]:
+            if len(path) == 1:
+                return kind, payload, children
+            found = find(children, *path[1:])
+            if found:
+                return found
+    return None
+
+
+def parse_chpl(payload):
+    """Nero chapter list: [(start_seconds, title)]."""
+    version = payload[0]
+    offset = 8 if version == 1 else 4
+    count = payload[offset]
+    offset += 1
+    chapters = []
+    for _ in range(count):
+        start, length = struct.unpack('>QB', payload[offset:offset + 9])
+        offset += 9
+        chapters.append((start / 10_000_000, payload[offset:offset + length].decode('utf-8')))
+        offset += length
+    return chapters
+
+
+def parse_ilst(ilst_children):
+    tags = {}
+    for kind, _, children in ilst_children:
+        data = find(children, b'data')
+        if kind in ILST_TAGS and data:
+            # data atom: 4 bytes type, 4 bytes locale, then the value
+            tags[ILST_TAGS[kind]] = data[1][8:].decode('utf-8')
+    return tags
+
+
+def has_chapter_track(moov_children):
+    return any(find(children, b'tref', b'chap') for kind, _, children in moov_children if kind == b'trak')
+
+
+def build_book(work_dir, chapter_frames, author, title):
+    audio_dir = work_dir / 'audio_chapters'
+    audio_dir.mkdir()
+    summaries = []
+    for i, frames in enumerate(chapter_frames, 1):
+        (audio_dir / f"chapter_{i:02d}.mp3").write_bytes(SILENT_MP3_FRAME * frames)
+        summaries.append({'chapter_title': f"{i}. Part {i}; the = #{i}", 'summary': ''})
+    summary_file = work_dir / 'summary.json'
+    summary_file.write_text(json.dumps({'title': title, 'author': author, 'summaries': summaries}))
+    output_file = work_dir / 'book.m4b'
+    create_audiobook(audio_dir, output_file, summary_file)
+    return output_file
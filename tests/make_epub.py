@@ -0,0 +1,224 @@
+"""
+Generate a synthetic EPUB of configurable size and TOC shape.
+
+The book has front matter (cover, title page, copyright, contents), the
+requested number of chapters of random words, optionally grouped under part
+divider pages, and back matter (acknowledgments, notes, about the author),
+so the trimming rules have something to trim. Each chapter can carry an
+image of a given size. The TOC is an EPUB 2 NCX, an EPUB 3 nav.xhtml, or
+both. The same seed always produces the same book.
+
+    python -m tests.make_epub book.epub --chapters 40 --chapter-kb 30 --image-kb 200 --toc nav --parts 4
+"""
+import argparse
+import random
+import zipfile
+from html import escape
+
+WORDS = ('the of and to in a is that for it as was with be by on not he this are or his from at which but '
+         'have an they you were her all she there would their we him been has when who will more no if out '
+         'river empire letter morning silence harbor winter promise machine garden soldier mirror').split()
+TOC_SHAPES = ('ncx', 'nav', 'both')
+FRONT_MATTER = (('cover', 'Cover'), ('titlepage', 'Title Page'), ('copyright', 'Copyright'),
+                ('contents', 'Contents'))
+BACK_MATTER = (('acknowledgments', 'Acknowledgments'), ('notes', 'Notes'), ('about', 'About the Author'))
+# The smallest valid PNG signature and header; the rest of the payload is random bytes
+PNG_HEADER = b'\x89PNG\r\n\x1a\n\x00\x00\x00\rIHDR\x00\x00\x00\x01\x00\x00\x00\x01\x08\x06\x00\x00\x00\x1f\x15\xc4\x89'
+
+CONTAINER_XML = """<?xml version="1.0" encoding="UTF-8"?>
+<container version="1.0" xmlns="urn:oasis:names:tc:opendocument:xmlns:container">
+  <rootfiles>
+    <rootfile full-path="OEBPS/content.opf" media-type="application/oebps-package+xml"/>
+  </rootfiles>
+</container>
+"""
+
+
+def paragraphs(rng, size):
+    """Random-word paragraphs totalling about `size` bytes."""
+    result = []
+    total = 0
+    while total < size:
+        paragraph = ' '.join(rng.choice(WORDS) for _ in range(rng.randint(40, 120))).capitalize() + '.'
+        result.append(paragraph)
+        total += len(paragraph) + 7
+    return result
+
+
+def xhtml(title, body):
+    return f"""<?xml version="1.0" encoding="UTF-8"?>
+<!DOCTYPE html>
+<html xmlns="http://www.w3.org/1999/xhtml" xmlns:epub="http://www.idpf.org/2007/ops">
+<head><title>{escape(title)}</title></head>
+<body>
+{body}
+</body>
+</html>
+"""
+
+
+def build_documents(chapters, chapter_kb, image_kb, parts, rng):
+    """
+    The book's documents in reading order, as dicts with id, href, title,
+    XHTML content, TOC level, and an optional image (href, bytes).
+    """
+    documents = []
+    for doc_id, title in FRONT_MATTER:
+        documents.append({'id': doc_id, 'href': f'{doc_id}.xhtml', 'title': title, 'level': 0,
+                          'content': xhtml(title, f'<h1>{escape(title)}</h1>\n<p>{escape(title)}.</p>')})
+
+    chapters_per_part = -(-chapters // parts) if parts else chapters
+    for number in range(1, chapters + 1):
+        if parts and (number - 1) % chapters_per_part == 0:
+            part = (number - 1) // chapters_per_part + 1
+            title = f'Part {part}'
+            documents.append({'id': f'part{part:02d}', 'href': f'part{part:02d}.xhtml', 'title': title, 'level': 0,
+                              'content': xhtml(title, f'<h1>{title}</h1>')})
+        title = f'Chapter {number}: {rng.choice(WORDS).capitalize()} {rng.choice(WORDS).capitalize()}'
+        body = [f'<h1>{escape(title)}</h1>']
+        image = None
+        if image_kb:
+            payload = PNG_HEADER + rng.randbytes(max(0, image_kb * 1024 - len(PNG_HEADER)))
+            image = (f'images/ch{number:04d}.png', payload)
+            body.append(f'<p><img src="{image[0]}" alt="Illustration {number}"/></p>')
+        body.extend(f'<p>{text}</p>' for text in paragraphs(rng, chapter_kb * 1024))
+        documents.append({'id': f'ch{number:04d}', 'href': f'ch{number:04d}.xhtml', 'title': title,
+                          'level': 1 if parts else 0, 'content': xhtml(title, '\n'.join(body)), 'image': image})
+
+    for doc_id, title in BACK_MATTER:
+        documents.append({'id': doc_id, 'href': f'{doc_id}.xhtml', 'title': title, 'level': 0,
+                          'content': xhtml(title, f'<h1>{escape(title)}</h1>\n' + ''.join(
+                              f'<p>{text}</p>' for text in paragraphs(rng, 2048)))})
+    return documents
+
+
+def nest(documents):
+    """Group TOC entries into (document, children) trees by level."""
+    tree = []
+    for document in documents:
+        if document['level'] and tree:
+            tree[-1][1].append((document, []))
+        else:
+            tree.append((document, []))
+    return tree
+
+
+def build_ncx(title, tree):
+    counter = [0]
+
+    def points(nodes, indent):
+        lines = []
+        for document, children in nodes:
+            counter[0] += 1
+            pad = '  ' * indent
+            lines.append(f'{pad}<navPoint id="np{counter[0]}" playOrder="{counter[0]}">')
+            lines.append(f'{pad}  <navLabel><text>{escape(document["title"])}</text></navLabel>')
+            lines.append(f'{pad}  <content src="{document["href"]}"/>')
+            lines.extend(points(children, indent + 1))
+            lines.append(f'{pad}</navPoint>')
+        return lines
+
+    nav_points = '\n'.join(points(tree, 2))
+    return f"""<?xml version="1.0" encoding="UTF-8"?>
+<ncx xmlns="http://www.daisy.org/z3986/2005/ncx/" version="2005-1">
+  <head><meta name="dtb:uid" content="speedread-benchmark"/></head>
+  <docTitle><text>{escape(title)}</text></docTitle>
+  <navMap>
+{nav_points}
+  </navMap>
+</ncx>
+"""
+
+
+def build_nav(title, tree):
+    def items(nodes, indent):
+        pad = '  ' * indent
+        lines = [f'{pad}<ol>']
+        for document, children in nodes:
+            link = f'<a href="{document["href"]}">{escape(document["title"])}</a>'
+            if children:
+                lines.append(f'{pad}  <li>{link}')
+                lines.extend(items(children, indent + 2))
+                lines.append(f'{pad}  </li>')
+            else:
+                lines.append(f'{pad}  <li>{link}</li>')
+        lines.append(f'{pad}</ol>')
+        return lines
+
+    body = f'<nav epub:type="toc" id="toc">\n<h1>Contents</h1>\n' + '\n'.join(items(tree, 0)) + '\n</nav>'
+    return xhtml(title, body)
+
+
+def build_opf(title, author, documents, toc):
+    manifest = []
+    for document in documents:
+        manifest.append(f'<item id="{document["id"]}" href="{document["href"]}" media-type="application/xhtml+xml"/>')
+        if document.get('image'):
+            manifest.append(f'<item id="img-{document["id"]}" href="{document["image"][0]}" media-type="image/png"/>')
+    if toc in ('nav', 'both'):
+        manifest.append('<item id="nav" href="nav.xhtml" media-type="application/xhtml+xml" properties="nav"/>')
+    if toc in ('ncx', 'both'):
+        manifest.append('<item id="ncx" href="toc.ncx" media-type="application/x-dtbncx+xml"/>')
+    manifest = '\n    '.join(manifest)
+    spine_toc = ' toc="ncx"' if toc in ('ncx', 'both') else ''
+    spine = '\n    '.join(f'<itemref idref="{document["id"]}"/>' for document in documents)
+    return f"""<?xml version="1.0" encoding="UTF-8"?>
+<package xmlns="http://www.idpf.org/2007/opf" version="3.0" unique-identifier="uid">
+  <metadata xmlns:dc="http://purl.org/dc/elements/1.1/">
+    <dc:identifier id="uid">speedread-benchmark</dc:identifier>
+    <dc:title>{escape(title)}</dc:title>
+    <dc:creator>{escape(author)}</dc:creator>
+    <dc:language>en</dc:language>
+  </metadata>
+  <manifest>
+    {manifest}
+  </manifest>
+  <spine{spine_toc}>
+    {spine}
+  </spine>
+</package>
+"""
+
+
+def make_epub(path, chapters=20, chapter_kb=20, image_kb=0, toc='both', parts=0, seed=1,
+              title='Benchmark Book', author='Speedread Benchmarks'):
+    """Write a synthetic EPUB to `path` and return the number of TOC entries."""
+    if toc not in TOC_SHAPES:
+        raise ValueError(f"toc must be one of {TOC_SHAPES}")
+    rng = random.Random(seed)
+    documents = build_documents(chapters, chapter_kb, image_kb, parts, rng)
+    tree = nest(documents)
+    with zipfile.ZipFile(path, 'w') as epub:
+        # The mimetype entry must come first and be stored uncompressed
+        epub.writestr(zipfile.ZipInfo('mimetype'), 'application/epub+zip', compress_type=zipfile.ZIP_STORED)
+        epub.writestr('META-INF/container.xml', CONTAINER_XML, compress_type=zipfile.ZIP_DEFLATED)
+        epub.writestr('OEBPS/content.opf', build_opf(title, author, documents, toc), compress_type=zipfile.ZIP_DEFLATED)
+        if toc in ('ncx', 'both'):
+            epub.writestr('OEBPS/toc.ncx', build_ncx(title, tree), compress_type=zipfile.ZIP_DEFLATED)
+        if toc in ('nav', 'both'):
+            epub.writestr('OEBPS/nav.xhtml', build_nav(title, tree), compress_type=zipfile.ZIP_DEFLATED)
+        for document in documents:
+            epub.writestr(f'OEBPS/{document["href"]}', document['content'], compress_type=zipfile.ZIP_DEFLATED)
+            if document.get('image'):
+                # Images are already compressed in real books
+                epub.writestr(f'OEBPS/{document["image"][0]}', document['image'][1], compress_type=zipfile.ZIP_STORED)
+    return len(documents)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate a synthetic EPUB for benchmarks.')
+    parser.add_argument('output', help='Path of the EPUB to write')
+    parser.add_argument('--chapters', type=int, default=20, help='Number of main chapters')
+    parser.add_argument('--chapter-kb', type=int, default=20, help='Text per chapter in KB')
+    parser.add_argument('--image-kb', type=int, default=0, help='Size of the image in each chapter in KB (0: none)')
+    parser.add_argument('--toc', choices=TOC_SHAPES, default='both', help='Navigation documents to include')
+    parser.add_argument('--parts', type=int, default=0, help='Group the chapters under this many part pages')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    entries = make_epub(args.output, args.chapters, args.chapter_kb, args.image_kb, args.toc, args.parts, args.seed)
+    print(f"Wrote {args.output} with {entries} TOC entries")
+
+
+if __name__ == '__main__':
+    main()
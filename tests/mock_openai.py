@@ -0,0 +1,226 @@
+"""
+A minimal OpenAI-compatible HTTP server for benchmarks.
+
+Implements POST /v1/chat/completions and POST /v1/audio/speech with a fixed
+artificial latency, plus enough of the files and batches endpoints for the
+Batch API mode (batches complete as soon as they are created). A fraction of
+chat and speech requests can be answered with 429 and a short Retry-After to
+exercise the rate limiter, and `server.errors` makes the next requests to
+a path answer 500 to exercise retries. Point the client at it with
+OPENAI_BASE_URL=http://127.0.0.1:<port>/v1 and any OPENAI_API_KEY.
+
+    python -m tests.mock_openai --port 8089 --latency 0.2 --rate-limit-rate 0.05
+"""
+import argparse
+import email.parser
+import itertools
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# A single silent MPEG-1 Layer III frame (128 kbps, 44.1 kHz)
+SILENT_MP3_FRAME = b'\xff\xfb\x90\x64' + b'\x00' * 413
+
+
+class MockOpenAIHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    latency = 0.0
+    # Fraction of chat and speech requests answered with 429, drawn from a seeded generator
+    rate_limit_rate = 0.0
+    retry_after_ms = 50
+    rng = None
+    # Requests served per path, shared by all handler threads of one server
+    request_counts = None
+    # Uploaded files and created batches, shared the same way
+    store = None
+    # {path fragment: count}: that many more requests whose path contains the fragment get a 500
+    errors = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def read_json(self):
+        length = int(self.headers.get('Content-Length', 0))
+        return json.loads(self.rfile.read(length) or b'{}')
+
+    def send_body(self, status, body, content_type):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_json(self, status, payload):
+        self.send_body(status, json.dumps(payload).encode('utf-8'), 'application/json')
+
+    def read_upload(self):
+        length = int(self.headers.get('Content-Length', 0))
+        raw = f"Content-Type: {self.headers['Content-Type']}\r\n\r\n".encode('utf-8') + self.rfile.read(length)
+        message = email.parser.BytesParser().parsebytes(raw)
+        for part in message.get_payload():
+            if part.get_param('name', header='content-disposition') == 'file':
+                return part.get_payload(decode=True)
+        return b''
+
+    def count(self):
+        self.request_counts[self.path] = self.request_counts.get(self.path, 0) + 1
+
+    def do_GET(self):
+        self.count()
+        if self.injected_error():
+            return
+        parts = self.path.rstrip('/').split('/')
+        if '/batches/' in self.path and parts[-1] in self.store['batches']:
+            self.send_json(200, self.store['batches'][parts[-1]])
+        elif self.path.endswith('/content') and parts[-2] in self.store['files']:
+            self.send_body(200, self.store['files'][parts[-2]], 'application/jsonl')
+        else:
+            self.send_json(404, {'error': {'message': f'Unknown path {self.path}'}})
+
+    def do_POST(self):
+        if self.path.endswith('/files'):
+            content = self.read_upload()
+            self.count()
+            if not self.injected_error():
+                self.send_json(200, self.store_file(content, 'batch'))
+            return
+        request = self.read_json()
+        self.count()
+        if self.injected_error():
+            return
+        if self.path.endswith('/batches'):
+            self.send_json(200, self.run_batch(request))
+            return
+        if self.rate_limited():
+            self.send_rate_limit()
+            return
+        time.sleep(self.latency)
+        if self.path.endswith('/chat/completions'):
+            self.send_json(200, chat_completion(request))
+        elif self.path.endswith('/audio/speech'):
+            frames = max(1, len(request.get('input', '')) // 20)
+            self.send_body(200, SILENT_MP3_FRAME * frames, 'audio/mpeg')
+        else:
+            self.send_json(404, {'error': {'message': f'Unknown path {self.path}'}})
+
+    def injected_error(self):
+        """Answer 500 if an error is still queued for this path."""
+        with self.store['lock']:
+            fragment = next((fragment for fragment, count in self.errors.items()
+                             if count > 0 and fragment in self.path), None)
+            if fragment is None:
+                return False
+            self.errors[fragment] -= 1
+        self.request_counts['500'] = self.request_counts.get('500', 0) + 1
+        self.send_json(500, {'error': {'message': 'Injected server error (mock)', 'type': 'server_error'}})
+        return True
+
+    def rate_limited(self):
+        if not self.rate_limit_rate:
+            return False
+        with self.store['lock']:
+            return self.rng.random() < self.rate_limit_rate
+
+    def send_rate_limit(self):
+        self.request_counts['429'] = self.request_counts.get('429', 0) + 1
+        body = json.dumps({'error': {'message': 'Rate limit reached (mock)', 'type': 'requests',
+                                     'code': 'rate_limit_exceeded'}}).encode('utf-8')
+        self.send_response(429)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('retry-after-ms', str(self.retry_after_ms))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def store_file(self, content, purpose):
+        with self.store['lock']:
+            file_id = f"file-{next(self.store['ids'])}"
+            self.store['files'][file_id] = content
+        return {'id': file_id, 'object': 'file', 'bytes': len(content), 'created_at': int(time.time()),
+                'filename': f'{file_id}.jsonl', 'purpose': purpose}
+
+    def run_batch(self, request):
+        lines = self.store['files'][request['input_file_id']].decode('utf-8').splitlines()
+        output = []
+        for line in filter(None, lines):
+            entry = json.loads(line)
+            output.append(json.dumps({
+                'id': f"batch_req_{entry['custom_id']}",
+                'custom_id': entry['custom_id'],
+                'response': {'status_code': 200, 'request_id': 'mock', 'body': chat_completion(entry['body'])},
+                'error': None,
+            }))
+        output_file = self.store_file(('\n'.join(output) + '\n').encode('utf-8'), 'batch_output')
+        with self.store['lock']:
+            batch_id = f"batch_{next(self.store['ids'])}"
+            now = int(time.time())
+            self.store['batches'][batch_id] = {
+                'id': batch_id,
+                'object': 'batch',
+                'endpoint': request['endpoint'],
+                'input_file_id': request['input_file_id'],
+                'completion_window': request['completion_window'],
+                'status': 'completed',
+                'output_file_id': output_file['id'],
+                'error_file_id': None,
+                'created_at': now,
+                'completed_at': now,
+                'request_counts': {'total': len(output), 'completed': len(output), 'failed': 0},
+                'metadata': request.get('metadata'),
+            }
+        return self.store['batches'][batch_id]
+
+
+def chat_completion(request):
+    prompt = request.get('messages', [{}])[-1].get('content', '')
+    content = f"Summary of {len(prompt)} characters."
+    return {
+        'id': 'chatcmpl-mock',
+        'object': 'chat.completion',
+        'created': int(time.time()),
+        'model': request.get('model', 'mock'),
+        'choices': [{
+            'index': 0,
+            'message': {'role': 'assistant', 'content': content},
+            'finish_reason': 'stop',
+        }],
+        'usage': {
+            'prompt_tokens': len(prompt) // 4,
+            'completion_tokens': len(content) // 4,
+            'total_tokens': (len(prompt) + len(content)) // 4,
+        },
+    }
+
+
+def make_server(host='127.0.0.1', port=0, latency=0.0, rate_limit_rate=0.0, seed=None):
+    store = {'files': {}, 'batches': {}, 'ids': itertools.count(1), 'lock': threading.Lock()}
+    handler = type('Handler', (MockOpenAIHandler,), {
+        'latency': latency, 'request_counts': {}, 'store': store, 'errors': {},
+        'rate_limit_rate': rate_limit_rate, 'rng': random.Random(seed),
+    })
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    server.request_counts = handler.request_counts
+    server.errors = handler.errors
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run a mock OpenAI-compatible server.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8089)
+    parser.add_argument('--latency', type=float, default=0.0, help='Seconds to wait before each response')
+    parser.add_argument('--rate-limit-rate', type=float, default=0.0,
+                        help='Fraction of chat and speech requests answered with 429')
+    parser.add_argument('--seed', type=int, default=None, help='Seed for choosing the rate limited requests')
+    args = parser.parse_args()
+
+    server = make_server(args.host, args.port, args.latency, args.rate_limit_rate, args.seed)
+    print(f"Mock OpenAI server listening on http://{args.host}:{server.server_port}/v1", flush=True)
+    server.serve_forever()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,127 @@
+import argparse
+import asyncio
+import json
+import threading
+
+import pytest
+
+from speedread import batch, batch_api, rate_limiter
+from tests.mock_openai import make_server
+
+
+def batch_args(tmp_path, **overrides):
+    return argparse.Namespace(**{'concurrency': 2, 'batch_api': True, 'batch_state': str(tmp_path / 'state.json'),
+                                 'chunk_tokens': 100, 'reduce_fan_in': 2, 'poll_interval': 0, **overrides})
+
+
+def make_books(tmp_path, *names):
+    paths = []
+    for name in names:
+        path = tmp_path / f"{name}.epub"
+        path.write_bytes(b'')
+        paths.append(path)
+    return paths
+
+
+def test_failed_batch_books_are_reported_and_the_rest_still_run(tmp_path, monkeypatch):
+    bad, good = make_books(tmp_path, 'bad', 'good')
+    processed = []
+
+    async def summarize_books_with_batch_api(epubs, *args):
+        return {bad: RuntimeError('batch expired')}
+
+    async def process_book(epub_path, *args):
+        processed.append(epub_path)
+        return 'completed'
+
+    monkeypatch.setattr(batch, 'summarize_books_with_batch_api', summarize_books_with_batch_api)
+    monkeypatch.setattr(batch, 'process_book', process_book)
+    report_file = tmp_path / 'report.json'
+
+    report = asyncio.run(batch.run_batch([tmp_path], batch_args(tmp_path), None, report_file=report_file))
+
+    assert processed == [good]
+    assert {book['epub']: (book['status'], book['error']) for book in report['books']} == {
+        str(bad): ('failed', 'batch expired'),
+        str(good): ('completed', None),
+    }
+    assert json.loads(report_file.read_text()) == report
+
+
+def test_report_is_written_when_the_run_is_interrupted(tmp_path, monkeypatch):
+    first, second = make_books(tmp_path, 'a', 'b')
+
+    async def process_book(epub_path, *args):
+        if epub_path == second:
+            raise KeyboardInterrupt
+        return 'completed'
+
+    monkeypatch.setattr(batch, 'process_book', process_book)
+    report_file = tmp_path / 'report.json'
+
+    with pytest.raises(KeyboardInterrupt):
+        asyncio.run(batch.run_batch([tmp_path], batch_args(tmp_path, batch_api=False), None,
+                                    report_file=report_file, books_in_flight=1))
+
+    report = json.loads(report_file.read_text())
+    assert [book['status'] for book in report['books']] == ['completed', 'interrupted']
+
+
+def test_one_book_failing_to_merge_does_not_stop_the_others(tmp_path, monkeypatch):
+    books = [
+        {'title': title, 'author': 'Author', 'chapters': [{'id': 'c1', 'title': 'One'}, {'id': 'c2', 'title': 'Two'}],
+         'summary_json_file': tmp_path / f"{title}_summary.json", 'html_file': tmp_path / f"{title}_summary.html"}
+        for title in ('Good', 'Bad')
+    ]
+    plan = [[{'title': f"{book['title']} {chapter['title']}"} for chapter in book['chapters']] for book in books]
+
+    async def merge_chapter(client, plan_entry, *args):
+        if plan_entry['title'] == 'Bad Two':
+            raise RuntimeError('merge failed')
+        return f"summary of {plan_entry['title']}"
+
+    monkeypatch.setattr(batch_api, 'build_batch_requests', lambda *args: ([], plan))
+    monkeypatch.setattr(batch_api, 'merge_chapter', merge_chapter)
+    monkeypatch.setattr(batch_api, 'write_html', lambda summary_data, html_file: None)
+    state_file = tmp_path / 'state.json'
+    state_file.write_text('{}')
+
+    errors = asyncio.run(batch_api.summarize_with_batch_api(None, books, state_file))
+
+    assert errors[0] is None
+    assert str(errors[1]) == 'merge failed'
+    summaries = json.loads(books[0]['summary_json_file'].read_text())['summaries']
+    assert [entry['summary'] for entry in summaries] == ['summary of Good One', 'summary of Good Two']
+    assert not books[1]['summary_json_file'].exists()
+    # Kept so a rerun can pick the batch up again
+    assert state_file.exists()
+
+
+def test_batch_calls_survive_transient_server_errors(monkeypatch):
+    from openai import AsyncOpenAI
+
+    monkeypatch.setattr(rate_limiter, 'BASE_RETRY_DELAY', 0.001)
+    server = make_server()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    # One failed upload, one failed download, and more failed polls than one poll retries
+    server.errors.update({'/files': 1, '/content': 1, '/batches/batch_': rate_limiter.MAX_RETRIES + 2})
+    lines = [{'custom_id': '0-0-0', 'method': 'POST', 'url': batch_api.BATCH_ENDPOINT,
+              'body': {'model': 'mock', 'messages': [{'role': 'user', 'content': 'x' * 40}]}}]
+
+    async def run():
+        client = AsyncOpenAI(base_url=f'http://127.0.0.1:{server.server_port}/v1', api_key='mock', max_retries=0)
+        try:
+            submitted = await batch_api.submit_batch(client, lines, 'test')
+            finished = await batch_api.wait_for_batch(client, submitted.id, poll_interval=0)
+            return await batch_api.fetch_batch_results(client, finished)
+        finally:
+            await client.close()
+
+    try:
+        results = asyncio.run(run())
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    assert results == {'0-0-0': 'Summary of 40 characters.'}
+    assert server.request_counts['500'] == rate_limiter.MAX_RETRIES + 4
@@ -0,0 +1,116 @@
+import os
+import shutil
+from pathlib import Path
+
+import pytest
+
+from speedread import create_audiobook
+from tests import m4b_helpers
+from tests.mock_openai import SILENT_MP3_FRAME
+
+requires_ffmpeg = pytest.mark.skipif(not shutil.which('ffmpeg'), reason='needs ffmpeg')
+
+
+def test_metadata_file_has_tags_and_chapter_marks(tmp_path):
+    chapters = [
+        {'title': 'Chapter 1: Start; the = #1', 'start': 0, 'end': 12.3456},
+        {'title': 'Chapter 2: Line\nbreak', 'start': 12.3456, 'end': 30.0},
+    ]
+
+    metadata_file = create_audiobook.write_metadata_file(chapters, 'An Author', 'A = B', tmp_path / 'metadata.txt')
+
+    assert metadata_file.read_text(encoding='utf-8') == (
+        ';FFMETADATA1\n'
+        'title=A \\= B\n'
+        'album=A \\= B\n'
+        'artist=An Author\n'
+        'album_artist=An Author\n'
+        'composer=An Author\n'
+        'genre=Audiobook\n'
+        '[CHAPTER]\nTIMEBASE=1/1000\nSTART=0\nEND=12346\ntitle=Chapter 1: Start\\; the \\= \\#1\n'
+        '[CHAPTER]\nTIMEBASE=1/1000\nSTART=12346\nEND=30000\ntitle=Chapter 2: Line\\\nbreak\n'
+    )
+
+
+def test_chapter_marks_follow_mp3_durations(tmp_path):
+    frames = [100, 250]
+    mp3_files = []
+    for i, count in enumerate(frames, 1):
+        mp3_file = tmp_path / f"chapter_{i:02d}.mp3"
+        mp3_file.write_bytes(SILENT_MP3_FRAME * count)
+        mp3_files.append(mp3_file)
+    summary_data = {'summaries': [{'chapter_title': '1. Opening'}, {'chapter_title': ''}]}
+
+    chapters = create_audiobook.create_chapter_information(mp3_files, summary_data)
+
+    assert [chapter['title'] for chapter in chapters] == ['Chapter 1: Opening', 'Chapter 2']
+    assert chapters[0]['start'] == 0
+    assert chapters[0]['end'] == pytest.approx(100 * m4b_helpers.FRAME_SECONDS)
+    assert chapters[1]['start'] == chapters[0]['end']
+    assert chapters[1]['end'] == pytest.approx(350 * m4b_helpers.FRAME_SECONDS)
+
+
+def test_combine_maps_chapters_and_tags_from_metadata_file(tmp_path, monkeypatch):
+    commands = []
+
+    def run(cmd, check):
+        commands.append(cmd)
+        Path(cmd[-1]).write_bytes(b'm4b')
+
+    monkeypatch.setattr(create_audiobook.subprocess, 'run', run)
+    output_file = tmp_path / 'book.m4b'
+
+    create_audiobook.combine_aac_files(tmp_path / 'file_list.txt', tmp_path / 'metadata.txt', output_file)
+
+    cmd = commands[0]
+    assert cmd[cmd.index('-i', cmd.index('-i') + 1) + 1] == str(tmp_path / 'metadata.txt')
+    assert cmd[cmd.index('-map_metadata') + 1] == '1'
+    assert cmd[cmd.index('-map_chapters') + 1] == '1'
+    assert output_file.read_bytes() == b'm4b'
+
+
+def test_segments_follow_mp3_content_not_mtime(tmp_path, monkeypatch):
+    encoded = []
+
+    def run(cmd, check):
+        encoded.append(Path(cmd[cmd.index('-i') + 1]).name)
+        Path(cmd[-1]).write_bytes(b'aac')
+
+    monkeypatch.setattr(create_audiobook.subprocess, 'run', run)
+    mp3_files = [tmp_path / 'chapter_01.mp3', tmp_path / 'chapter_02.mp3']
+    for mp3_file in mp3_files:
+        mp3_file.write_bytes(SILENT_MP3_FRAME * 10)
+    segments_dir = tmp_path / 'aac_chapters'
+
+    create_audiobook.encode_chapters(mp3_files, segments_dir, workers=1)
+    # New audio with an old mtime, as when it is hardlinked from the audio cache
+    mp3_files[1].write_bytes(SILENT_MP3_FRAME * 20)
+    old = (segments_dir / 'chapter_02.m4a').stat().st_mtime - 3600
+    os.utime(mp3_files[1], (old, old))
+    create_audiobook.encode_chapters(mp3_files, segments_dir, workers=1)
+
+    assert encoded == ['chapter_01.mp3', 'chapter_02.mp3', 'chapter_02.mp3']
+
+
+@requires_ffmpeg
+def test_m4b_chapters_and_tags_can_be_read_back(tmp_path):
+    author, title = 'Test Author', 'Test Title: A = B'
+    chapter_frames = [200, 237, 274]
+
+    output_file = m4b_helpers.build_book(tmp_path, chapter_frames, author, title)
+    moov = m4b_helpers.find(m4b_helpers.read_atoms(output_file.read_bytes()), b'moov')
+
+    chpl = m4b_helpers.find(moov[2], b'udta', b'chpl')
+    chapters = m4b_helpers.parse_chpl(chpl[1])
+    assert [chapter_title for _, chapter_title in chapters] == [
+        f"Chapter {i}: Part {i}; the = #{i}" for i in range(1, len(chapter_frames) + 1)
+    ]
+    expected_start = 0.0
+    for (start, _), frames in zip(chapters, chapter_frames):
+        assert start == pytest.approx(expected_start, abs=0.1)
+        expected_start += frames * m4b_helpers.FRAME_SECONDS
+    assert m4b_helpers.has_chapter_track(moov[2])
+
+    tags = m4b_helpers.parse_ilst(m4b_helpers.find(moov[2], b'udta', b'meta', b'ilst')[2])
+    assert tags == {'title': title, 'album': title, 'artist': author, 'album_artist': author,
+                    'composer': author, 'genre': 'Audiobook'}
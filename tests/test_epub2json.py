@@ -0,0 +1,31 @@
+import pstats
+
+from speedread import epub2json
+from speedread.metrics import RunMetrics, collecting
+
+
+class Archive:
+    def __init__(self, documents):
+        self.documents = documents
+
+    def exists(self, name):
+        return name in self.documents
+
+    def read(self, name):
+        return self.documents[name]
+
+
+def test_profiled_extraction_runs_in_process(tmp_path):
+    archive = Archive({f"chapter{i}.xhtml": f"<html><body><p>Chapter {i}</p></body></html>".encode()
+                       for i in range(4)})
+    chapters = [{'title': f"Chapter {i}", 'src': f"chapter{i}.xhtml"} for i in range(4)]
+    metrics = RunMetrics(profile=True)
+
+    with collecting(metrics):
+        epub2json.extract_chapters_content(archive, chapters, 'bs4', workers=4)
+
+    assert [chapter['content'] for chapter in chapters] == [f"Chapter {i}" for i in range(4)]
+    profile_file = tmp_path / 'run_profile.pstats'
+    assert metrics.dump_profile(profile_file)
+    profiled_functions = {name for _, _, name in pstats.Stats(str(profile_file)).stats}
+    assert 'bs4_to_text' in profiled_functions
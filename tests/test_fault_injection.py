@@ -0,0 +1,46 @@
+import random
+import shutil
+import threading
+import time
+
+import pytest
+
+from tests.crash_resume import (audio_durations, book_outputs, check_manifest, mock_api_env, run_to_completion,
+                                run_with_kills)
+from tests.make_epub import make_epub
+from tests.mock_openai import make_server
+
+pytestmark = [pytest.mark.slow, pytest.mark.skipif(not shutil.which('ffmpeg'), reason='needs ffmpeg')]
+
+
+@pytest.fixture
+def mock_api():
+    server = make_server(latency=0.05)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.mark.parametrize('extra_args', [[], ['--pipeline']], ids=['stages', 'pipeline'])
+def test_killed_runs_resume_to_the_reference_output(tmp_path, mock_api, extra_args):
+    env = mock_api_env(mock_api)
+    reference_dir, crash_dir = tmp_path / 'reference', tmp_path / 'crash'
+    for work_dir in (reference_dir, crash_dir):
+        work_dir.mkdir()
+        make_epub(work_dir / 'book.epub', chapters=6, chapter_kb=4, image_kb=0, toc='ncx', parts=0, seed=1)
+
+    start = time.perf_counter()
+    run_to_completion(reference_dir / 'book.epub', env, extra_args)
+    # Kills land anywhere within the time a whole run takes
+    max_delay = time.perf_counter() - start
+    reference_output_dir, reference_summaries, _ = book_outputs(reference_dir)
+    killed = run_with_kills(crash_dir / 'book.epub', env, extra_args, kills=4, max_delay=max_delay,
+                            rng=random.Random(1))
+    output_dir, summaries, _ = book_outputs(crash_dir)
+
+    assert killed > 0
+    assert check_manifest(output_dir) == []
+    assert summaries == reference_summaries
+    assert audio_durations(output_dir) == audio_durations(reference_output_dir)
+    assert next(output_dir.glob('*.m4b')).stat().st_size > 0
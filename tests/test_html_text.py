@@ -0,0 +1,29 @@
+import pytest
+
+from speedread.html_text import TEXT_BACKENDS, bs4_to_text, extract_texts, lxml_to_text
+
+
+def test_bs4_translates_line_endings_like_text_mode():
+    document = b'<html><body><p>Tone\r\ntwo\rthree</p></body></html>'
+
+    assert bs4_to_text(document) == 'Tone\ntwo\nthree'
+
+
+def test_lxml_makes_paragraphs_from_blocks():
+    document = b'<html><head><title>T</title></head><body><h1>Title</h1><p>One  two<br/>three</p></body></html>'
+
+    assert lxml_to_text(document) == 'Title\n\nOne two\nthree'
+
+
+@pytest.mark.parametrize('backend', sorted(TEXT_BACKENDS))
+@pytest.mark.parametrize('document', [b'', b'   \n\t ', b'<html><body></body></html>'])
+def test_empty_documents_become_empty_text(backend, document):
+    assert TEXT_BACKENDS[backend](document).strip() == ''
+
+
+def test_extract_texts_keeps_order():
+    documents = [f'<p>Chapter {i}</p>'.encode() for i in range(4)]
+
+    texts = [text for text, _ in extract_texts(documents, 'lxml', workers=1)]
+
+    assert texts == [f'Chapter {i}' for i in range(4)]
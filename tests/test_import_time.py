@@ -0,0 +1,56 @@
+import json
+import subprocess
+import sys
+
+import pytest
+
+from speedread.content_store import ContentStore
+from tests.import_profile import HEAVY_DEPENDENCIES, REPO_DIR, heavy_import_us, import_profile
+
+# Nothing should be spent on the heavy dependencies; a few ms leave room for timer noise only
+HEAVY_BUDGET_MS = 5
+# Well above the usual import time, to catch a stage module or dependency creeping back in
+IMPORT_BUDGET_MS = 500
+
+
+def loaded_packages(module):
+    code = f"import json, sys; import {module}; print(json.dumps(sorted({{name.split('.')[0] for name in sys.modules}})))"
+    result = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True, cwd=REPO_DIR)
+    return set(json.loads(result.stdout))
+
+
+@pytest.mark.parametrize('module', ['speedread', 'speedread.speedread_cli', 'speedread.static_site'])
+def test_import_does_not_load_heavy_dependencies(module):
+    assert loaded_packages(module).isdisjoint(HEAVY_DEPENDENCIES)
+
+
+@pytest.mark.parametrize('module', ['speedread.speedread_cli', 'speedread.static_site'])
+def test_import_time_stays_within_budget(module):
+    # The first run compiles bytecode, so only the second is timed
+    import_profile(module)
+    total_us, timings = import_profile(module)
+
+    assert heavy_import_us(timings) / 1000 <= HEAVY_BUDGET_MS
+    assert total_us / 1000 <= IMPORT_BUDGET_MS
+
+
+def test_html_only_resume_does_not_load_the_api_client(tmp_path):
+    # Parsed and summarized by an earlier run; only the HTML is left to render
+    epub_file = tmp_path / 'book.epub'
+    epub_file.write_bytes(b'')
+    output_dir = tmp_path / 'book_speedread'
+    output_dir.mkdir()
+    chapter = {'id': '1:ch1.xhtml', 'title': 'One', 'content': 'Text'}
+    ContentStore.write(output_dir / 'book_content.sqlite', {'title': 'Book', 'author': 'Author', 'chapters': [chapter]})
+    (output_dir / 'book_summary.json').write_text(json.dumps({
+        'title': 'Book', 'author': 'Author',
+        'summaries': [{'chapter_id': chapter['id'], 'chapter_title': 'One', 'summary': 'Short.'}],
+    }))
+    code = ("import json, sys; from speedread.speedread_cli import main; "
+            f"sys.argv = ['speedread', {str(epub_file)!r}, '-y', '--no-cache']; main(); "
+            "print(json.dumps(sorted({name.split('.')[0] for name in sys.modules})))")
+
+    result = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True, cwd=REPO_DIR)
+
+    assert (output_dir / 'book_summary.html').exists()
+    assert set(json.loads(result.stdout.splitlines()[-1])).isdisjoint({'openai', 'httpx'})
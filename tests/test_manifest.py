@@ -0,0 +1,92 @@
+import asyncio
+import json
+
+from speedread import speedread_cli, summarize_book
+from speedread.manifest import MANIFEST_NAME, Manifest
+
+
+def test_records_are_reloaded(tmp_path):
+    Manifest(tmp_path).record('summary', '0:ch1.xhtml', 'hash-1', summary='One')
+
+    record = Manifest(tmp_path).get('summary', '0:ch1.xhtml', 'hash-1')
+
+    assert record['summary'] == 'One'
+
+
+def test_torn_last_line_is_discarded(tmp_path):
+    manifest = Manifest(tmp_path)
+    manifest.record('summary', '0:ch1.xhtml', 'hash-1', summary='One')
+    with open(tmp_path / MANIFEST_NAME, 'a', encoding='utf-8') as f:
+        f.write('{"stage": "summary", "key": "1:ch2.xhtml", "input_ha')
+
+    reloaded = Manifest(tmp_path)
+    reloaded.record('summary', '1:ch2.xhtml', 'hash-2', summary='Two')
+
+    assert reloaded.get('summary', '0:ch1.xhtml', 'hash-1')['summary'] == 'One'
+    lines = (tmp_path / MANIFEST_NAME).read_text(encoding='utf-8').splitlines()
+    assert [json.loads(line)['key'] for line in lines] == ['0:ch1.xhtml', '1:ch2.xhtml']
+    assert Manifest(tmp_path).get('summary', '1:ch2.xhtml', 'hash-2')['summary'] == 'Two'
+
+
+def test_changed_input_is_not_reused(tmp_path):
+    Manifest(tmp_path).record('summary', '0:ch1.xhtml', 'old-hash', summary='Stale')
+
+    assert Manifest(tmp_path).get('summary', '0:ch1.xhtml', 'new-hash') is None
+
+
+def test_records_are_keyed_by_chapter_id(tmp_path):
+    manifest = Manifest(tmp_path)
+    manifest.record('summary', '4:ch3.xhtml', 'hash-3', summary='Three')
+
+    assert manifest.get('summary', 3, 'hash-3') is None
+    assert manifest.get('tts', '4:ch3.xhtml', 'hash-3') is None
+    assert manifest.get('summary', '4:ch3.xhtml', 'hash-3')['summary'] == 'Three'
+
+
+def test_completed_file_must_match_recorded_size(tmp_path):
+    output = tmp_path / 'chapter_01.mp3'
+    output.write_bytes(b'audio')
+    manifest = Manifest(tmp_path)
+    manifest.record('tts', '01', 'hash-1', file=output)
+
+    assert manifest.completed_file('tts', '01', 'hash-1') == output
+    output.write_bytes(b'aud')
+    assert manifest.completed_file('tts', '01', 'hash-1') is None
+
+
+def fake_summarizer(monkeypatch):
+    calls = []
+
+    async def summarize_chapter(client, content, title, *args, **kwargs):
+        calls.append(title)
+        return f"Summary of {title}"
+
+    monkeypatch.setattr(summarize_book, 'summarize_chapter', summarize_chapter)
+    return calls
+
+
+def test_summarize_journaled_skips_journaled_chapters(tmp_path, monkeypatch):
+    calls = fake_summarizer(monkeypatch)
+    chapters = [{'id': f'{i}:ch{i}.xhtml', 'title': f'Chapter {i}', 'content': f'Text {i}'} for i in range(1, 4)]
+
+    async def summarize_all(manifest):
+        return [await speedread_cli.summarize_journaled(None, number, chapter, manifest=manifest)
+                for number, chapter in enumerate(chapters, start=1)]
+
+    first = asyncio.run(summarize_all(Manifest(tmp_path)))
+    chapters[1]['content'] = 'Edited text'
+    second = asyncio.run(summarize_all(Manifest(tmp_path)))
+
+    assert first == second
+    assert calls == ['Chapter 1', 'Chapter 2', 'Chapter 3', 'Chapter 2']
+
+
+def test_summarize_journaled_follows_chapter_ids_not_positions(tmp_path, monkeypatch):
+    calls = fake_summarizer(monkeypatch)
+    chapter = {'id': '5:ch5.xhtml', 'title': 'Chapter 5', 'content': 'Text 5'}
+
+    asyncio.run(speedread_cli.summarize_journaled(None, 1, chapter, manifest=Manifest(tmp_path)))
+    # A different trim moves the chapter to another position
+    asyncio.run(speedread_cli.summarize_journaled(None, 3, chapter, manifest=Manifest(tmp_path)))
+
+    assert calls == ['Chapter 5']
@@ -0,0 +1,53 @@
+import json
+
+from speedread.static_site import SITE_STATE_NAME, build_site
+
+
+def write_summary(books_dir, name, title, summary):
+    output_dir = books_dir / f"{name}_speedread"
+    output_dir.mkdir(parents=True, exist_ok=True)
+    summary_file = output_dir / f"{name}_summary.json"
+    summary_file.write_text(json.dumps({
+        'title': title,
+        'author': 'An Author',
+        'summaries': [{'chapter_id': '1:ch1.xhtml', 'chapter_title': 'Chapter 1', 'summary': summary}],
+    }), encoding='utf-8')
+    return summary_file
+
+
+def test_only_changed_books_are_rendered(tmp_path):
+    books_dir, site_dir = tmp_path / 'books', tmp_path / 'site'
+    write_summary(books_dir, 'First', 'First Book', 'One')
+    write_summary(books_dir, 'Second', 'Second Book', 'Two')
+
+    first = build_site([books_dir], site_dir)
+    write_summary(books_dir, 'Second', 'Second Book', 'Two, revised')
+    second = build_site([books_dir], site_dir)
+
+    assert (first['rendered'], first['unchanged']) == (2, 0)
+    assert (second['rendered'], second['unchanged']) == (1, 1)
+    assert 'Two, revised' in (site_dir / 'books' / 'Second.html').read_text(encoding='utf-8')
+
+
+def test_failed_render_keeps_the_page_and_is_retried(tmp_path):
+    books_dir, site_dir = tmp_path / 'books', tmp_path / 'site'
+    write_summary(books_dir, 'First', 'First Book', 'Working summary')
+    build_site([books_dir], site_dir)
+    page_file = site_dir / 'books' / 'First.html'
+    page = page_file.read_text(encoding='utf-8')
+
+    write_summary(books_dir, 'First', 'First Book', None)
+    result = build_site([books_dir], site_dir)
+
+    assert (result['rendered'], result['failed'], result['removed']) == (0, 1, 0)
+    assert page_file.read_text(encoding='utf-8') == page
+    assert not list(page_file.parent.glob('*.tmp'))
+    assert 'books/First.html' in (site_dir / 'index.html').read_text(encoding='utf-8')
+
+    write_summary(books_dir, 'First', 'First Book', 'Fixed summary')
+    result = build_site([books_dir], site_dir)
+
+    assert result['rendered'] == 1
+    assert 'Fixed summary' in page_file.read_text(encoding='utf-8')
+    state = json.loads((site_dir / SITE_STATE_NAME).read_text(encoding='utf-8'))
+    assert state['books']['First']['hash'] is not None
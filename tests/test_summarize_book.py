@@ -0,0 +1,37 @@
+import argparse
+import asyncio
+
+import pytest
+
+from speedread.speedread_cli import add_book_arguments
+from speedread.summarize_book import reduce_summaries
+from speedread.tokens import chunk_text
+
+
+def parse_book_arguments(*argv):
+    parser = argparse.ArgumentParser()
+    add_book_arguments(parser)
+    return parser.parse_args(list(argv))
+
+
+@pytest.mark.parametrize('argv', [('--reduce-fan-in', '1'), ('--reduce-fan-in', '0'), ('--chunk-tokens', '0'),
+                                  ('--chunk-tokens', 'many')])
+def test_invalid_chunking_options_are_rejected(argv):
+    with pytest.raises(SystemExit):
+        parse_book_arguments(*argv)
+
+
+def test_chunking_options_at_their_minimum_are_accepted():
+    args = parse_book_arguments('--reduce-fan-in', '2', '--chunk-tokens', '1')
+
+    assert (args.reduce_fan_in, args.chunk_tokens) == (2, 1)
+
+
+def test_reduce_with_a_fan_in_below_two_fails_before_any_call():
+    with pytest.raises(ValueError):
+        asyncio.run(reduce_summaries(None, 'Chapter', ['one', 'two'], reduce_fan_in=1))
+
+
+def test_chunk_text_rejects_a_zero_budget():
+    with pytest.raises(ValueError):
+        chunk_text('text', 0, 'gpt-4-turbo')
@@ -0,0 +1,25 @@
+from speedread.trim_chapters import classify_chapters, classify_title
+
+
+def test_titles_are_classified():
+    assert classify_title('Chapter 3: The River') == 'main'
+    assert classify_title('Table of Contents') == 'front'
+    assert classify_title('Acknowledgments') == 'back'
+    assert classify_title('A Quiet Morning') == 'unknown'
+
+
+def test_entries_without_a_label_are_unknown():
+    assert classify_title(None) == 'unknown'
+    assert classify_title('   ') == 'unknown'
+
+
+def test_unlabeled_entry_does_not_stop_trimming():
+    chapters = [
+        {'title': 'Cover', 'size': 500},
+        {'title': None, 'size': 300},
+        {'title': 'Chapter 1', 'size': 20000},
+        {'title': 'Chapter 2', 'size': 20000},
+        {'title': 'Notes', 'size': 4000},
+    ]
+
+    assert classify_chapters(chapters) == (2, 3, True)
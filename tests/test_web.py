@@ -0,0 +1,100 @@
+import argparse
+import io
+import shutil
+import threading
+import time
+
+import pytest
+
+from speedread import tokens
+from speedread.speedread_cli import add_book_arguments
+from tests.make_epub import make_epub
+from tests.mock_openai import SILENT_MP3_FRAME, make_server
+from web.app import create_app
+
+
+class WordEncoding:
+    """Counts words as tokens; tiktoken would download its encodings on first use."""
+
+    def encode(self, text, disallowed_special=()):
+        return text.split()
+
+    def decode(self, words):
+        return ' '.join(words)
+
+
+@pytest.fixture
+def service(tmp_path, monkeypatch):
+    server = make_server()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    monkeypatch.setenv('OPENAI_BASE_URL', f'http://127.0.0.1:{server.server_port}/v1')
+    monkeypatch.setenv('OPENAI_API_KEY', 'mock')
+    monkeypatch.setattr(tokens, 'get_encoding', lambda model: WordEncoding())
+    parser = argparse.ArgumentParser()
+    add_book_arguments(parser)
+    args = parser.parse_args(['--no-cache', '--workers', '1', '--concurrency', '4'])
+    app = create_app(tmp_path / 'data', args)
+    runner = app.extensions['speedread_runner']
+    runner.start()
+    yield app.test_client()
+    runner.stop()
+    server.shutdown()
+    server.server_close()
+
+
+def wait_for(client, url, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = client.get(url).get_json()
+        if job['status'] in ('completed', 'failed'):
+            return job
+        time.sleep(0.05)
+    raise AssertionError(f"{url} still {job['status']} after {timeout}s")
+
+
+def upload(client, tmp_path, **fields):
+    epub_path = tmp_path / 'My Book.epub'
+    make_epub(epub_path, chapters=3, chapter_kb=2, toc='nav', title='A Test Book')
+    with open(epub_path, 'rb') as f:
+        response = client.post('/jobs', data={'epub': (f, epub_path.name), **fields})
+    assert response.status_code == 202
+    return response
+
+
+def test_uploaded_book_is_summarized_and_served(service, tmp_path):
+    response = upload(service, tmp_path)
+
+    job = wait_for(service, response.headers['Location'])
+
+    assert job['status'] == 'completed', job['error']
+    # Set by the progress hook, with INFO logging off as under pytest
+    assert (job['step'], job['stage']) == (4, 'Compiling summaries...')
+    assert set(job['files']) == {'summary'}
+    summary = service.get(job['files']['summary'])
+    assert summary.status_code == 200
+    assert summary.mimetype == 'text/html'
+    assert 'A Test Book' in summary.get_data(as_text=True)
+    partial = service.get(job['files']['summary'], headers={'Range': 'bytes=0-9'})
+    assert partial.status_code == 206
+    assert len(partial.get_data()) == 10
+    assert service.get('/jobs').get_json()['counts']['completed'] == 1
+
+
+@pytest.mark.skipif(not shutil.which('ffmpeg'), reason='needs ffmpeg')
+def test_uploaded_book_gets_an_audiobook(service, tmp_path):
+    response = upload(service, tmp_path, audiobook='1', voice='nova')
+
+    job = wait_for(service, response.headers['Location'])
+
+    assert job['status'] == 'completed', job['error']
+    assert job['step'] == 6
+    audiobook = service.get(job['files']['audiobook'])
+    assert audiobook.status_code == 200
+    assert audiobook.mimetype == 'audio/mp4'
+    assert len(audiobook.get_data()) > len(SILENT_MP3_FRAME)
+
+
+def test_upload_must_be_an_epub(service):
+    response = service.post('/jobs', data={'epub': (io.BytesIO(b'text'), 'notes.txt')})
+
+    assert response.status_code == 400
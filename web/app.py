@@ -0,0 +1,224 @@
+"""
+HTTP service that queues uploaded EPUBs and runs them through the speedread pipeline.
+
+Uploads are stored under the data directory and recorded in a persistent job
+queue. A fixed number of books are processed at once on a single asyncio
+loop in a background thread, sharing one OpenAI client and one API
+concurrency budget, so a burst of uploads waits in the queue instead of
+starting a pipeline each. Point OPENAI_BASE_URL at tests/mock_openai.py
+to run it without an API key.
+
+    OPENAI_BASE_URL=http://127.0.0.1:8089/v1 OPENAI_API_KEY=test speedread-web --data-dir /tmp/speedread-web
+    curl -F epub=@book.epub -F audiobook=1 http://127.0.0.1:8000/jobs
+"""
+import argparse
+import asyncio
+import logging
+import threading
+from pathlib import Path
+from flask import Flask, abort, jsonify, request, send_file, url_for
+from speedread.cache import AudioCache, ResponseCache
+from speedread.openai_client import LazyClient, close_client
+from speedread.speedread_cli import add_book_arguments, process_book
+from speedread.text_to_speech import VALID_VOICES
+from speedread.utils import configure_logging, sanitize_filename
+from web.jobs import JobQueue
+
+DEFAULT_BOOKS_IN_FLIGHT = 2
+# Workers also poll in case a wakeup from a request thread is missed
+POLL_SECONDS = 5.0
+
+
+class JobRunner:
+    """Process queued jobs, `books_in_flight` at a time, on one event loop thread."""
+
+    def __init__(self, queue, args, books_in_flight=DEFAULT_BOOKS_IN_FLIGHT):
+        self.queue = queue
+        self.args = args
+        self.books_in_flight = books_in_flight
+        self.loop = None
+        self.wakeup = None
+        self.task = None
+        self.running = threading.Event()
+        self.thread = threading.Thread(target=self._run, name='speedread-jobs', daemon=True)
+
+    def start(self):
+        self.queue.requeue_interrupted()
+        self.thread.start()
+
+    def notify(self):
+        """Wake an idle worker; safe to call from any thread."""
+        if self.loop:
+            self.loop.call_soon_threadsafe(self.wakeup.set)
+
+    def stop(self):
+        """Cancel the workers and wait for their thread; a job cut short is requeued by the next start."""
+        if self.thread.is_alive():
+            self.running.wait()
+            self.loop.call_soon_threadsafe(self.task.cancel)
+            self.thread.join()
+
+    def _run(self):
+        try:
+            asyncio.run(self._main())
+        except asyncio.CancelledError:
+            pass
+
+    async def _main(self):
+        self.loop = asyncio.get_running_loop()
+        self.wakeup = asyncio.Event()
+        self.task = asyncio.current_task()
+        self.running.set()
+        args = self.args
+        client = LazyClient(args.concurrency)
+        cache = None if args.no_cache else ResponseCache(args.cache_dir, args.cache_size_mb * 2**20)
+        audio_cache = None if args.no_cache else AudioCache(args.cache_dir, args.audio_cache_size_mb * 2**20)
+        # One API budget for every book in flight
+        semaphore = asyncio.Semaphore(args.concurrency)
+        try:
+            await asyncio.gather(*[self._worker(client, cache, semaphore, audio_cache)
+                                   for _ in range(self.books_in_flight)])
+        finally:
+            await close_client()
+
+    async def _worker(self, client, cache, semaphore, audio_cache):
+        while True:
+            # Cleared before looking, so a job enqueued after this point sets it again
+            self.wakeup.clear()
+            job = self.queue.claim()
+            if job is None:
+                try:
+                    await asyncio.wait_for(self.wakeup.wait(), POLL_SECONDS)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            await self._process(job, client, cache, semaphore, audio_cache)
+
+    async def _process(self, job, client, cache, semaphore, audio_cache):
+        logging.info(f"Job {job['id']}: processing {job['filename']}")
+        args = argparse.Namespace(**{**vars(self.args), **job['options'], 'yes': True})
+
+        def progress(step, stage):
+            self.queue.progress(job['id'], step, stage)
+
+        try:
+            status = await process_book(job['epub_path'], args, client, cache, semaphore, audio_cache, progress)
+            error = None if status == 'completed' else 'Processing failed, see the service log'
+        except Exception as e:
+            logging.exception(f"Job {job['id']} failed")
+            status, error = 'failed', str(e)
+        self.queue.finish(job['id'], status, error)
+        logging.info(f"Job {job['id']}: {status}")
+
+
+def job_outputs(job):
+    """Paths of the HTML summary and audiobook that process_book writes for a job."""
+    epub_path = Path(job['epub_path'])
+    safe_title = sanitize_filename(epub_path.stem)
+    output_dir = epub_path.parent / f"{safe_title}_speedread"
+    return {
+        'summary': output_dir / f"{safe_title}_summary.html",
+        'audiobook': output_dir / f"{safe_title}_audiobook.m4b",
+    }
+
+
+def create_app(data_dir, args, books_in_flight=DEFAULT_BOOKS_IN_FLIGHT, max_upload_mb=200):
+    data_dir = Path(data_dir)
+    queue = JobQueue(data_dir / 'jobs.sqlite')
+    runner = JobRunner(queue, args, books_in_flight)
+
+    app = Flask(__name__)
+    app.config['MAX_CONTENT_LENGTH'] = max_upload_mb * 2**20
+    app.extensions['speedread_runner'] = runner
+
+    def describe(job):
+        status = {key: job[key] for key in ('id', 'filename', 'status', 'step', 'stage', 'error',
+                                            'created', 'started', 'finished')}
+        status['options'] = job['options']
+        status['url'] = url_for('job_status', job_id=job['id'])
+        if job['status'] == 'queued':
+            status['queue_position'] = queue.position(job)
+        status['files'] = {
+            name: url_for('job_file', job_id=job['id'], name=name)
+            for name, path in job_outputs(job).items() if path.exists()
+        }
+        return status
+
+    def get_job(job_id):
+        job = queue.get(job_id)
+        if job is None:
+            abort(404)
+        return job
+
+    @app.post('/jobs')
+    def create_job():
+        upload = request.files.get('epub')
+        if upload is None or not upload.filename:
+            return jsonify(error="Upload the book as the 'epub' form field"), 400
+        filename = Path(upload.filename).name
+        if not filename.lower().endswith('.epub'):
+            return jsonify(error='Only .epub files are accepted'), 400
+        voice = request.form.get('voice', args.voice)
+        if voice not in VALID_VOICES:
+            return jsonify(error=f"Unknown voice {voice!r}"), 400
+        options = {
+            'audiobook': request.form.get('audiobook', '').lower() in ('1', 'true', 'yes', 'on'),
+            'voice': voice,
+        }
+
+        job_id = queue.new_id()
+        job_dir = data_dir / 'uploads' / job_id
+        job_dir.mkdir(parents=True)
+        epub_path = job_dir / f"{sanitize_filename(Path(filename).stem)}.epub"
+        upload.save(epub_path)
+        job = queue.enqueue(job_id, filename, epub_path, options)
+        runner.notify()
+        response = jsonify(describe(job))
+        response.status_code = 202
+        response.headers['Location'] = url_for('job_status', job_id=job_id)
+        return response
+
+    @app.get('/jobs')
+    def list_jobs():
+        limit = request.args.get('limit', 100, type=int)
+        return jsonify(counts=queue.counts(), jobs=[describe(job) for job in queue.list(limit)])
+
+    @app.get('/jobs/<job_id>')
+    def job_status(job_id):
+        return jsonify(describe(get_job(job_id)))
+
+    @app.get('/jobs/<job_id>/<name>')
+    def job_file(job_id, name):
+        path = job_outputs(get_job(job_id)).get(name)
+        if path is None or not path.exists():
+            abort(404)
+        # conditional=True answers Range requests with 206, so players can seek
+        mimetype = 'text/html' if name == 'summary' else 'audio/mp4'
+        return send_file(path, mimetype=mimetype, conditional=True, download_name=path.name)
+
+    @app.get('/health')
+    def health():
+        return jsonify(status='ok', workers=books_in_flight, alive=runner.thread.is_alive(), jobs=queue.counts())
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Serve speedread as an HTTP job queue.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--data-dir', default='speedread_web', help='Directory for uploads, outputs and the job queue')
+    parser.add_argument('--books-in-flight', type=int, default=DEFAULT_BOOKS_IN_FLIGHT,
+                        help=f'Number of books processed at the same time (default: {DEFAULT_BOOKS_IN_FLIGHT})')
+    parser.add_argument('--max-upload-mb', type=int, default=200, help='Largest accepted upload in MB')
+    add_book_arguments(parser)
+    args = parser.parse_args()
+
+    configure_logging()
+    app = create_app(args.data_dir, args, args.books_in_flight, args.max_upload_mb)
+    app.extensions['speedread_runner'].start()
+    app.run(host=args.host, port=args.port, threaded=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,128 @@
+import json
+import logging
+import sqlite3
+import time
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+
+STATUSES = ('queued', 'running', 'completed', 'failed', 'cancelled')
+FINISHED = ('completed', 'failed', 'cancelled')
+
+
+class JobQueue:
+    """
+    Persistent queue of book jobs.
+
+    Jobs live in a single SQLite file, so uploads accepted before a restart
+    are still processed after it. A job is claimed inside an immediate
+    transaction, which lets any number of workers take jobs without handing
+    the same job out twice.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    filename TEXT NOT NULL,
+                    epub_path TEXT NOT NULL,
+                    options TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    step INTEGER NOT NULL DEFAULT 0,
+                    stage TEXT,
+                    error TEXT,
+                    created REAL NOT NULL,
+                    started REAL,
+                    finished REAL
+                )
+            """)
+            conn.execute('CREATE INDEX IF NOT EXISTS jobs_status_created ON jobs (status, created)')
+
+    @contextmanager
+    def _connect(self):
+        # A connection per operation: jobs are touched from request threads,
+        # the worker loop and the threads it hands blocking stages to
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _to_dict(row):
+        job = dict(row)
+        job['options'] = json.loads(job['options'])
+        return job
+
+    def new_id(self):
+        return uuid.uuid4().hex
+
+    def enqueue(self, job_id, filename, epub_path, options):
+        with self._connect() as conn:
+            conn.execute(
+                'INSERT INTO jobs (id, filename, epub_path, options, status, created) VALUES (?, ?, ?, ?, ?, ?)',
+                (job_id, filename, str(epub_path), json.dumps(options), 'queued', time.time())
+            )
+        return self.get(job_id)
+
+    def claim(self):
+        """Mark the oldest queued job as running and return it, or None."""
+        with self._connect() as conn:
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                row = conn.execute(
+                    "SELECT * FROM jobs WHERE status = 'queued' ORDER BY created LIMIT 1"
+                ).fetchone()
+                if row:
+                    conn.execute("UPDATE jobs SET status = 'running', started = ? WHERE id = ?",
+                                 (time.time(), row['id']))
+                conn.execute('COMMIT')
+            except BaseException:
+                conn.execute('ROLLBACK')
+                raise
+        return self.get(row['id']) if row else None
+
+    def progress(self, job_id, step, stage):
+        with self._connect() as conn:
+            conn.execute('UPDATE jobs SET step = ?, stage = ? WHERE id = ?', (step, stage, job_id))
+
+    def finish(self, job_id, status, error=None):
+        if status not in FINISHED:
+            raise ValueError(f"Not a final job status: {status}")
+        with self._connect() as conn:
+            conn.execute('UPDATE jobs SET status = ?, error = ?, finished = ? WHERE id = ?',
+                         (status, error, time.time(), job_id))
+
+    def requeue_interrupted(self):
+        """Put jobs that were running when the service stopped back in the queue."""
+        with self._connect() as conn:
+            count = conn.execute("UPDATE jobs SET status = 'queued' WHERE status = 'running'").rowcount
+        if count:
+            logging.info(f"Requeued {count} interrupted jobs")
+        return count
+
+    def get(self, job_id):
+        with self._connect() as conn:
+            row = conn.execute('SELECT * FROM jobs WHERE id = ?', (job_id,)).fetchone()
+        return self._to_dict(row) if row else None
+
+    def position(self, job):
+        """Number of queued jobs ahead of a queued job."""
+        with self._connect() as conn:
+            return conn.execute("SELECT COUNT(*) FROM jobs WHERE status = 'queued' AND created < ?",
+                                (job['created'],)).fetchone()[0]
+
+    def list(self, limit=100):
+        with self._connect() as conn:
+            rows = conn.execute('SELECT * FROM jobs ORDER BY created DESC LIMIT ?', (limit,)).fetchall()
+        return [self._to_dict(row) for row in rows]
+
+    def counts(self):
+        with self._connect() as conn:
+            counts = dict(conn.execute('SELECT status, COUNT(*) FROM jobs GROUP BY status').fetchall())
+        return {status: counts.get(status, 0) for status in STATUSES}